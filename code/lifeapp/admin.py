@@ -20,4 +20,4 @@ class RecommendationAdmin(admin.ModelAdmin):
 @admin.register(Goal)
 class GoalAdmin(admin.ModelAdmin):
     list_display = ['user', 'goal_type', 'target_value', 'progress_percentage', 'is_achieved']
-    list_filter = ['goal_type', 'is_achieved']
\ No newline at end of file
+    list_filter = ['goal_type', 'is_achieved', 'progress_source']
\ No newline at end of file
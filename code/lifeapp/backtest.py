@@ -0,0 +1,221 @@
+"""Walk-forward (rolling-origin) backtests over a users × days matrix.
+
+Each metric is loaded as one matrix with a row per user and a column per calendar day
+(NaN where nothing was logged). Prefix sums along the days give the least-squares sums
+of every trailing `past_days` window at once, so all users and all forecast origins are
+fitted with a few array operations, and the errors are accumulated per horizon.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from .models import HealthLog
+from .trend import trend_from_sums
+
+# trend: least-squares line over the window; mean: window average; last: last observed value
+FORECASTERS = ('trend', 'mean', 'last')
+
+# users per block; bounds memory at roughly a dozen float arrays of block_size × days
+BLOCK_SIZE = 4096
+
+_TOTALS = ['n', 'abs_err', 'sq_err', 'ape', 'ape_n', 'hits', 'r2', 'r2_users', 'diff', 'diff_sq']
+
+
+def load_panel(metrics, start, end, user_ids=None):
+    """Load HealthLog `metrics` for every day from `start` to `end` (inclusive) in one query.
+
+    Returns (user_ids, {metric: matrix}) where matrix[i, d] is the value of user_ids[i]
+    on `start + d` days, NaN when missing. Only users with a log in the range are included.
+    """
+    qs = HealthLog.objects.filter(date__gte=start, date__lte=end)
+    if user_ids is not None:
+        qs = qs.filter(user_id__in=user_ids)
+    rows = qs.order_by().values_list('user_id', 'date', *metrics).iterator(chunk_size=10000)
+
+    users, days, values = [], [], []
+    origin = start.toordinal()
+    for row in rows:
+        users.append(row[0])
+        days.append(row[1].toordinal() - origin)
+        values.append(row[2:])
+
+    ids, row_index = np.unique(np.array(users, dtype=np.int64), return_inverse=True)
+    day_index = np.array(days, dtype=np.int64)
+    values = np.array(values, dtype=float).reshape(len(users), len(metrics))
+    panels = {}
+    for col, metric in enumerate(metrics):
+        matrix = np.full((len(ids), (end - start).days + 1), np.nan)
+        matrix[row_index, day_index] = values[:, col]
+        panels[metric] = matrix
+    return ids, panels
+
+
+def _prefix_sums(Y):
+    """Prefix sums along the days of the least-squares terms of `Y`, and the last
+    observed value on or before each day; shared by every window length."""
+    observed = ~np.isnan(Y)
+    days = Y.shape[1]
+    x = np.arange(days, dtype=float)
+    W = observed.astype(float)
+    Yz = np.where(observed, Y, 0.0)
+    prefix = []
+    for a in (W, W * x, Yz, Yz * x, W * x * x):
+        c = np.zeros((a.shape[0], days + 1))
+        np.cumsum(a, axis=1, out=c[:, 1:])
+        prefix.append(c)
+    last_index = np.maximum.accumulate(np.where(observed, np.arange(days), 0), axis=1)
+    return prefix, np.take_along_axis(Y, last_index, axis=1)
+
+
+def _accumulate(Y, prefix, last_observed, past_days, skip, horizon, forecasters, min_points, totals, errors_only):
+    days = Y.shape[1]
+    x = np.arange(days, dtype=float)
+
+    # window s covers days [s, s + past_days) with x the calendar day, and its forecast for horizon h
+    # is day s + past_days - 1 + h: the same window and x as the dashboard forecast (ml.forecast_columns).
+    # The first `skip` windows are left out so every window length is scored on the same days.
+    n, sx, sy, sxy, sxx = (c[:, skip + past_days:] - c[:, skip:-past_days] for c in prefix)
+    slope, intercept = trend_from_sums(n, sx, sy, sxy, sxx)
+    last_value = last_observed[:, skip + past_days - 1:]
+
+    for h in range(1, horizon + 1):
+        origins = days - skip - past_days - h + 1
+        actual = Y[:, skip + past_days - 1 + h:]
+        valid = (n[:, :origins] >= min_points) & ~np.isnan(actual)
+        reference = last_value[:, :origins]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            predictions = {
+                'trend': slope[:, :origins] * x[skip + past_days - 1 + h:] + intercept[:, :origins],
+                'mean': sy[:, :origins] / n[:, :origins],
+                'last': reference,
+            }
+            per_user = valid.sum(axis=1)
+            if not errors_only:
+                went_up = actual > reference
+                user_mean = np.where(valid, actual, 0.0).sum(axis=1) / np.maximum(per_user, 1)
+                ss_tot = np.where(valid, (actual - user_mean[:, None]) ** 2, 0.0).sum(axis=1)
+                scored_users = (per_user >= 2) & (ss_tot > 0)
+                scaled = valid & (actual != 0)
+                scale = np.where(scaled, np.abs(actual), 1.0)
+
+            baseline_err = None
+            for forecaster in forecasters:
+                pred = predictions[forecaster]
+                # zero outside `valid`, so plain sums only see scored forecasts
+                err = np.where(valid, actual - pred, 0.0)
+                abs_err = np.abs(err)
+                ss_res = (err * err).sum(axis=1)
+                t = totals[forecaster]
+                t['n'][h - 1] += per_user.sum()
+                t['abs_err'][h - 1] += abs_err.sum()
+                t['sq_err'][h - 1] += ss_res.sum()
+                if errors_only:
+                    continue
+                t['ape'][h - 1] += (abs_err / scale).sum()
+                t['ape_n'][h - 1] += scaled.sum()
+                t['hits'][h - 1] += (((pred > reference) == went_up) & valid).sum()
+                t['r2'][h - 1] += (1 - ss_res[scored_users] / ss_tot[scored_users]).sum()
+                t['r2_users'][h - 1] += scored_users.sum()
+                if baseline_err is None:
+                    baseline_err = abs_err
+                else:
+                    diff = abs_err - baseline_err
+                    t['diff'][h - 1] += diff.sum()
+                    t['diff_sq'][h - 1] += (diff * diff).sum()
+
+
+def _mean_and_se(total, total_sq, n):
+    mean = total / n
+    return mean, np.sqrt(max(total_sq / n - mean ** 2, 0.0) / n)
+
+
+def _scores(t, i, is_baseline, errors_only):
+    n = t['n'][i]
+    if not n:
+        return {'horizon': i + 1, 'n': 0}
+    mae, mae_se = _mean_and_se(t['abs_err'][i], t['sq_err'][i], n)
+    scores = {
+        'horizon': i + 1,
+        'n': int(n),
+        'mae': round(float(mae), 4),
+        'mae_se': round(float(mae_se), 4),
+        'rmse': round(float(np.sqrt(t['sq_err'][i] / n)), 4),
+    }
+    if errors_only:
+        return scores
+    scores.update({
+        'r2': round(float(t['r2'][i] / t['r2_users'][i]), 4) if t['r2_users'][i] else None,
+        'mape': round(float(t['ape'][i] / t['ape_n'][i] * 100), 4) if t['ape_n'][i] else None,
+        'direction_accuracy': round(float(t['hits'][i] / n), 4),
+    })
+    if not is_baseline:
+        diff, diff_se = _mean_and_se(t['diff'][i], t['diff_sq'][i], n)
+        scores['mae_diff'] = round(float(diff), 4)
+        scores['mae_diff_se'] = round(float(diff_se), 4)
+    return scores
+
+
+def _backtest(Y, past_days_options, horizon, forecasters, min_points, block_size, errors_only=False):
+    unknown = set(forecasters) - set(FORECASTERS)
+    if unknown:
+        raise ValueError(f'Unknown forecasters: {sorted(unknown)}')
+    Y = np.asarray(Y, dtype=float)
+    longest = max(past_days_options)
+    horizon = max(0, min(horizon, Y.shape[1] - longest))
+    totals = {
+        p: {f: {name: np.zeros(horizon) for name in _TOTALS} for f in forecasters}
+        for p in past_days_options
+    }
+    for lo in range(0, Y.shape[0], block_size):
+        block = Y[lo:lo + block_size]
+        prefix, last_observed = _prefix_sums(block)
+        for p in past_days_options:
+            _accumulate(
+                block, prefix, last_observed, p, longest - p, horizon, forecasters, min_points, totals[p], errors_only
+            )
+    return {
+        p: {f: [_scores(totals[p][f], i, f == forecasters[0], errors_only) for i in range(horizon)] for f in forecasters}
+        for p in past_days_options
+    }
+
+
+def rolling_backtest(Y, past_days=30, horizon=7, forecasters=('trend',), min_points=3, block_size=BLOCK_SIZE):
+    """Backtest forecasters from every origin of every row of a users × days matrix.
+
+    Each forecast uses the `past_days` days before its origin (at least `min_points`
+    observed values) and is scored `h` days ahead for h = 1..horizon against every
+    observed value. Returns {forecaster: [scores per horizon]} where scores hold n,
+    MAE (with its standard error), RMSE, R² (averaged over users), MAPE (over nonzero
+    actuals) and direction accuracy (up vs the last training value, as in
+    evaluate_prediction). Forecasters after the first also report mae_diff: their
+    mean absolute error minus the first one's on the same forecasts, with its
+    standard error (treating forecasts as independent).
+    """
+    return _backtest(Y, [past_days], horizon, forecasters, min_points, block_size)[past_days]
+
+
+def window_grid(Y, past_days_options, horizon=7, forecaster='trend', min_points=3, block_size=BLOCK_SIZE):
+    """rolling_backtest of one forecaster for several training window lengths.
+
+    The prefix sums are built once per block of users and shared by every window, and
+    all windows are scored on the same target days (those the longest window can
+    reach). Only the error scores (n, MAE with its standard error, RMSE) are
+    computed. Returns {past_days: [scores per horizon]}.
+    """
+    results = _backtest(Y, list(past_days_options), horizon, (forecaster,), min_points, block_size, errors_only=True)
+    return {p: scores[forecaster] for p, scores in results.items()}
+
+
+def backtest_metrics(metrics, end, days=365, past_days=30, horizon=7, forecasters=FORECASTERS, user_ids=None):
+    """rolling_backtest for each metric over the `days` days up to `end`, from one data load.
+
+    Returns {metric: {'users': count, 'results': {forecaster: [scores per horizon]}}}.
+    """
+    ids, panels = load_panel(metrics, end - timedelta(days=days - 1), end, user_ids=user_ids)
+    return {
+        metric: {
+            'users': len(ids),
+            'results': rolling_backtest(panels[metric], past_days, horizon, forecasters),
+        }
+        for metric in metrics
+    }
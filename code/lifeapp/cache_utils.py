@@ -0,0 +1,74 @@
+import contextvars
+import hashlib
+import time
+from contextlib import contextmanager
+
+from django.conf import settings as dj_settings
+from django.core.cache import cache
+from django.utils import timezone
+
+DASHBOARD_CACHE_PREFIX = 'lifeapp:dashboard'
+
+# user ids whose invalidation is held back by batched_dashboard_invalidation
+_pending = contextvars.ContextVar('lifeapp_pending_dashboard_invalidations', default=None)
+
+
+def _version_key(user_id):
+    return f'{DASHBOARD_CACHE_PREFIX}:version:{user_id}'
+
+
+def _dashboard_version(user_id):
+    """Return the user's current cache version, creating one if it is missing.
+
+    A fresh version is time-based so an evicted version key never resurrects
+    payloads cached under an older version.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def dashboard_cache_key(user_id, kind, params):
+    """Cache key for one kind of dashboard payload ('page' or 'data') and chart params."""
+    digest = hashlib.md5(','.join(params).encode()).hexdigest()
+    day = timezone.localdate().isoformat()
+    return f'{DASHBOARD_CACHE_PREFIX}:{kind}:{user_id}:{_dashboard_version(user_id)}:{day}:{digest}'
+
+
+def get_dashboard_payload(user_id, kind, params, build):
+    """Return the cached payload for the user and params, calling `build()` on a miss."""
+    key = dashboard_cache_key(user_id, kind, params)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, getattr(dj_settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return payload
+
+
+def invalidate_dashboard_cache(user_id):
+    """Drop every cached dashboard payload for the user by moving to a new version."""
+    pending = _pending.get()
+    if pending is not None:
+        pending.add(user_id)
+        return
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+@contextmanager
+def batched_dashboard_invalidation():
+    """Hold back invalidate_dashboard_cache calls (including those of signal
+    receivers) and invalidate each user once on exit."""
+    if _pending.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+        for user_id in pending:
+            invalidate_dashboard_cache(user_id)
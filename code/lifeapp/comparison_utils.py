@@ -0,0 +1,106 @@
+"""Period-over-period comparisons computed with conditional aggregation.
+
+Every requested period and metric of a table is answered by one aggregate query,
+e.g. `Avg('steps', filter=Q(date__gte=..., date__lt=...))` per period, so comparing
+week-over-week, month-over-month or year-over-year costs the same single round trip
+per table.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db.models import Q
+
+from .models import HealthLog, NutritionEntry
+from .summary_utils import day_bounds
+
+# A half-open date range [start, end)
+Period = namedtuple('Period', ['name', 'start', 'end'])
+
+
+def trailing_periods(end, days=7, count=2, names=('current', 'previous')):
+    """Consecutive `days`-long periods ending just before `end`, newest first."""
+    periods = []
+    for i in range(count):
+        name = names[i] if i < len(names) else f'period_{i}'
+        periods.append(Period(name, end - timedelta(days=days * (i + 1)), end - timedelta(days=days * i)))
+    return periods
+
+
+def _shift(day, unit, steps):
+    if unit == 'year':
+        return day.replace(year=day.year - steps)
+    month_index = day.year * 12 + day.month - 1 - steps
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+CALENDAR_UNITS = ('month', 'year')
+
+
+def calendar_periods(today, unit='month', count=2, names=('current', 'previous')):
+    """The calendar month or year containing `today` (to date) and the `count - 1`
+    whole ones before it, newest first. Raises ValueError for any other `unit`."""
+    if unit not in CALENDAR_UNITS:
+        raise ValueError(f'unit must be one of {CALENDAR_UNITS}, not {unit!r}')
+    first = today.replace(day=1) if unit == 'month' else today.replace(month=1, day=1)
+    periods = [Period(names[0], first, today + timedelta(days=1))]
+    for i in range(1, count):
+        name = names[i] if i < len(names) else f'period_{i}'
+        periods.append(Period(name, _shift(first, unit, i), _shift(first, unit, i - 1)))
+    return periods
+
+
+def _period_filter(model, period):
+    if model is NutritionEntry:
+        return Q(created_at__gte=day_bounds(period.start)[0], created_at__lt=day_bounds(period.end)[0])
+    return Q(date__gte=period.start, date__lt=period.end)
+
+
+def _aggregate_periods(model, user, periods, metrics):
+    """Yield (period name, alias, value) for every period and metric from one query."""
+    if not metrics:
+        return
+    keys = {}
+    aggregates = {}
+    for i, period in enumerate(periods):
+        for alias, (func, field) in metrics.items():
+            key = f'p{i}_{alias}'
+            keys[key] = (period.name, alias)
+            aggregates[key] = func(field, filter=_period_filter(model, period))
+    overall = Q()
+    for period in periods:
+        overall |= _period_filter(model, period)
+    values = model.objects.filter(overall, user=user).aggregate(**aggregates)
+    for key, (name, alias) in keys.items():
+        yield name, alias, values[key]
+
+
+def compare_periods(user, periods, health_metrics=None, nutrition_metrics=None):
+    """Aggregate metrics for each period: {period name: {alias: value}}.
+
+    `health_metrics` / `nutrition_metrics` map an alias to (aggregate class, field)
+    on HealthLog / NutritionEntry, e.g. {'avg_steps': (Avg, 'steps')}. Uses at most
+    one query per table; values are None for periods without rows.
+    """
+    results = {period.name: {} for period in periods}
+    for model, metrics in ((HealthLog, health_metrics), (NutritionEntry, nutrition_metrics)):
+        for name, alias, value in _aggregate_periods(model, user, periods, metrics):
+            results[name][alias] = value
+    return results
+
+
+def percent_change(current, previous):
+    """Change from `previous` to `current` as {'value': abs percent (1 dp), 'is_positive'}.
+
+    No previous value (or zero) reports no change.
+    """
+    current = float(current or 0)
+    previous = float(previous or 0)
+    if previous > 0:
+        change = (current - previous) / previous * 100
+        return {'value': round(abs(change), 1), 'is_positive': change >= 0}
+    return {'value': 0, 'is_positive': True}
+
+
+def period_deltas(current, previous, aliases):
+    """{alias: percent_change(current[alias], previous[alias])} for two result dicts."""
+    return {alias: percent_change(current.get(alias), previous.get(alias)) for alias in aliases}
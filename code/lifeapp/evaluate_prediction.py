@@ -2,214 +2,195 @@
 from datetime import timedelta
 from django.utils import timezone
 import numpy as np
-import matplotlib.pyplot as plt
 
 from .models import HealthLog, UserProfile, NutritionEntry
-from .ml import predict_metric, predict_weight_bmi
+from .ml import DEFAULT_PAST_DAYS, FORECAST_CACHE_PREFIX, cached_result, data_revision, predict_metric
 
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from .trend import fit_trend, predict_trend, regression_scores, direction_scores
 import os
 
+_HEALTHLOG_FIELDS = {f.name for f in HealthLog._meta.concrete_fields}
 
-def evaluate_metric(user, metric_field, past_days=30, test_days=7, plot=False):
-    """
-    Evaluate linear regression prediction for a numeric metric.
-    Returns a dict with R², MAE, RMSE, and optionally plot.
-    """
-    today = timezone.now().date()
-    start = today - timedelta(days=past_days + test_days)
-    logs = HealthLog.objects.filter(user=user, date__gte=start).order_by('date')
 
-    xs, ys = [], []
-    for i, log in enumerate(logs):
-        val = getattr(log, metric_field, None)
-        if val is None:
-            continue
-        try:
-            v = float(val)
-        except:
-            continue
-        xs.append([i])
-        ys.append(v)
-
-    if len(ys) < test_days + 3:
-        return None
+class BacktestResult:
+    """One train/test split of a metric with its fitted trend and predictions.
 
-    X_train = np.array(xs[:-test_days])
-    y_train = np.array(ys[:-test_days])
-    X_test = np.array(xs[-test_days:])
-    y_test = np.array(ys[-test_days:])
-
-    model = LinearRegression()
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
+    Holds everything the regression metrics, direction metrics and plots need, so a
+    (user, metric, window) is loaded and fitted once and every evaluation reads it.
+    """
 
-    r2 = r2_score(y_test, y_pred)
-    mae = mean_absolute_error(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = mse ** 0.5
+    def __init__(self, metric_field, x_train, y_train, x_test, y_test):
+        self.metric_field = metric_field
+        self.x_train = x_train
+        self.y_train = y_train
+        self.x_test = x_test
+        self.y_test = y_test
+        slope, intercept, _ = fit_trend(x_train, y_train)
+        self.slope = float(slope[0])
+        self.intercept = float(intercept[0])
+        self.y_pred = predict_trend(slope, intercept, x_test)[:, 0]
+        # direction labels: 1 = increase vs last training value, 0 = not increase
+        self.last_train_value = float(y_train[-1])
+        self.y_test_bin = [1 if v > self.last_train_value else 0 for v in y_test]
+        self.y_pred_bin = [1 if p > self.last_train_value else 0 for p in self.y_pred]
+
+    def regression_metrics(self):
+        scores = regression_scores(self.y_test, self.y_pred)
+        return {'r2': round(scores['r2'], 3), 'mae': round(scores['mae'], 3), 'rmse': round(scores['rmse'], 3)}
+
+    def direction_metrics(self):
+        scores = direction_scores(self.y_test_bin, self.y_pred_bin)
+        return {
+            'accuracy': round(scores['accuracy'], 4),
+            'precision': round(scores['precision'], 4),
+            'recall': round(scores['recall'], 4),
+            'f1': round(scores['f1'], 4)
+        }
 
-    if plot:
+    def plot(self):
+        # plotting libraries are only imported when a plot is requested
+        import matplotlib.pyplot as plt
+        y_train, y_test, y_pred = self.y_train, self.y_test, self.y_pred
         plt.figure(figsize=(8,4))
-        plt.plot(range(len(y_train)), y_train, label='Train')
-        plt.plot(range(len(y_train), len(y_train)+len(y_test)), y_test, label='Actual')
-        plt.plot(range(len(y_train), len(y_train)+len(y_test)), y_pred, label='Predicted')
-        plt.title(f'Metric Prediction: {metric_field}')
-        plt.xlabel('Day Index')
-        plt.ylabel(metric_field)
+        plt.plot(self.x_train, y_train, label='Train')
+        plt.plot(self.x_test, y_test, label='Actual')
+        plt.plot(self.x_test, y_pred, label='Predicted')
+        plt.title(f'Metric Prediction: {self.metric_field}')
+        plt.xlabel('Days from today')
+        plt.ylabel(self.metric_field)
         plt.legend()
-        # compute direction accuracy (up/down relative to last training value)
-        try:
-            last_train_value = float(y_train[-1])
-            y_test_bin = [1 if v > last_train_value else 0 for v in y_test]
-            y_pred_bin = [1 if p > last_train_value else 0 for p in y_pred]
-            acc = accuracy_score(y_test_bin, y_pred_bin)
-            # draw accuracy in upper-right corner of plot
-            ax = plt.gca()
-            ax.text(0.98, 0.95, f'Accuracy: {acc:.4f}', ha='right', va='top', transform=ax.transAxes,
-                    bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
-        except Exception:
-            # if any issue computing classification metrics, skip annotation
-            pass
+        # draw direction accuracy in upper-right corner of plot
+        acc = direction_scores(self.y_test_bin, self.y_pred_bin)['accuracy']
+        ax = plt.gca()
+        ax.text(0.98, 0.95, f'Accuracy: {acc:.4f}', ha='right', va='top', transform=ax.transAxes,
+                bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
         plt.show()
 
-    return {'r2': round(r2, 3), 'mae': round(mae, 3), 'rmse': round(rmse, 3)}
 
+def load_backtests(user, metric_fields, past_days=30, test_days=7):
+    """Build a BacktestResult per metric from one HealthLog query.
 
-def evaluate_direction_metrics(user, metric_field, past_days=30, test_days=7):
-    """Evaluate direction (up/down) classification derived from regression predictions.
-
-    For the last `past_days + test_days` period, train on the first `past_days` and
-    predict the next `test_days`. Convert predictions and ground truth to binary labels
-    (1 = increase vs last training value, 0 = not increase). Compute accuracy, precision,
-    recall and f1. Returns None if insufficient data.
+    Uses the logs of the last `past_days + test_days` days (today included); the last
+    `test_days` values of each metric are the test split. x is the calendar day
+    relative to today, as in the dashboard forecast. Returns {metric: BacktestResult
+    or None}, None when a metric has fewer than `test_days + 3` values.
     """
     today = timezone.now().date()
-    start = today - timedelta(days=past_days + test_days)
-    logs = HealthLog.objects.filter(user=user, date__gte=start).order_by('date')
+    start = today - timedelta(days=past_days + test_days - 1)
+    fields = [f for f in metric_fields if f in _HEALTHLOG_FIELDS]
+    rows = list(
+        HealthLog.objects.filter(user=user, date__gte=start).order_by('date').values_list('date', *fields)
+    ) if fields else []
 
-    xs, ys = [], []
-    for i, log in enumerate(logs):
-        val = getattr(log, metric_field, None)
-        if val is None:
+    results = {}
+    for metric in metric_fields:
+        if metric not in fields:
+            results[metric] = None
             continue
-        try:
-            v = float(val)
-        except:
+        col = fields.index(metric) + 1
+        xs, ys = [], []
+        for row in rows:
+            try:
+                v = float(row[col])
+            except (TypeError, ValueError):
+                continue
+            xs.append((row[0] - today).days)
+            ys.append(v)
+
+        if len(ys) < test_days + 3:
+            results[metric] = None
             continue
-        xs.append([i])
-        ys.append(v)
+        results[metric] = BacktestResult(
+            metric,
+            np.array(xs[:-test_days], dtype=float), np.array(ys[:-test_days]),
+            np.array(xs[-test_days:], dtype=float), np.array(ys[-test_days:]),
+        )
+    return results
 
-    if len(ys) < test_days + 3:
-        return None
 
-    X_train = np.array(xs[:-test_days])
-    y_train = np.array(ys[:-test_days])
-    X_test = np.array(xs[-test_days:])
-    y_test = np.array(ys[-test_days:])
-
-    model = LinearRegression()
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-
-    # derive binary labels relative to last training value
-    last_train_value = float(y_train[-1])
-    y_test_bin = [1 if v > last_train_value else 0 for v in y_test]
-    y_pred_bin = [1 if p > last_train_value else 0 for p in y_pred]
-
-    # compute classification metrics
-    acc = accuracy_score(y_test_bin, y_pred_bin)
-    prec = precision_score(y_test_bin, y_pred_bin, zero_division=0)
-    rec = recall_score(y_test_bin, y_pred_bin, zero_division=0)
-    f1 = f1_score(y_test_bin, y_pred_bin, zero_division=0)
-
-    return {
-        'accuracy': round(float(acc), 4),
-        'precision': round(float(prec), 4),
-        'recall': round(float(rec), 4),
-        'f1': round(float(f1), 4)
-    }
+def _backtest(user, metric_field, past_days, test_days, backtest):
+    if backtest is not None:
+        return backtest
+    return load_backtests(user, [metric_field], past_days=past_days, test_days=test_days)[metric_field]
 
 
-def evaluate_weight_bmi(user, past_days=30, predict_days=14, plot=False):
+def evaluate_metric(user, metric_field, past_days=30, test_days=7, plot=False, backtest=None):
     """
-    Evaluate weight/BMI prediction against HealthLog ground truth.
-    Returns MAE and RMSE.
+    Evaluate linear regression prediction for a numeric metric.
+    Returns a dict with R², MAE, RMSE, and optionally plot.
+    Pass `backtest` (from load_backtests) to reuse an already fitted split.
     """
-    preds = predict_weight_bmi(user, past_days=past_days, predict_days=predict_days)
-    if not preds:
+    backtest = _backtest(user, metric_field, past_days, test_days, backtest)
+    if backtest is None:
         return None
+    if plot:
+        backtest.plot()
+    return backtest.regression_metrics()
 
-    today = timezone.now().date()
-    logs = HealthLog.objects.filter(
-        user=user,
-        date__gte=today,
-        date__lt=today + timedelta(days=predict_days)
-    )
-
-    actual_weights = {log.date.strftime('%m-%d'): float(log.weight) for log in logs if log.weight is not None}
 
-    y_true, y_pred = [], []
-    for date, w in zip(preds['dates'], preds['weight']):
-        if date in actual_weights:
-            y_true.append(actual_weights[date])
-            y_pred.append(w)
+def evaluate_direction_metrics(user, metric_field, past_days=30, test_days=7, backtest=None):
+    """Evaluate direction (up/down) classification derived from regression predictions.
 
-    if not y_true:
+    For the last `past_days + test_days` period, train on the first `past_days` and
+    predict the next `test_days`. Convert predictions and ground truth to binary labels
+    (1 = increase vs last training value, 0 = not increase). Compute accuracy, precision,
+    recall and f1. Returns None if insufficient data.
+    """
+    backtest = _backtest(user, metric_field, past_days, test_days, backtest)
+    if backtest is None:
         return None
+    return backtest.direction_metrics()
 
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
-
-    mae = np.mean(np.abs(y_true - y_pred))
-    rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
-
-    if plot:
-        plt.figure(figsize=(8,4))
-        plt.plot(preds['dates'], y_pred, label='Predicted Weight')
-        plt.plot(preds['dates'], [actual_weights.get(d, np.nan) for d in preds['dates']], label='Actual Weight')
-        plt.title('Weight Prediction')
-        plt.xlabel('Date')
-        plt.ylabel('Weight (kg)')
-        plt.legend()
-        plt.show()
 
-    return {'mae': round(mae,2), 'rmse': round(rmse,2)}
+def _metric_evaluations(user, metrics, plot, backtests):
+    results = {}
+    for metric in metrics:
+        bt = backtests.get(metric)
+        res = evaluate_metric(user, metric, plot=plot, backtest=bt) if bt else None
+        dir_res = bt.direction_metrics() if bt else None
+        # include direction (classification) metrics alongside regression metrics
+        results[metric] = {
+            'regression': res,
+            'direction_classification': dir_res
+        }
+    return results
 
 
-def evaluate_user(user, metrics=None, past_days=30, test_days=7, predict_days=14, plot=False):
+def evaluate_user(user, metrics=None, past_days=30, test_days=7, predict_days=14, plot=False, backtests=None):
     """
-    Evaluate all metrics and weight/BMI for a user.
-    Returns a dict with metric evaluations and weight/BMI evaluation.
+    Evaluate the regression and direction metrics of a user's numeric metrics.
+    Returns {'metrics': {metric: {'regression', 'direction_classification'}}}.
+    `backtests` (from load_backtests) lets callers share fitted splits with evaluate_overall.
+    Evaluations as of now are cached until the user's data revision moves.
     """
     results = {}
 
     # evaluate numeric metrics
     if metrics:
-        results['metrics'] = {}
-        for metric in metrics:
-            res = evaluate_metric(user, metric, past_days=past_days, test_days=test_days, plot=plot)
-            dir_res = evaluate_direction_metrics(user, metric, past_days=past_days, test_days=test_days)
-            # include direction (classification) metrics alongside regression metrics
-            results['metrics'][metric] = {
-                'regression': res,
-                'direction_classification': dir_res
-            }
-
-    # evaluate weight/BMI
-    results['weight_bmi'] = evaluate_weight_bmi(user, past_days=past_days, predict_days=predict_days, plot=plot)
+        if backtests is not None or plot:
+            if backtests is None:
+                backtests = load_backtests(user, metrics, past_days=past_days, test_days=test_days)
+            results['metrics'] = _metric_evaluations(user, metrics, plot, backtests)
+        else:
+            today = timezone.now().date()
+            key = (
+                f"{FORECAST_CACHE_PREFIX}:evaluation:{user.id}:{','.join(metrics)}:"
+                f"{past_days}:{test_days}:{today}:{data_revision(user)}"
+            )
+            results['metrics'] = cached_result(key, lambda: _metric_evaluations(
+                user, metrics, False, load_backtests(user, metrics, past_days=past_days, test_days=test_days)
+            ))
 
     return results
 
 
-def evaluate_overall(user, metrics=None, past_days=30, test_days=7, predict_days=14, plot=False):
+def evaluate_overall(user, metrics=None, past_days=30, test_days=7, predict_days=14, plot=False, backtests=None):
     """Aggregate performance across multiple metrics.
 
     Returns a summary dict with averaged regression metrics (MAE, RMSE)
     and averaged classification metrics (accuracy, precision, recall, f1).
     Only metrics with available results are included in the averages.
+    Pass the `backtests` used for evaluate_user to avoid refitting.
     """
     if metrics is None:
         metrics = ['steps', 'calories_intake', 'sleep_hours']
@@ -222,9 +203,13 @@ def evaluate_overall(user, metrics=None, past_days=30, test_days=7, predict_days
     cls_f1 = []
     counted_metrics = 0
 
+    if backtests is None:
+        backtests = load_backtests(user, metrics, past_days=past_days, test_days=test_days)
+
     for metric in metrics:
-        reg = evaluate_metric(user, metric, past_days=past_days, test_days=test_days, plot=False)
-        cls = evaluate_direction_metrics(user, metric, past_days=past_days, test_days=test_days)
+        bt = backtests.get(metric)
+        reg = bt.regression_metrics() if bt else None
+        cls = bt.direction_metrics() if bt else None
 
         if reg is None and cls is None:
             continue
@@ -286,6 +271,60 @@ def evaluate_overall(user, metrics=None, past_days=30, test_days=7, predict_days
     return summary
 
 
+# training windows (days) and horizons (days ahead) tried by grid_search_windows
+WINDOW_GRID = (7, 14, 21, 30, 45, 60, 90)
+HORIZON_GRID = (1, 3, 7, 14)
+
+
+def _cumulative_mae(scores, horizon):
+    rows = [row for row in scores[:horizon] if row['n']]
+    n = sum(row['n'] for row in rows)
+    return round(sum(row['mae'] * row['n'] for row in rows) / n, 4) if n else None
+
+
+def grid_search_windows(metrics, past_days_options=WINDOW_GRID, horizons=HORIZON_GRID, days=365, end=None, user_ids=None):
+    """Backtest the trend forecast for every (past_days, horizon) pair of each metric.
+
+    Loads the last `days` days of all users once and scores every training window from
+    shared prefix sums, on the same target days (see backtest.window_grid).
+    Returns {metric: {'users': count, 'grid': {past_days: {horizon: mae}}}}, where the
+    MAE for a horizon covers every forecast 1..horizon days ahead.
+    """
+    from .backtest import load_panel, window_grid
+
+    end = end or timezone.now().date()
+    ids, panels = load_panel(metrics, end - timedelta(days=days - 1), end, user_ids=user_ids)
+    results = {}
+    for metric in metrics:
+        grid = window_grid(panels[metric], past_days_options, horizon=max(horizons))
+        results[metric] = {
+            'users': len(ids),
+            'grid': {
+                p: {h: _cumulative_mae(scores, h) for h in horizons if h <= len(scores)}
+                for p, scores in grid.items()
+            },
+        }
+    return results
+
+
+def recommend_windows(search, horizon=7):
+    """The past_days with the lowest MAE at `horizon`, per metric of grid_search_windows output.
+
+    Ties go to the window closest to DEFAULT_PAST_DAYS. Returns
+    {metric: {'past_days', 'horizon', 'mae', 'users'}}, leaving out metrics
+    with no scored forecasts at that horizon.
+    """
+    recommended = {}
+    for metric, result in search.items():
+        scored = [(maes[horizon], p) for p, maes in result['grid'].items() if maes.get(horizon) is not None]
+        if not scored:
+            continue
+        # on ties prefer the window closest to the default
+        mae, past_days = min(scored, key=lambda item: (item[0], abs(item[1] - DEFAULT_PAST_DAYS)))
+        recommended[metric] = {'past_days': past_days, 'horizon': horizon, 'mae': mae, 'users': result['users']}
+    return recommended
+
+
 def plot_overall(summary, out_path=None):
     """Create and save a bar chart summarizing overall performance.
 
@@ -330,6 +369,7 @@ def plot_overall(summary, out_path=None):
         return None
 
     try:
+        import matplotlib.pyplot as plt
         fig, axes = plt.subplots(1, 2, figsize=(12, 5))
         # regression
         if reg_names:
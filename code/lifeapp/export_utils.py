@@ -0,0 +1,79 @@
+"""Streaming export of a user's history as CSV or NDJSON.
+
+Rows are read with `values_list(...).iterator(chunk_size)` and encoded one at a
+time, so memory stays flat and the first bytes go out before the whole table has
+been read.
+"""
+import csv
+import json
+from datetime import date, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import HealthLog, NutritionEntry, Goal, Recommendation
+
+EXPORT_CHUNK_SIZE = 2000
+
+# dataset name -> (model, exported columns)
+EXPORT_DATASETS = {
+    'health_logs': (HealthLog, [
+        'date', 'calories_intake', 'protein', 'carbs', 'fats', 'water_intake', 'steps',
+        'exercise_duration', 'exercise_type', 'sleep_hours', 'heart_rate',
+        'blood_pressure_sys', 'blood_pressure_dia', 'mood', 'notes', 'created_at', 'updated_at',
+    ]),
+    'nutrition_entries': (NutritionEntry, [
+        'created_at', 'meal_type', 'calories', 'water', 'protein', 'carbs', 'fat', 'fiber', 'notes',
+    ]),
+    'goals': (Goal, [
+        'goal_type', 'target_value', 'current_value', 'deadline', 'is_achieved', 'created_at',
+    ]),
+    'recommendations': (Recommendation, [
+        'created_at', 'category', 'priority', 'title', 'message', 'is_read',
+    ]),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands back the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(user_id, dataset, chunk_size=None):
+    """Yield value tuples of one dataset for a user, oldest first, `chunk_size` rows
+    (default EXPORT_CHUNK_SIZE) per fetch."""
+    model, fields = EXPORT_DATASETS[dataset]
+    rows = model.objects.filter(user_id=user_id).order_by('pk').values_list(*fields)
+    return rows.iterator(chunk_size=chunk_size or EXPORT_CHUNK_SIZE)
+
+
+def _cell(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(user_id, dataset, chunk_size=None):
+    """Yield one dataset as CSV lines, header first."""
+    _, fields = EXPORT_DATASETS[dataset]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in iter_rows(user_id, dataset, chunk_size):
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def iter_ndjson(user_id, datasets=None, chunk_size=None):
+    """Yield one JSON object per line for each row of `datasets` (default: all),
+    tagged with its dataset name under "type"."""
+    for dataset in datasets or EXPORT_DATASETS:
+        _, fields = EXPORT_DATASETS[dataset]
+        for row in iter_rows(user_id, dataset, chunk_size):
+            record = {'type': dataset}
+            record.update(zip(fields, row))
+            yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,339 @@
+from datetime import timedelta
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Avg, Case, Count, F, FloatField, Q, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache_utils import invalidate_dashboard_cache
+from .models import HealthLog, Goal
+
+# HealthLog columns the suggestions look at
+SUGGESTION_FIELDS = ['steps', 'sleep_hours', 'water_intake', 'exercise_duration']
+
+# goal type -> HealthLog field whose daily average is the goal's progress
+GOAL_PROGRESS_FIELDS = {
+    'steps': 'steps',
+    'exercise': 'exercise_duration',
+    'sleep': 'sleep_hours',
+    'water': 'water_intake',
+}
+
+
+def goal_stats(user, today=None):
+    """Goal counts for the goals page (total, active, achieved, deadlines within a week) in one query."""
+    today = today or timezone.now().date()
+    active = Q(is_achieved=False)
+    return Goal.objects.filter(user=user).aggregate(
+        total_goals=Count('id'),
+        active_goals=Count('id', filter=active),
+        achieved_goals=Count('id', filter=Q(is_achieved=True)),
+        upcoming_deadlines=Count('id', filter=active & Q(deadline__lte=today + timedelta(days=7))),
+    )
+
+
+def _progress_expression():
+    """Average, per goal, of the HealthLog field matching its type, over the logs
+    dated from the goal's creation up to its deadline."""
+    value = Case(
+        *[When(goal_type=goal_type, then=F(f'user__health_logs__{field}'))
+          for goal_type, field in GOAL_PROGRESS_FIELDS.items()],
+        output_field=FloatField(),
+    )
+    in_window = Q(
+        user__health_logs__date__gte=TruncDate('created_at'),
+        user__health_logs__date__lte=F('deadline'),
+    )
+    return Avg(value, filter=in_window)
+
+
+def _save_progress(goals, batch_size):
+    Goal.objects.bulk_update(goals, ['current_value', 'is_achieved'], batch_size=batch_size)
+    # bulk_update sends no signals
+    for user_id in {goal.user_id for goal in goals}:
+        invalidate_dashboard_cache(user_id)
+
+
+def recompute_goal_progress(user_ids=None, batch_size=500):
+    """Set current_value (and is_achieved) of active goals from logged data.
+
+    Covers the goal types in GOAL_PROGRESS_FIELDS, for all users or the given ids,
+    with one grouped query and a bulk_update per `batch_size` changed goals. Goals
+    whose progress was entered by hand, and goals without logs in their window,
+    keep their value. Returns the number of goals changed.
+    """
+    goals = Goal.objects.filter(
+        is_achieved=False, progress_source='logs', goal_type__in=list(GOAL_PROGRESS_FIELDS)
+    )
+    if user_ids is not None:
+        goals = goals.filter(user_id__in=user_ids)
+    goals = (
+        goals.only('id', 'user_id', 'target_value', 'current_value', 'is_achieved')
+        .annotate(progress=_progress_expression())
+        .order_by()
+    )
+
+    count = 0
+    changed = []
+    for goal in goals.iterator(chunk_size=batch_size):
+        if goal.progress is None:
+            continue
+        current_value = round(goal.progress, 2)
+        is_achieved = current_value >= goal.target_value
+        if current_value == goal.current_value and not is_achieved:
+            continue
+        goal.current_value = current_value
+        goal.is_achieved = is_achieved
+        changed.append(goal)
+        if len(changed) == batch_size:
+            _save_progress(changed, batch_size)
+            count += len(changed)
+            changed = []
+    if changed:
+        _save_progress(changed, batch_size)
+        count += len(changed)
+    return count
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+class GoalSuggestionEngine:
+    """Suggest goals from a user's recent activity.
+
+    Reads the user's last `window` logs once; "recent" statistics cover the newest
+    `recent_days` of them and "past" statistics the rest.
+    """
+
+    def __init__(self, user, recent_days=7, window=30):
+        self.user = user
+        self.recent_days = recent_days
+        self.window = window
+        rows = HealthLog.objects.filter(user=user).order_by('-date').values_list(*SUGGESTION_FIELDS)[:window]
+        self.logs = [dict(zip(SUGGESTION_FIELDS, row)) for row in rows]
+        self.recent = self._stats(self.logs[:recent_days])
+        self.past = self._stats(self.logs[recent_days:])
+
+    @staticmethod
+    def _stats(logs):
+        return {
+            'avg_steps': _mean([log['steps'] for log in logs]),
+            'max_steps': max((log['steps'] for log in logs), default=None),
+            'avg_sleep': _mean([log['sleep_hours'] for log in logs]),
+            'avg_water': _mean([log['water_intake'] for log in logs]),
+            'avg_exercise': _mean([log['exercise_duration'] for log in logs]),
+        }
+
+    def _profile(self):
+        try:
+            return self.user.userprofile
+        except (AttributeError, ObjectDoesNotExist):
+            return None
+
+    def suggestions(self):
+        """Return a list of {'type', 'target', 'message'} goal suggestions."""
+        if not self.logs:
+            return []
+        suggested = []
+        profile = self._profile()
+        for rule in (self._steps, self._sleep, self._water, self._exercise, self._weight, self._trend):
+            suggested.extend(rule(profile))
+        return suggested
+
+    # 1. Steps Goals
+    def _steps(self, profile):
+        avg_steps = self.recent['avg_steps']
+        max_steps = self.recent['max_steps']
+        if avg_steps and avg_steps < 10000:
+            return [{
+                'type': 'steps',
+                'target': 10000,
+                'message': 'Aim for 10,000 daily steps for better health'
+            }]
+        if max_steps and max_steps > avg_steps * 1.2:  # If max is 20% higher than average
+            return [{
+                'type': 'steps',
+                'target': int(max_steps),
+                'message': f'Challenge yourself to reach {int(max_steps)} steps again'
+            }]
+        if avg_steps:
+            new_target = int(avg_steps * 1.1)
+            return [{
+                'type': 'steps',
+                'target': new_target,
+                'message': f'Push yourself to {new_target} steps daily'
+            }]
+        return []
+
+    # 2. Sleep Goals
+    def _sleep(self, profile):
+        avg_sleep = self.recent['avg_sleep']
+        if not avg_sleep:
+            return []
+        if avg_sleep < 6:
+            return [{
+                'type': 'sleep',
+                'target': 7,
+                'message': 'Increase sleep to at least 7 hours for basic health'
+            }]
+        if avg_sleep < 7:
+            return [{
+                'type': 'sleep',
+                'target': 8,
+                'message': 'Aim for 8 hours sleep for optimal rest'
+            }]
+        if avg_sleep < 8:
+            return [{
+                'type': 'sleep',
+                'target': 8,
+                'message': 'Optimize your sleep schedule to 8 hours'
+            }]
+        return []
+
+    # 3. Water Intake Goals - Based on healthy guidelines
+    def _water(self, profile):
+        avg_water = self.recent['avg_water']
+        if not avg_water:
+            return []
+        if profile is None:
+            # If no profile, use general recommendations
+            if avg_water < 1.5:
+                return [{
+                    'type': 'water',
+                    'target': 2.0,
+                    'message': 'Increase water intake to 2L daily'
+                }]
+            if avg_water > 4.0:
+                return [{
+                    'type': 'water',
+                    'target': 3.0,
+                    'message': 'Consider reducing to 3L daily for safe hydration'
+                }]
+            return [{
+                'type': 'water',
+                'target': avg_water,
+                'message': f'Maintain current hydration of {avg_water}L daily'
+            }]
+
+        # Calculate recommended water intake based on weight and activity
+        weight_based = round(profile.weight * 0.033, 1)  # 33ml per kg body weight
+        if profile.activity_level in ['very', 'extra']:
+            recommended = min(3.7, weight_based + 1.0)  # Extra for very active
+        elif profile.activity_level == 'moderate':
+            recommended = min(3.5, weight_based + 0.5)  # Some extra for moderate
+        else:
+            recommended = min(3.0, weight_based)  # Base recommendation
+        # Round to nearest 0.1L
+        recommended = round(recommended, 1)
+
+        if avg_water < 1.5:
+            target = min(2.0, recommended)
+            return [{
+                'type': 'water',
+                'target': target,
+                'message': f'Increase water intake to {target}L daily for basic hydration'
+            }]
+        if avg_water < recommended:
+            return [{
+                'type': 'water',
+                'target': recommended,
+                'message': f'Work towards {recommended}L daily for optimal hydration'
+            }]
+        if avg_water > 4.0:  # If drinking too much
+            return [{
+                'type': 'water',
+                'target': recommended,
+                'message': f'Consider reducing to {recommended}L daily for safe hydration'
+            }]
+        # If within healthy range, maintain current level
+        return [{
+            'type': 'water',
+            'target': avg_water,
+            'message': f'Maintain healthy hydration of {avg_water}L daily'
+        }]
+
+    # 4. Exercise Duration Goals
+    def _exercise(self, profile):
+        avg_exercise = self.recent['avg_exercise']
+        if not avg_exercise:
+            return []
+        if avg_exercise < 15:
+            return [{
+                'type': 'exercise',
+                'target': 30,
+                'message': 'Build up to 30 minutes exercise daily'
+            }]
+        if avg_exercise < 30:
+            return [{
+                'type': 'exercise',
+                'target': 45,
+                'message': 'Increase exercise to 45 minutes daily'
+            }]
+        if avg_exercise < 60:
+            return [{
+                'type': 'exercise',
+                'target': 60,
+                'message': 'Work towards 60 minutes daily exercise'
+            }]
+        new_target = int(avg_exercise * 1.15)
+        return [{
+            'type': 'exercise',
+            'target': new_target,
+            'message': f'Push your workouts to {new_target} minutes'
+        }]
+
+    # 5. Weight Management Goals
+    def _weight(self, profile):
+        current_weight = getattr(profile, 'weight', None)
+        if not current_weight:
+            return []
+        target_weight = getattr(profile, 'target_weight', None)
+        if target_weight:
+            # If target weight is set, suggest goal based on that
+            weight_diff = current_weight - target_weight
+            if abs(weight_diff) > 0.5:  # If more than 0.5 kg from target
+                return [{
+                    'type': 'weight',
+                    'target': target_weight,
+                    'message': f'{"Lose" if weight_diff > 0 else "Gain"} weight to reach {target_weight}kg'
+                }]
+            return []
+        # If no target weight, suggest based on BMI
+        height_m = profile.height / 100
+        bmi = current_weight / (height_m ** 2)
+        if bmi > 25:  # Overweight
+            ideal_weight = round(23 * (height_m ** 2), 1)  # Using BMI 23 as target
+            return [{
+                'type': 'weight',
+                'target': ideal_weight,
+                'message': f'Work towards a healthy weight of {ideal_weight}kg'
+            }]
+        return []
+
+    # 6. Trend-based Goals (recent week against the rest of the window)
+    def _trend(self, profile):
+        if len(self.logs) < 14:  # If we have at least 2 weeks of data
+            return []
+        recent, past = self.recent, self.past
+        suggested = []
+        # If recent performance dropped, suggest recovery goals
+        if recent['avg_steps'] and past['avg_steps'] and recent['avg_steps'] < past['avg_steps'] * 0.9:
+            suggested.append({
+                'type': 'steps',
+                'target': int(past['avg_steps']),
+                'message': 'Get back to your usual step count'
+            })
+        if recent['avg_exercise'] and past['avg_exercise'] and recent['avg_exercise'] < past['avg_exercise'] * 0.9:
+            suggested.append({
+                'type': 'exercise',
+                'target': int(past['avg_exercise']),
+                'message': 'Return to your regular exercise duration'
+            })
+        if recent['avg_water'] and past['avg_water'] and recent['avg_water'] < past['avg_water'] * 0.9:
+            suggested.append({
+                'type': 'water',
+                'target': round(past['avg_water'], 1),
+                'message': 'Maintain your usual water intake'
+            })
+        return suggested
@@ -0,0 +1,135 @@
+"""
+Django management command to backtest the forecasters from every forecast origin.
+
+Loads the HealthLogs of all users over the last --days days in one query and scores
+every trailing --past-days window against each of the next --horizon days
+(see lifeapp.backtest), reporting MAE, RMSE, R², MAPE and direction accuracy per
+horizon and forecaster.
+
+Usage:
+    python manage.py backtest_forecasts
+    python manage.py backtest_forecasts --metric steps --days 180 --past-days 14 --horizon 14
+    python manage.py backtest_forecasts --forecaster trend mean --output backtest.json
+"""
+
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.utils import timezone
+from lifeapp.models import HealthLog
+
+METRICS = ['sleep_hours', 'steps', 'calories_intake', 'water_intake', 'exercise_duration']
+
+
+class Command(BaseCommand):
+    help = 'Walk-forward backtest of the metric forecasters across all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metric',
+            type=str,
+            default='all',
+            help='HealthLog metric to backtest, or all (default: all)',
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to backtest (default: all users)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Days of history to backtest over (default: 365)',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day of history, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--past-days',
+            type=int,
+            default=30,
+            help='Training window before each forecast origin (default: 30)',
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=7,
+            help='Days ahead to score (default: 7)',
+        )
+        parser.add_argument(
+            '--forecaster',
+            nargs='+',
+            default=['trend', 'mean', 'last'],
+            help='Forecasters to compare; the first is the baseline for MAE differences (default: trend mean last)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Also write the results to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        from lifeapp.backtest import FORECASTERS, backtest_metrics
+
+        metrics = METRICS if options['metric'] == 'all' else [options['metric']]
+        columns = {f.name for f in HealthLog._meta.concrete_fields}
+        unknown = [m for m in metrics if m not in columns] + [f for f in options['forecaster'] if f not in FORECASTERS]
+        if unknown:
+            self.stdout.write(self.style.ERROR(f'Unknown metric or forecaster: {", ".join(unknown)}'))
+            return
+        if options['days'] <= options['past_days']:
+            self.stdout.write(self.style.ERROR('--days must be larger than --past-days'))
+            return
+
+        user_ids = None
+        if options['user']:
+            user_ids = list(User.objects.filter(username=options['user']).values_list('id', flat=True))
+            if not user_ids:
+                self.stdout.write(self.style.ERROR(f'User "{options["user"]}" not found'))
+                return
+
+        end = options['end'] or timezone.now().date()
+        started = time.monotonic()
+        results = backtest_metrics(
+            metrics, end, days=options['days'], past_days=options['past_days'],
+            horizon=options['horizon'], forecasters=options['forecaster'], user_ids=user_ids,
+        )
+        elapsed = time.monotonic() - started
+
+        for metric, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{metric.upper()} ({result["users"]} users)'))
+            self.stdout.write(
+                f'  {"h":>3} {"forecaster":<10} {"n":>9} {"MAE":>10} {"±se":>8} {"RMSE":>10} '
+                f'{"R²":>8} {"MAPE":>8} {"dir acc":>8} {"ΔMAE":>10}'
+            )
+            for forecaster, rows in result['results'].items():
+                for row in rows:
+                    if not row['n']:
+                        continue
+                    diff = f'{row["mae_diff"]:+.2f}±{row["mae_diff_se"]:.2f}' if 'mae_diff' in row else ''
+                    r2 = f'{row["r2"]:.4f}' if row['r2'] is not None else '-'
+                    mape = f'{row["mape"]:.2f}%' if row['mape'] is not None else '-'
+                    self.stdout.write(
+                        f'  {row["horizon"]:>3} {forecaster:<10} {row["n"]:>9} {row["mae"]:>10.2f} '
+                        f'{row["mae_se"]:>8.2f} {row["rmse"]:>10.2f} {r2:>8} {mape:>8} '
+                        f'{row["direction_accuracy"]:>8.4f} {diff:>10}'
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'end': end.isoformat(),
+                    'days': options['days'],
+                    'past_days': options['past_days'],
+                    'horizon': options['horizon'],
+                    'metrics': results,
+                }, f, indent=2)
+            self.stdout.write(f'\nResults saved to: {options["output"]}')
+
+        self.stdout.write(self.style.SUCCESS(f'\nBacktest finished in {elapsed:.1f}s'))
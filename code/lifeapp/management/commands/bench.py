@@ -0,0 +1,224 @@
+"""
+Django management command to benchmark the web hot paths through the Django test client.
+
+Seeds a synthetic population (users x days of health logs x meals per day, see
+lifeapp.synthetic_utils) inside a transaction that is rolled back at the end, then
+requests each view as the seeded users, both with a cold cache (cleared before every
+request) and a warm one. The run uses a private local-memory cache, so the configured
+cache is never cleared. Reports p50/p95 latency, queries per request and peak Python
+memory per view, and writes the results to a JSON file that can be diffed between
+releases.
+
+Usage:
+    python manage.py bench
+    python manage.py bench --users 50 --days 365 --meals-per-day 3 --repeat 30
+    python manage.py bench --views dashboard view_logs --output before.json
+"""
+
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from lifeapp.models import Goal
+
+# swapped in for the run so clearing it can't touch a shared production cache
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'lifeapp-bench'}}
+
+# view name -> HTTP method used to request it
+BENCH_VIEWS = {
+    'dashboard': 'get',
+    'dashboard_data': 'get',
+    'nutrition_tracking': 'get',
+    'manage_goals': 'get',
+    'view_logs': 'get',
+    'view_recommendations': 'get',
+    'regenerate_recommendations': 'post',
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency, query counts and memory of the main views on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Synthetic users to create (default: 20)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Days of history per user (default: 90)',
+        )
+        parser.add_argument(
+            '--meals-per-day',
+            type=int,
+            default=3,
+            help='Nutrition entries per user per day (default: 3)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed requests per view and cache mode (default: 20)',
+        )
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=list(BENCH_VIEWS),
+            default=list(BENCH_VIEWS),
+            help='Views to benchmark (default: all)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the synthetic data (default: 0)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='bench_results.json',
+            help='JSON result file (default: bench_results.json)',
+        )
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        rng = np.random.default_rng(options['seed'])
+        started = time.monotonic()
+        try:
+            with override_settings(CACHES=BENCH_CACHES), transaction.atomic():
+                user_ids = self.seed(rng, options['users'], options['days'], options['meals_per_day'])
+                seeded = time.monotonic() - started
+                self.stdout.write(f'Seeded {len(user_ids)} users in {seeded:.1f}s')
+                results = {name: self.measure(name, user_ids, options['repeat']) for name in options['views']}
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(
+            f'\n  {"view":<28} {"cache":<5} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8} {"peak KiB":>9}'
+        )
+        for name, modes in results.items():
+            for mode, row in modes.items():
+                self.stdout.write(
+                    f'  {name:<28} {mode:<5} {row["p50_ms"]:>9.2f} {row["p95_ms"]:>9.2f} '
+                    f'{row["queries"]:>8} {row["peak_kib"]:>9.1f}'
+                )
+
+        report = {
+            'config': {key: options[key] for key in ('users', 'days', 'meals_per_day', 'repeat', 'seed')},
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': BENCH_CACHES['default']['BACKEND'],
+            },
+            'seed_seconds': round(seeded, 3),
+            'views': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'\nResults saved to: {options["output"]}; synthetic data rolled back'))
+
+    def seed(self, rng, users, days, meals_per_day):
+        from lifeapp.synthetic_utils import generate_population
+
+        tag = uuid.uuid4().hex[:8]
+        today = timezone.now().date()
+        user_ids, _ = generate_population(rng, [f'bench_{tag}_{i}' for i in range(users)], days, meals_per_day, today)
+        Goal.objects.bulk_create([
+            goal
+            for user_id in user_ids
+            for goal in (
+                Goal(user_id=user_id, goal_type='steps', target_value=10000, deadline=today + timedelta(days=30)),
+                Goal(user_id=user_id, goal_type='sleep', target_value=8, deadline=today + timedelta(days=14)),
+            )
+        ])
+
+        # the bulk inserts skip the signals that maintain summaries, recommendations and trend stats
+        from lifeapp.summary_utils import rebuild_daily_summaries
+        from lifeapp.recommendation_utils import generate_recommendations_batch
+        from lifeapp.trend_stats import rebuild_trend_stats
+        rebuild_daily_summaries(user_ids=user_ids)
+        generate_recommendations_batch(user_ids)
+        for user_id in user_ids:
+            rebuild_trend_stats(user_id)
+        return user_ids
+
+    def measure(self, name, user_ids, repeat):
+        """Time `repeat` requests of a view per cache mode, then one traced request for memory."""
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        clients = []
+        for user in User.objects.filter(id__in=user_ids[:10]):
+            client = Client(HTTP_HOST=host)
+            client.force_login(user)
+            clients.append(client)
+        url = reverse(name)
+        method = BENCH_VIEWS[name]
+
+        results = {}
+        for mode in ('cold', 'warm'):
+            cache.clear()
+            if mode == 'warm':
+                # fill every benchmarked user's cache first
+                for client in clients:
+                    getattr(client, method)(url)
+            timings, queries, statuses = [], [], set()
+            for i in range(repeat):
+                client = clients[i % len(clients)]
+                if mode == 'cold':
+                    cache.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(ctx.captured_queries))
+                statuses.add(response.status_code)
+
+            if mode == 'cold':
+                cache.clear()
+            tracemalloc.start()
+            getattr(clients[0], method)(url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[mode] = {
+                'p50_ms': round(_percentile(timings, 50), 3),
+                'p95_ms': round(_percentile(timings, 95), 3),
+                'mean_ms': round(statistics.mean(timings), 3),
+                'queries': max(queries),
+                'peak_kib': round(peak / 1024, 1),
+                'status': sorted(statuses),
+            }
+        return results
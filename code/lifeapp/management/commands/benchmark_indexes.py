@@ -0,0 +1,145 @@
+"""
+Django management command to benchmark the hot per-user list queries with and without
+the composite indexes from migration 0006 (reports EXPLAIN QUERY PLAN and median timings).
+
+Seeds synthetic users, nutrition entries, recommendations and goals inside a transaction
+that is rolled back at the end, so the database is left untouched.
+
+Usage:
+    python manage.py benchmark_indexes
+    python manage.py benchmark_indexes --users 50 --entries-per-user 5000 --repeat 50
+"""
+
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from lifeapp.models import NutritionEntry, Recommendation, Goal
+
+# name -> queryset builder for one user, mirroring the views
+QUERY_SHAPES = {
+    'recent nutrition': lambda user_id: NutritionEntry.objects.filter(user_id=user_id).order_by('-created_at')[:10],
+    'unread recommendations': lambda user_id: Recommendation.objects.filter(user_id=user_id, is_read=False).order_by('-created_at')[:5],
+    'top recommendations': lambda user_id: Recommendation.objects.filter(user_id=user_id, is_read=False).order_by('-priority', '-created_at')[:2],
+    'active goals': lambda user_id: Goal.objects.filter(user_id=user_id, is_achieved=False).order_by('deadline'),
+}
+
+BENCHMARKED_MODELS = [NutritionEntry, Recommendation, Goal]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare query plans and timings of the hot list queries with and without composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Synthetic users to create (default: 20)',
+        )
+        parser.add_argument(
+            '--entries-per-user',
+            type=int,
+            default=5000,
+            help='Nutrition entries per user; recommendations and goals get a tenth of that (default: 5000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=30,
+            help='Timed runs per query shape (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user_ids = self.seed(options['users'], options['entries_per_user'])
+                after = self.measure(user_ids, options['repeat'], 'with indexes')
+                self.drop_indexes()
+                before = self.measure(user_ids, options['repeat'], 'without indexes')
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        for name in QUERY_SHAPES:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('without indexes', before), ('with indexes', after)):
+                plan, median_ms = results[name]
+                self.stdout.write(f'  {label}: median {median_ms:.3f} ms')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; synthetic data rolled back'))
+
+    def seed(self, users, entries_per_user):
+        tag = uuid.uuid4().hex[:8]
+        User.objects.bulk_create(User(username=f'bench_{tag}_{i}') for i in range(users))
+        user_ids = list(User.objects.filter(username__startswith=f'bench_{tag}_').values_list('id', flat=True))
+
+        now = timezone.now()
+        today = now.date()
+        per_user = max(1, entries_per_user // 10)
+        for user_id in user_ids:
+            NutritionEntry.objects.bulk_create(
+                (NutritionEntry(
+                    user_id=user_id, meal_type=random.choice(['breakfast', 'lunch', 'dinner', 'snack']),
+                    calories=random.randint(100, 900), water=random.randint(0, 500),
+                ) for _ in range(entries_per_user)),
+                batch_size=1000
+            )
+            Recommendation.objects.bulk_create(
+                (Recommendation(
+                    user_id=user_id, category='lifestyle', priority=random.choice(['high', 'medium', 'low']),
+                    title='Benchmark', message='Synthetic recommendation', is_read=random.random() < 0.9,
+                ) for _ in range(per_user)),
+                batch_size=1000
+            )
+            Goal.objects.bulk_create(
+                (Goal(
+                    user_id=user_id, goal_type='steps', target_value=10000,
+                    deadline=today + timedelta(days=random.randint(-365, 365)), is_achieved=random.random() < 0.8,
+                ) for _ in range(per_user)),
+                batch_size=1000
+            )
+        # auto_now_add ignores the value passed to the constructor; spread entries over time
+        for user_id in user_ids:
+            ids = list(NutritionEntry.objects.filter(user_id=user_id).values_list('id', flat=True))
+            entries = [NutritionEntry(id=pk, created_at=now - timedelta(minutes=i * 90)) for i, pk in enumerate(ids)]
+            NutritionEntry.objects.bulk_update(entries, ['created_at'], batch_size=1000)
+        return user_ids
+
+    def explain(self, qs, label):
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # the label keeps SQLite from reusing a statement prepared before the indexes were dropped
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql} -- {label}', params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def measure(self, user_ids, repeat, label):
+        results = {}
+        for name, build in QUERY_SHAPES.items():
+            plan = self.explain(build(user_ids[0]), label)
+            timings = []
+            for _ in range(repeat):
+                qs = build(random.choice(user_ids))
+                start = time.perf_counter()
+                list(qs)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (plan, statistics.median(timings))
+        return results
+
+    def drop_indexes(self):
+        # plain DDL: the schema editor refuses to run inside atomic() on SQLite
+        with connection.cursor() as cursor:
+            for model in BENCHMARKED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
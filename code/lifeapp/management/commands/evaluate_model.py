@@ -1,19 +1,231 @@
 """
 Django management command to evaluate ML model performance.
 
+Users are evaluated in chunks: each chunk streams its HealthLog and NutritionEntry
+rows with one query per table, and chunks can run in parallel worker processes.
+Every evaluated user is appended to the output file as one JSON line as soon as
+its chunk finishes, so an interrupted run can be continued with --resume.
+
 Usage:
     python manage.py evaluate_model
     python manage.py evaluate_model --user username
     python manage.py evaluate_model --metric sleep_hours
+    python manage.py evaluate_model --workers 4 --chunk-size 500 --output results.jsonl --resume
 """
 
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from itertools import groupby
+
+import django
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Count
 from django.utils import timezone
-from datetime import timedelta
-from lifeapp.models import HealthLog, NutritionEntry
-from lifeapp.ml import predict_metric, predict_weight_bmi
-import json
+from lifeapp.models import HealthLog, NutritionEntry, UserProfile
+from lifeapp.summary_utils import day_bounds
+
+METRICS = ['sleep_hours', 'steps', 'calories_intake', 'water_intake', 'exercise_duration']
+
+# days of history before the test period used for training
+TRAIN_DAYS = 30
+
+# rows fetched per round trip when streaming a chunk's logs
+STREAM_CHUNK_SIZE = 2000
+
+
+def _day_values(rows, index, origin):
+    """(days after `origin`, value) of the numeric values at `index` of (date, ...) rows."""
+    days, values = [], []
+    for row in rows:
+        val = row[index]
+        if val is not None:
+            try:
+                values.append(float(val))
+            except (TypeError, ValueError):
+                continue
+            days.append((row[0] - origin).days)
+    return days, values
+
+
+def evaluate_metric_prediction(username, logs, metric_field, index, train_end, today):
+    """Evaluate prediction accuracy for a specific metric.
+
+    `logs` are the user's (date, *metric values) rows ordered by date, and `index`
+    is the position of `metric_field` in them.
+    """
+    import numpy as np
+    from lifeapp.trend import fit_trend, predict_trend
+
+    # Get actual values for the test period
+    test_days, actual_values = _day_values([row for row in logs if train_end < row[0] <= today], index, train_end)
+    if len(actual_values) < 3:
+        return None
+
+    # Training data: the TRAIN_DAYS days up to train_end
+    train_start = train_end - timedelta(days=TRAIN_DAYS - 1)
+    xs, ys = _day_values([row for row in logs if train_start <= row[0] <= train_end], index, train_end)
+    if len(ys) < 3:
+        return None
+
+    # Train model
+    slope, intercept, _ = fit_trend(np.array(xs, dtype=float), np.array(ys))
+
+    # Predict each test day from its calendar distance to the end of training
+    predictions = predict_trend(slope, intercept, test_days)[:, 0]
+
+    # Calculate metrics
+    actual = np.array(actual_values)
+    mae = np.mean(np.abs(actual - predictions))
+    mse = np.mean((actual - predictions) ** 2)
+    rmse = np.sqrt(mse)
+
+    # Calculate R² score
+    ss_res = np.sum((actual - predictions) ** 2)
+    ss_tot = np.sum((actual - np.mean(actual)) ** 2)
+    r2 = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
+
+    # Calculate MAPE (Mean Absolute Percentage Error); zero actuals make it undefined
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = np.mean(np.abs((actual - predictions) / actual)) * 100
+    mape = mape if not np.isnan(mape) and not np.isinf(mape) else 0
+
+    return {
+        'user': username,
+        'metric': metric_field,
+        'mae': float(mae),
+        'rmse': float(rmse),
+        'r2': float(r2),
+        'mape': float(mape),
+        'n_predictions': len(actual_values),
+        'n_training': len(ys)
+    }
+
+
+def evaluate_weight_bmi_prediction(username, entries, train_end, today):
+    """Evaluate weight/BMI prediction accuracy from the user's (date, calories) entries."""
+    test_entries = [calories for day, calories in entries if train_end < day <= today]
+    if len(test_entries) < 3:
+        return None
+
+    # Calculate actual average calories during test period
+    actual_calories = [float(calories) for calories in test_entries if calories]
+    if not actual_calories:
+        return None
+    avg_actual_calories = sum(actual_calories) / len(actual_calories)
+
+    # Get predicted calories (using training data)
+    train_start = train_end - timedelta(days=TRAIN_DAYS - 1)
+    predicted_calories = [float(calories) for day, calories in entries if train_start <= day <= train_end and calories]
+    if not predicted_calories:
+        return None
+    avg_predicted_calories = sum(predicted_calories) / len(predicted_calories)
+
+    # Calculate error
+    calorie_error = abs(avg_actual_calories - avg_predicted_calories)
+    calorie_error_pct = (calorie_error / avg_actual_calories * 100) if avg_actual_calories > 0 else 0
+
+    return {
+        'user': username,
+        'avg_predicted_calories': float(avg_predicted_calories),
+        'avg_actual_calories': float(avg_actual_calories),
+        'calorie_error': float(calorie_error),
+        'calorie_error_pct': float(calorie_error_pct)
+    }
+
+
+def evaluate_chunk(users, metrics, test_days, today):
+    """Evaluate a chunk of (user id, username) pairs; returns one result dict per user.
+
+    Costs one query each for log counts, profiles, HealthLog rows and NutritionEntry
+    rows, whatever the chunk size.
+    """
+    user_ids = [user_id for user_id, _ in users]
+    train_end = today - timedelta(days=test_days)
+    train_start = train_end - timedelta(days=TRAIN_DAYS - 1)
+
+    log_counts = dict(
+        HealthLog.objects.filter(user_id__in=user_ids).order_by()
+        .values_list('user_id').annotate(n=Count('id'))
+    )
+    with_profile = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+
+    logs = {}
+    if metrics:
+        rows = (
+            HealthLog.objects.filter(user_id__in=user_ids, date__gte=train_start, date__lte=today)
+            .order_by('user_id', 'date')
+            .values_list('user_id', 'date', *metrics)
+            .iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+        for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+            logs[user_id] = [row[1:] for row in user_rows]
+
+    entries = {}
+    rows = (
+        NutritionEntry.objects.filter(
+            user_id__in=list(with_profile),
+            created_at__gte=day_bounds(train_start)[0],
+            created_at__lt=day_bounds(today)[1],
+        )
+        .order_by()
+        .values_list('user_id', 'created_at', 'calories')
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    for user_id, created_at, calories in rows:
+        entries.setdefault(user_id, []).append((timezone.localtime(created_at).date(), calories))
+
+    results = []
+    for user_id, username in users:
+        total_logs = log_counts.get(user_id, 0)
+        result = {'user_id': user_id, 'user': username, 'metrics': {}, 'weight_bmi': None}
+        if total_logs < test_days + 7:
+            result['skipped'] = f'insufficient data (need at least {test_days + 7} logs, has {total_logs})'
+            results.append(result)
+            continue
+
+        user_logs = logs.get(user_id, [])
+        for index, metric_name in enumerate(metrics, start=1):
+            metric_result = evaluate_metric_prediction(username, user_logs, metric_name, index, train_end, today)
+            if metric_result:
+                result['metrics'][metric_name] = metric_result
+        if user_id in with_profile:
+            result['weight_bmi'] = evaluate_weight_bmi_prediction(username, entries.get(user_id, []), train_end, today)
+        results.append(result)
+    return results
+
+
+def _run_chunk(users, metrics, test_days, today):
+    results = evaluate_chunk(users, metrics, test_days, today)
+    connections.close_all()
+    return results
+
+
+def _load_results(path):
+    """Return the result dicts already in a JSON Lines output file (skipping a torn last line)."""
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return results
+
+
+def _ends_mid_line(path):
+    """True when an interrupted run left a partial last line in `path`."""
+    if not os.path.getsize(path):
+        return False
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
 
 
 class Command(BaseCommand):
@@ -37,232 +249,141 @@ class Command(BaseCommand):
             default=7,
             help='Number of days to use for testing (default: 7)',
         )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='model_evaluation_results.jsonl',
+            help='JSON Lines file receiving one result per user (default: model_evaluation_results.jsonl)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip users already in the output file and append to it',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Users per chunk (default: 500)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes evaluating chunks in parallel (default: 1)',
+        )
 
     def handle(self, *args, **options):
         username = options.get('user')
         metric = options.get('metric')
         test_days = options.get('days')
+        output_file = options['output']
+        self.verbose = options['verbosity'] >= 2
 
         self.stdout.write(self.style.SUCCESS('\n=== ML Model Performance Evaluation ===\n'))
 
         # Get users to evaluate
+        users = User.objects.order_by('id')
         if username:
-            users = User.objects.filter(username=username)
+            users = users.filter(username=username)
             if not users.exists():
                 self.stdout.write(self.style.ERROR(f'User "{username}" not found'))
                 return
-        else:
-            users = User.objects.all()
 
         # Metrics to evaluate
         if metric == 'all':
-            metrics = ['sleep_hours', 'steps', 'calories_intake', 'water_intake', 'exercise_duration']
+            metrics = list(METRICS)
         else:
             metrics = [metric]
-
-        total_results = {
-            'users_evaluated': 0,
-            'metrics': {},
-            'weight_bmi_predictions': []
-        }
-
-        for user in users:
-            self.stdout.write(f'\nEvaluating user: {user.username}')
-            
-            # Check if user has enough data
-            total_logs = HealthLog.objects.filter(user=user).count()
-            if total_logs < test_days + 7:
-                self.stdout.write(self.style.WARNING(
-                    f'  Skipping {user.username}: insufficient data (need at least {test_days + 7} logs, has {total_logs})'
-                ))
-                continue
-
-            total_results['users_evaluated'] += 1
-
-            # Evaluate metric predictions
-            for metric_name in metrics:
-                result = self.evaluate_metric_prediction(user, metric_name, test_days)
-                if result:
-                    if metric_name not in total_results['metrics']:
-                        total_results['metrics'][metric_name] = []
-                    total_results['metrics'][metric_name].append(result)
-
-            # Evaluate weight/BMI predictions
-            weight_result = self.evaluate_weight_bmi_prediction(user, test_days)
-            if weight_result:
-                total_results['weight_bmi_predictions'].append(weight_result)
-
-        # Display summary
-        self.display_summary(total_results)
-
-    def evaluate_metric_prediction(self, user, metric_field, test_days):
-        """Evaluate prediction accuracy for a specific metric."""
-        today = timezone.now().date()
-        
-        # Use data up to test_days ago for training
-        train_end = today - timedelta(days=test_days)
-        
-        # Get actual values for the test period
-        test_logs = HealthLog.objects.filter(
-            user=user,
-            date__gt=train_end,
-            date__lte=today
-        ).order_by('date')
-
-        actual_values = []
-        actual_dates = []
-        for log in test_logs:
-            val = getattr(log, metric_field, None)
-            if val is not None:
-                try:
-                    actual_values.append(float(val))
-                    actual_dates.append(log.date)
-                except:
-                    pass
-
-        if len(actual_values) < 3:
-            return None
-
-        # Make predictions using data before train_end
-        # Temporarily filter to simulate past data
         try:
-            from sklearn.linear_model import LinearRegression
-            import numpy as np
+            import numpy  # noqa: F401
         except ImportError:
-            self.stdout.write(self.style.WARNING(
-                f'  Skipping {metric_field}: sklearn not installed'
-            ))
-            return None
-
-        # Get training data
-        train_start = train_end - timedelta(days=30)
-        train_logs = HealthLog.objects.filter(
-            user=user,
-            date__gte=train_start,
-            date__lte=train_end
-        ).order_by('date')
-
-        xs = []
-        ys = []
-        for i, log in enumerate(train_logs):
-            val = getattr(log, metric_field, None)
-            if val is not None:
-                try:
-                    xs.append([i])
-                    ys.append(float(val))
-                except:
-                    pass
-
-        if len(ys) < 3:
-            return None
-
-        # Train model
-        X = np.array(xs)
-        y = np.array(ys)
-        model = LinearRegression()
-        model.fit(X, y)
-
-        # Make predictions
-        last_index = X[-1][0]
-        pred_indices = np.array([[last_index + i + 1] for i in range(len(actual_values))])
-        predictions = model.predict(pred_indices)
-
-        # Calculate metrics
-        mae = np.mean(np.abs(np.array(actual_values) - predictions))
-        mse = np.mean((np.array(actual_values) - predictions) ** 2)
-        rmse = np.sqrt(mse)
-        
-        # Calculate R² score
-        ss_res = np.sum((np.array(actual_values) - predictions) ** 2)
-        ss_tot = np.sum((np.array(actual_values) - np.mean(actual_values)) ** 2)
-        r2 = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-
-        # Calculate MAPE (Mean Absolute Percentage Error)
-        mape = np.mean(np.abs((np.array(actual_values) - predictions) / np.array(actual_values))) * 100
-        mape = mape if not np.isnan(mape) and not np.isinf(mape) else 0
-
-        self.stdout.write(f'  {metric_field}:')
-        self.stdout.write(f'    MAE: {mae:.2f}')
-        self.stdout.write(f'    RMSE: {rmse:.2f}')
-        self.stdout.write(f'    R²: {r2:.4f}')
-        self.stdout.write(f'    MAPE: {mape:.2f}%')
-
-        return {
-            'user': user.username,
-            'metric': metric_field,
-            'mae': float(mae),
-            'rmse': float(rmse),
-            'r2': float(r2),
-            'mape': float(mape),
-            'n_predictions': len(actual_values),
-            'n_training': len(ys)
-        }
+            self.stdout.write(self.style.WARNING('Skipping metric predictions: numpy not installed'))
+            metrics = []
 
-    def evaluate_weight_bmi_prediction(self, user, test_days):
-        """Evaluate weight/BMI prediction accuracy."""
-        if not hasattr(user, 'userprofile'):
-            return None
+        previous = _load_results(output_file) if options['resume'] else []
+        done_ids = {result['user_id'] for result in previous}
+        pending = [user for user in users.values_list('id', 'username').iterator() if user[0] not in done_ids]
+        if previous:
+            self.stdout.write(f'Resuming: {len(done_ids)} users already in {output_file}')
 
+        chunk_size = max(1, options['chunk_size'])
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
         today = timezone.now().date()
-        train_end = today - timedelta(days=test_days)
-
-        # Get actual nutrition data for test period
-        test_entries = NutritionEntry.objects.filter(
-            user=user,
-            created_at__date__gt=train_end,
-            created_at__date__lte=today
-        )
-
-        if test_entries.count() < 3:
-            return None
+        results = list(previous)
+        started = time.monotonic()
+
+        with open(output_file, 'a' if options['resume'] else 'w') as out:
+            if options['resume'] and _ends_mid_line(output_file):
+                out.write('\n')
+            for done, chunk_results in enumerate(self.run_chunks(chunks, metrics, test_days, today, options['workers']), start=1):
+                for result in chunk_results:
+                    out.write(json.dumps(result) + '\n')
+                    if self.verbose:
+                        self.report_user(result)
+                out.flush()
+                results.extend(chunk_results)
+                skipped = sum('skipped' in result for result in chunk_results)
+                self.stdout.write(
+                    f'Chunk {done}/{len(chunks)}: {len(chunk_results)} users ({skipped} skipped), '
+                    f'{len(results)} total, {time.monotonic() - started:.1f}s'
+                )
 
-        # Calculate actual average calories during test period
-        actual_calories = []
-        for entry in test_entries:
-            if entry.calories:
-                actual_calories.append(float(entry.calories))
-
-        if not actual_calories:
-            return None
-
-        avg_actual_calories = sum(actual_calories) / len(actual_calories)
-
-        # Get predicted calories (using training data)
-        train_entries = NutritionEntry.objects.filter(
-            user=user,
-            created_at__date__gte=train_end - timedelta(days=30),
-            created_at__date__lte=train_end
-        )
-
-        predicted_calories = []
-        for entry in train_entries:
-            if entry.calories:
-                predicted_calories.append(float(entry.calories))
-
-        if not predicted_calories:
-            return None
-
-        avg_predicted_calories = sum(predicted_calories) / len(predicted_calories)
-
-        # Calculate error
-        calorie_error = abs(avg_actual_calories - avg_predicted_calories)
-        calorie_error_pct = (calorie_error / avg_actual_calories * 100) if avg_actual_calories > 0 else 0
-
-        self.stdout.write(f'  Weight/BMI Prediction:')
-        self.stdout.write(f'    Avg Predicted Calories: {avg_predicted_calories:.0f}')
-        self.stdout.write(f'    Avg Actual Calories: {avg_actual_calories:.0f}')
-        self.stdout.write(f'    Calorie Error: {calorie_error:.0f} ({calorie_error_pct:.1f}%)')
+        # Display summary
+        self.display_summary(results)
+        self.stdout.write(self.style.SUCCESS(f'\n\nResults saved to: {output_file}'))
 
-        return {
-            'user': user.username,
-            'avg_predicted_calories': float(avg_predicted_calories),
-            'avg_actual_calories': float(avg_actual_calories),
-            'calorie_error': float(calorie_error),
-            'calorie_error_pct': float(calorie_error_pct)
+    def run_chunks(self, chunks, metrics, test_days, today, workers):
+        """Yield the results of each chunk as it finishes."""
+        if workers > 1:
+            # don't share the parent's database connection with forked workers
+            connections.close_all()
+            # spawn and forkserver workers start without Django configured; setup() is a no-op after fork
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                futures = [pool.submit(_run_chunk, chunk, metrics, test_days, today) for chunk in chunks]
+                for future in as_completed(futures):
+                    yield future.result()
+        else:
+            for chunk in chunks:
+                yield evaluate_chunk(chunk, metrics, test_days, today)
+
+    def report_user(self, result):
+        """Print one user's results (shown with --verbosity 2)."""
+        self.stdout.write(f'\nEvaluating user: {result["user"]}')
+        if 'skipped' in result:
+            self.stdout.write(self.style.WARNING(f'  Skipping {result["user"]}: {result["skipped"]}'))
+            return
+        for metric_field, metric_result in result['metrics'].items():
+            self.stdout.write(f'  {metric_field}:')
+            self.stdout.write(f'    MAE: {metric_result["mae"]:.2f}')
+            self.stdout.write(f'    RMSE: {metric_result["rmse"]:.2f}')
+            self.stdout.write(f'    R²: {metric_result["r2"]:.4f}')
+            self.stdout.write(f'    MAPE: {metric_result["mape"]:.2f}%')
+        weight_result = result['weight_bmi']
+        if weight_result:
+            self.stdout.write(f'  Weight/BMI Prediction:')
+            self.stdout.write(f'    Avg Predicted Calories: {weight_result["avg_predicted_calories"]:.0f}')
+            self.stdout.write(f'    Avg Actual Calories: {weight_result["avg_actual_calories"]:.0f}')
+            self.stdout.write(
+                f'    Calorie Error: {weight_result["calorie_error"]:.0f} ({weight_result["calorie_error_pct"]:.1f}%)'
+            )
+
+    def display_summary(self, user_results):
+        """Display overall summary of evaluation results."""
+        results = {
+            'users_evaluated': 0,
+            'metrics': {},
+            'weight_bmi_predictions': []
         }
+        for user_result in user_results:
+            if 'skipped' in user_result:
+                continue
+            results['users_evaluated'] += 1
+            for metric_name, metric_result in user_result['metrics'].items():
+                results['metrics'].setdefault(metric_name, []).append(metric_result)
+            if user_result['weight_bmi']:
+                results['weight_bmi_predictions'].append(user_result['weight_bmi'])
 
-    def display_summary(self, results):
-        """Display overall summary of evaluation results."""
         self.stdout.write(self.style.SUCCESS('\n\n=== Evaluation Summary ===\n'))
         self.stdout.write(f'Total users evaluated: {results["users_evaluated"]}')
 
@@ -291,10 +412,3 @@ class Command(BaseCommand):
 
             self.stdout.write(f'  Average Calorie Error: {avg_error:.0f} ({avg_error_pct:.1f}%)')
             self.stdout.write(f'  Users evaluated: {len(results["weight_bmi_predictions"])}')
-
-        # Save results to JSON file
-        output_file = 'model_evaluation_results.json'
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
-        
-        self.stdout.write(self.style.SUCCESS(f'\n\nResults saved to: {output_file}'))
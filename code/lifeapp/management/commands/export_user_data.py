@@ -0,0 +1,88 @@
+"""
+Django management command to export a user's health logs, nutrition entries, goals and recommendations.
+
+Rows are streamed in chunks, so memory stays flat however long the history is.
+
+Usage:
+    python manage.py export_user_data --user username > export.ndjson
+    python manage.py export_user_data --user username --dataset nutrition_entries --format csv --output meals.csv
+    python manage.py export_user_data --user username --format csv --output export_dir/
+"""
+
+import os
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from lifeapp.export_utils import EXPORT_CHUNK_SIZE, EXPORT_DATASETS, iter_csv, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Stream a user\'s data as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            required=True,
+            help='Username to export',
+        )
+        parser.add_argument(
+            '--dataset',
+            choices=['all'] + list(EXPORT_DATASETS),
+            default='all',
+            help='Dataset to export (default: all)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            default='ndjson',
+            help='Output format (default: ndjson)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Output file, or a directory for a CSV export of all datasets (default: stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f'Rows fetched per database round trip (default: {EXPORT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        username = options['user']
+        user = User.objects.filter(username=username).first()
+        if not user:
+            # stdout may be the export itself, so report problems on stderr
+            self.stderr.write(self.style.ERROR(f'User "{username}" not found'))
+            return
+
+        dataset = options['dataset']
+        chunk_size = options['chunk_size']
+        output = options.get('output')
+        datasets = list(EXPORT_DATASETS) if dataset == 'all' else [dataset]
+
+        if options['format'] == 'ndjson':
+            self._write(output, iter_ndjson(user.id, datasets, chunk_size))
+        elif len(datasets) == 1:
+            self._write(output, iter_csv(user.id, datasets[0], chunk_size))
+        else:
+            # one CSV file per dataset
+            if not output:
+                self.stderr.write(self.style.ERROR('--output DIRECTORY is required to export all datasets as CSV'))
+                return
+            os.makedirs(output, exist_ok=True)
+            for name in datasets:
+                self._write(os.path.join(output, f'{name}.csv'), iter_csv(user.id, name, chunk_size))
+
+        if output:
+            self.stdout.write(self.style.SUCCESS(f'Exported {dataset} for {username} to {output}'))
+
+    def _write(self, path, lines):
+        if not path:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            fh.writelines(lines)
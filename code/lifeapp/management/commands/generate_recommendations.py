@@ -0,0 +1,115 @@
+"""
+Django management command to regenerate recommendations in batches.
+
+Each batch of users costs one grouped DailySummary query, one UserProfile query and
+one bulk insert, so a nightly run over every user stays fast.
+
+Usage:
+    python manage.py generate_recommendations --all
+    python manage.py generate_recommendations --all --since 2025-01-01 --batch-size 2000 --workers 4
+    python manage.py generate_recommendations --user username
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# SQLite options of the worker processes only: take the write lock when a transaction
+# starts and wait for it, so parallel batches queue instead of failing with
+# "database is locked"
+SQLITE_WORKER_OPTIONS = {'transaction_mode': 'IMMEDIATE', 'timeout': 20}
+
+
+def _init_worker():
+    # spawn and forkserver workers start without Django configured; setup() is a no-op after fork.
+    # Models are imported inside the functions so this module loads before setup().
+    django.setup()
+    for connection in connections.all():
+        if connection.vendor == 'sqlite':
+            options = dict(connection.settings_dict.get('OPTIONS', {}), **SQLITE_WORKER_OPTIONS)
+            connection.settings_dict['OPTIONS'] = options
+
+
+def _run_batch(user_ids):
+    from lifeapp.recommendation_utils import generate_recommendations_batch
+
+    count = generate_recommendations_batch(user_ids)
+    connections.close_all()
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Regenerate rule-based recommendations for many users at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate for all users',
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to regenerate for',
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='Only users with logged data on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes running batches in parallel (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+        from lifeapp.models import DailySummary
+        from lifeapp.recommendation_utils import generate_recommendations_batch
+
+        username = options.get('user')
+        if not username and not options['all']:
+            self.stdout.write(self.style.ERROR('Pass --all or --user'))
+            return
+
+        users = User.objects.all()
+        if username:
+            users = users.filter(username=username)
+        if options['since']:
+            users = users.filter(id__in=DailySummary.objects.filter(date__gte=options['since']).values('user_id'))
+        user_ids = list(users.order_by('id').values_list('id', flat=True))
+        if not user_ids:
+            self.stdout.write(self.style.WARNING('No matching users'))
+            return
+
+        batch_size = max(1, options['batch_size'])
+        batches = [user_ids[i:i + batch_size] for i in range(0, len(user_ids), batch_size)]
+
+        total = 0
+        if options['workers'] > 1:
+            # don't share the parent's database connection with forked workers
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                for done, count in enumerate(pool.map(_run_batch, batches), start=1):
+                    total += count
+                    self.stdout.write(f'Batch {done}/{len(batches)}: {count} recommendations')
+        else:
+            for done, batch in enumerate(batches, start=1):
+                count = generate_recommendations_batch(batch)
+                total += count
+                self.stdout.write(f'Batch {done}/{len(batches)}: {count} recommendations')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} recommendations for {len(user_ids)} users'
+        ))
@@ -0,0 +1,113 @@
+"""
+Django management command to fill the database with a synthetic population for load tests.
+
+Draws correlated health and nutrition series for all users with NumPy
+(see lifeapp.synthetic_utils) and writes users and profiles with bulk_create and
+HealthLogs and NutritionEntries with cursor.executemany, --batch-size users per
+transaction. Each batch also builds its users' daily summaries, recommendations
+and trend stats, which these signal-free inserts would otherwise leave missing.
+
+Usage:
+    python manage.py generate_synthetic_data
+    python manage.py generate_synthetic_data --users 10000 --days 365 --meals-per-day 3
+    python manage.py generate_synthetic_data --users 500 --seed 7 --prefix perf_ --password secret
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate synthetic users with correlated health logs and meals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Synthetic users to create (default: 1000)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Days of history per user, up to today (default: 365)',
+        )
+        parser.add_argument(
+            '--meals-per-day',
+            type=int,
+            default=3,
+            help='Nutrition entries per user per day (default: 3)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the synthetic data (default: 0)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Users generated and committed per transaction (default: 100)',
+        )
+        parser.add_argument(
+            '--prefix',
+            type=str,
+            default='synthetic_',
+            help='Username prefix; usernames are the prefix plus a number (default: synthetic_)',
+        )
+        parser.add_argument(
+            '--password',
+            type=str,
+            help='Password of every synthetic user (default: none, so they cannot log in)',
+        )
+
+    def handle(self, *args, **options):
+        import numpy as np
+        from lifeapp.recommendation_utils import generate_recommendations_batch
+        from lifeapp.summary_utils import rebuild_daily_summaries
+        from lifeapp.synthetic_utils import generate_population
+        from lifeapp.trend_stats import rebuild_trend_stats
+
+        users, days, batch_size = options['users'], options['days'], options['batch_size']
+        if users < 1 or days < 1 or batch_size < 1 or options['meals_per_day'] < 0:
+            self.stdout.write(self.style.ERROR('--users, --days and --batch-size must be positive, --meals-per-day not negative'))
+            return
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            self.stdout.write(self.style.ERROR(f'Users named "{prefix}..." already exist; choose another --prefix'))
+            return
+
+        rng = np.random.default_rng(options['seed'])
+        end = timezone.now().date()
+        totals = {'users': 0, 'health_logs': 0, 'nutrition_entries': 0}
+        started = time.monotonic()
+        for lo in range(0, users, batch_size):
+            usernames = [f'{prefix}{i}' for i in range(lo, min(lo + batch_size, users))]
+            with transaction.atomic():
+                user_ids, counts = generate_population(
+                    rng, usernames, days, options['meals_per_day'], end, password=options['password'],
+                )
+                # the raw executemany inserts skip the signals that maintain summaries, recommendations and trend stats
+                rebuild_daily_summaries(user_ids=user_ids)
+                generate_recommendations_batch(user_ids)
+                for user_id in user_ids:
+                    rebuild_trend_stats(user_id)
+            for key, count in counts.items():
+                totals[key] += count
+
+            elapsed = time.monotonic() - started
+            rows = totals['health_logs'] + totals['nutrition_entries']
+            self.stdout.write(
+                f'  {totals["users"]}/{users} users, {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nCreated {totals["users"]} users, {totals["health_logs"]} health logs and '
+            f'{totals["nutrition_entries"]} nutrition entries in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,40 @@
+"""
+Django management command to rebuild the DailySummary table from HealthLog and NutritionEntry rows.
+
+Usage:
+    python manage.py rebuild_daily_summaries
+    python manage.py rebuild_daily_summaries --user username
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from lifeapp.summary_utils import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user daily summaries from health logs and nutrition entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to rebuild (default: all users)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        username = options.get('user')
+        user_ids = None
+        if username:
+            user_ids = list(User.objects.filter(username=username).values_list('id', flat=True))
+            if not user_ids:
+                self.stdout.write(self.style.ERROR(f'User "{username}" not found'))
+                return
+
+        count = rebuild_daily_summaries(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily summaries'))
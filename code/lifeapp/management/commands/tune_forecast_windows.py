@@ -0,0 +1,115 @@
+"""
+Django management command to choose each metric's forecast training window.
+
+Backtests the trend forecast over a grid of training windows and horizons for all
+users from one data load (see evaluate_prediction.grid_search_windows), then stores
+the window with the lowest error at the dashboard's horizon in FORECAST_WINDOWS_FILE,
+where predict_metric and the dashboard pick it up.
+
+Usage:
+    python manage.py tune_forecast_windows
+    python manage.py tune_forecast_windows --metric steps --past-days 7 14 30 60 --horizons 1 7
+    python manage.py tune_forecast_windows --days 180 --dry-run
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from lifeapp.models import HealthLog
+
+
+class Command(BaseCommand):
+    help = 'Grid-search forecast training windows per metric and store the best ones'
+
+    def add_arguments(self, parser):
+        from lifeapp.trend_stats import TREND_METRICS
+
+        parser.add_argument(
+            '--metric',
+            nargs='+',
+            default=TREND_METRICS,
+            help='HealthLog metrics to tune (default: every dashboard metric)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Days of history to backtest over (default: 365)',
+        )
+        parser.add_argument(
+            '--past-days',
+            nargs='+',
+            type=int,
+            default=[7, 14, 21, 30, 45, 60, 90],
+            help='Training windows to try (default: 7 14 21 30 45 60 90)',
+        )
+        parser.add_argument(
+            '--horizons',
+            nargs='+',
+            type=int,
+            default=[1, 3, 7, 14],
+            help='Horizons to report (default: 1 3 7 14)',
+        )
+        parser.add_argument(
+            '--predict-days',
+            type=int,
+            default=7,
+            help='Horizon the stored window is chosen for; the dashboard forecasts 7 days (default: 7)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the grid and recommendations without storing them',
+        )
+
+    def handle(self, *args, **options):
+        from lifeapp.evaluate_prediction import grid_search_windows, recommend_windows
+        from lifeapp.ml import save_forecast_windows
+
+        columns = {f.name for f in HealthLog._meta.concrete_fields}
+        unknown = [m for m in options['metric'] if m not in columns]
+        if unknown:
+            self.stdout.write(self.style.ERROR(f'Unknown metric: {", ".join(unknown)}'))
+            return
+        past_days_options = sorted(set(options['past_days']))
+        if min(past_days_options) < 2 or options['days'] <= max(past_days_options) + options['predict_days']:
+            self.stdout.write(self.style.ERROR('--days must cover the longest window plus --predict-days'))
+            return
+
+        horizons = sorted(set(options['horizons']) | {options['predict_days']})
+        search = grid_search_windows(
+            options['metric'], past_days_options=past_days_options, horizons=horizons,
+            days=options['days'], end=timezone.now().date(),
+        )
+        recommended = recommend_windows(search, horizon=options['predict_days'])
+
+        for metric, result in search.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{metric.upper()} ({result["users"]} users, MAE up to each horizon)'))
+            self.stdout.write('  ' + f'{"past days":>9}' + ''.join(f'{f"h<={h}":>12}' for h in horizons))
+            best = recommended.get(metric, {}).get('past_days')
+            for p, maes in result['grid'].items():
+                cells = ''.join(f'{maes[h]:>12.3f}' if maes.get(h) is not None else f'{"-":>12}' for h in horizons)
+                marker = '  <- best' if p == best else ''
+                self.stdout.write(f'  {p:>9}{cells}{marker}')
+
+        if not recommended:
+            self.stdout.write(self.style.WARNING('\nNot enough history to recommend any window'))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('\nDry run: windows not stored'))
+            return
+
+        # keep stored windows of metrics that were not tuned this time
+        stored = {}
+        try:
+            with open(settings.FORECAST_WINDOWS_FILE) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            pass
+        for metric, entry in recommended.items():
+            stored[metric] = dict(entry, tuned_on=timezone.now().date().isoformat())
+        path = save_forecast_windows(stored)
+        summary = ', '.join(f'{metric}={entry["past_days"]}' for metric, entry in recommended.items())
+        self.stdout.write(self.style.SUCCESS(f'\nStored forecast windows in {path}: {summary}'))
@@ -0,0 +1,45 @@
+"""
+Django management command to recompute the progress of active goals from logged data.
+
+Steps, exercise, sleep and water goals take the daily average of the matching
+HealthLog field since the goal was created; goals that reach their target are
+marked achieved. Saving a log already does this for its user, so this is for
+backfills; goals whose progress was entered by hand are left alone.
+
+Usage:
+    python manage.py update_goal_progress
+    python manage.py update_goal_progress --user username
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from lifeapp.goal_utils import recompute_goal_progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute active goal progress from health logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to update (default: all users)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Goals per fetch and bulk update (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        username = options.get('user')
+        user_ids = None
+        if username:
+            user_ids = list(User.objects.filter(username=username).values_list('id', flat=True))
+            if not user_ids:
+                self.stdout.write(self.style.ERROR(f'User "{username}" not found'))
+                return
+
+        count = recompute_goal_progress(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {count} goals'))
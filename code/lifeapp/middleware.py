@@ -0,0 +1,93 @@
+import json
+import logging
+import time
+
+from django.conf import settings as dj_settings
+from django.db import connection
+
+from . import perf
+
+logger = logging.getLogger('lifeapp.perf')
+
+# section name -> Server-Timing description
+SECTION_LABELS = {
+    'ml': 'Forecasting',
+    'recommendations': 'Recommendation generation',
+    'template': 'Template render',
+}
+
+
+class PerformanceTimingMiddleware:
+    """Record SQL query count/time, forecasting, recommendation and template time per request.
+
+    Adds a `Server-Timing` header, optionally logs one JSON line per request
+    (PERF_LOG_REQUESTS) and warns when a request goes over PERF_QUERY_BUDGET queries
+    or PERF_LATENCY_BUDGET_MS milliseconds.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(dj_settings, 'PERF_TIMING_ENABLED', True):
+            return self.get_response(request)
+
+        db = {'count': 0, 'time': 0.0}
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db['count'] += 1
+                db['time'] += time.perf_counter() - start
+
+        token = perf.start_request()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(record_query):
+                response = self.get_response(request)
+        finally:
+            sections = perf.end_request(token)
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = self.server_timing(db, sections, total)
+        self.report(request, response, db, sections, total)
+        return response
+
+    def server_timing(self, db, sections, total):
+        entries = [f'db;desc="{db["count"]} queries";dur={db["time"] * 1000:.1f}']
+        for name, seconds in sorted(sections.items()):
+            label = SECTION_LABELS.get(name, name)
+            entries.append(f'{name};desc="{label}";dur={seconds * 1000:.1f}')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def report(self, request, response, db, sections, total):
+        query_budget = getattr(dj_settings, 'PERF_QUERY_BUDGET', None)
+        latency_budget = getattr(dj_settings, 'PERF_LATENCY_BUDGET_MS', None)
+        total_ms = total * 1000
+
+        over_budget = []
+        if query_budget is not None and db['count'] > query_budget:
+            over_budget.append('queries')
+        if latency_budget is not None and total_ms > latency_budget:
+            over_budget.append('latency')
+
+        if not over_budget and not getattr(dj_settings, 'PERF_LOG_REQUESTS', False):
+            return
+
+        line = json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_queries': db['count'],
+            'db_ms': round(db['time'] * 1000, 1),
+            'sections_ms': {name: round(seconds * 1000, 1) for name, seconds in sections.items()},
+            'over_budget': over_budget,
+        })
+        if over_budget:
+            logger.warning(line)
+        else:
+            logger.info(line)
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_summaries(apps, schema_editor):
+    HealthLog = apps.get_model('lifeapp', 'HealthLog')
+    NutritionEntry = apps.get_model('lifeapp', 'NutritionEntry')
+    DailySummary = apps.get_model('lifeapp', 'DailySummary')
+
+    log_fields = ['calories_intake', 'protein', 'carbs', 'fats', 'water_intake', 'steps', 'exercise_duration', 'sleep_hours']
+    meal_fields = {'meal_calories': 'calories', 'meal_water': 'water', 'meal_protein': 'protein',
+                   'meal_carbs': 'carbs', 'meal_fat': 'fat', 'meal_fiber': 'fiber'}
+
+    rows = {}
+    for values in HealthLog.objects.values('user_id', 'date', *log_fields).order_by():
+        rows[(values['user_id'], values['date'])] = {f: values[f] for f in log_fields}
+
+    daily_meals = (
+        NutritionEntry.objects.annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(meal_count=Count('id'), **{name: Sum(f) for name, f in meal_fields.items()})
+        .order_by()
+    )
+    for values in daily_meals:
+        row = rows.setdefault((values['user_id'], values['day']), {})
+        row['meal_count'] = values['meal_count']
+        for name in meal_fields:
+            row[name] = values[name] or 0
+
+    DailySummary.objects.bulk_create(
+        [DailySummary(user_id=user_id, date=day, **row) for (user_id, day), row in rows.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lifeapp', '0003_userprofile_target_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories_intake', models.IntegerField(blank=True, null=True)),
+                ('protein', models.FloatField(blank=True, null=True)),
+                ('carbs', models.FloatField(blank=True, null=True)),
+                ('fats', models.FloatField(blank=True, null=True)),
+                ('water_intake', models.FloatField(blank=True, null=True)),
+                ('steps', models.IntegerField(blank=True, null=True)),
+                ('exercise_duration', models.IntegerField(blank=True, null=True)),
+                ('sleep_hours', models.FloatField(blank=True, null=True)),
+                ('meal_count', models.PositiveIntegerField(default=0)),
+                ('meal_calories', models.PositiveIntegerField(default=0)),
+                ('meal_water', models.PositiveIntegerField(default=0, help_text='ml')),
+                ('meal_protein', models.FloatField(default=0)),
+                ('meal_carbs', models.FloatField(default=0)),
+                ('meal_fat', models.FloatField(default=0)),
+                ('meal_fiber', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lifeapp', '0005_trendstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(condition=models.Q(('is_achieved', False)), fields=['user', 'deadline'], name='goal_active_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nutritionentry',
+            index=models.Index(fields=['user', '-created_at'], name='nutrition_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-created_at'], name='rec_unread_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-priority', '-created_at'], name='rec_unread_priority_idx'),
+        ),
+    ]
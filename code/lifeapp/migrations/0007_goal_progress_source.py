@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lifeapp', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='progress_source',
+            field=models.CharField(choices=[('logs', 'Health logs'), ('manual', 'Entered manually')], default='logs', max_length=10),
+        ),
+    ]
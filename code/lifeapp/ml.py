@@ -1,73 +1,211 @@
+import json
+import os
 from datetime import timedelta
+from django.conf import settings as dj_settings
+from django.core.cache import cache
+from django.db.models import Count, Max
 from django.utils import timezone
-from .models import HealthLog
+from collections import namedtuple
+from .models import HealthLog, DailySummary, NutritionEntry
+from .perf import timed_section
 
-def predict_metric(user, metric_field, past_days=30, predict_days=7):
-    """Train a simple linear regression on the last `past_days` of `metric_field` and predict next `predict_days`.
+# Date-aligned feature matrix for forecasting (see load_metric_matrix)
+MetricMatrix = namedtuple('MetricMatrix', ['fields', 'dates', 'values', 'missing', 'today'])
 
-    Returns None if not enough data or if sklearn not available. Otherwise returns a dict:
-    { 'dates': [date1,...], 'values': [v1,...] }
-    """
+# Training window for metrics without a tuned one (see forecast_window)
+DEFAULT_PAST_DAYS = 30
+
+# (mtime, {metric: past_days}) of the last FORECAST_WINDOWS_FILE read
+_forecast_windows = (None, {})
+
+def _to_float(val):
+    if val is None:
+        return float('nan')
     try:
-        from sklearn.linear_model import LinearRegression
-        import numpy as np
+        return float(val)
     except Exception:
-        # sklearn/numpy not available
-        return None
+        return float('nan')
 
-    today = timezone.now().date()
-    start = today - timedelta(days=past_days)
-    logs = HealthLog.objects.filter(user=user, date__gte=start).order_by('date')
-    # collect (day_index, value)
-    xs = []
-    ys = []
-    for i, log in enumerate(logs):
-        val = getattr(log, metric_field, None)
-        if val is None:
-            continue
+
+def forecast_windows():
+    """{metric: past_days} chosen by `manage.py tune_forecast_windows`.
+
+    Read from FORECAST_WINDOWS_FILE and kept in memory until the file changes; empty
+    when the file is missing or unreadable.
+    """
+    global _forecast_windows
+    path = getattr(dj_settings, 'FORECAST_WINDOWS_FILE', None)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except (TypeError, OSError):
+        return {}
+    if mtime != _forecast_windows[0]:
         try:
-            v = float(val)
-        except Exception:
+            with open(path) as f:
+                windows = {metric: int(entry['past_days']) for metric, entry in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            windows = {}
+        _forecast_windows = (mtime, windows)
+    return _forecast_windows[1]
+
+
+def _window_start(today, past_days):
+    # a training window of `past_days` days ends today, like trend_stats and the backtests
+    return today - timedelta(days=past_days - 1)
+
+
+def forecast_window(metric_field):
+    """Training window (days) for forecasting `metric_field`: the tuned one, or DEFAULT_PAST_DAYS."""
+    return forecast_windows().get(metric_field, DEFAULT_PAST_DAYS)
+
+
+def save_forecast_windows(windows, path=None):
+    """Write {metric: {'past_days': int, ...}} to FORECAST_WINDOWS_FILE (or `path`)."""
+    path = path or dj_settings.FORECAST_WINDOWS_FILE
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(windows, f, indent=2, sort_keys=True)
+    # replace atomically so a web worker never reads a half-written file
+    os.replace(tmp, path)
+    return path
+
+
+def forecast_columns(Y, x, today, predict_days=7, min_points=3):
+    """Fit a trend to each column of `Y` and extend it over the `predict_days` days after `today`.
+
+    `x` holds the calendar day of each row relative to `today` (0 is today, -1
+    yesterday), so days without a log keep their place on the line, as in the trend
+    sums and the backtests. NaN marks a missing value. Returns a list with one
+    `{'dates', 'values'}` dict per column, or None for columns with fewer than
+    `min_points` values.
+    """
+    from .trend import fit_trend, predict_trend
+    import numpy as np
+
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    slope, intercept, n = fit_trend(x, Y)
+    steps = np.arange(1, predict_days + 1, dtype=float)
+
+    pred_dates = [(today + timedelta(days=i + 1)).strftime('%m-%d') for i in range(predict_days)]
+    forecasts = []
+    for col in range(Y.shape[1]):
+        if n[col] < min_points:
+            forecasts.append(None)
             continue
-        xs.append([i])
-        ys.append(v)
+        preds = predict_trend(slope[col:col + 1], intercept[col:col + 1], steps)[:, 0]
+        forecasts.append({'dates': pred_dates, 'values': [float(round(float(p), 2)) for p in preds]})
+    return forecasts
 
-    if len(ys) < 3:
-        # not enough data to train a model
-        return None
 
-    X = np.array(xs)
-    y = np.array(ys)
+@timed_section('ml')
+def load_metric_matrix(user, metric_fields, past_days=30, today=None):
+    """Load `metric_fields` for the last `past_days` days (today included) of a user's
+    HealthLogs in one query.
+
+    Returns a MetricMatrix with one row per logged date (oldest first), one column per
+    field, NaN for missing or non-numeric values and a boolean `missing` mask. Fields
+    that are not HealthLog columns come back as all-missing columns.
+    """
+    import numpy as np
+
+    today = today or timezone.now().date()
+    start = _window_start(today, past_days)
+    columns = {f.name for f in HealthLog._meta.concrete_fields}
+    known = [f for f in metric_fields if f in columns]
+
+    rows = list(
+        HealthLog.objects.filter(user=user, date__gte=start)
+        .order_by('date')
+        .values_list('date', *known)
+    )
+    values = np.full((len(rows), len(metric_fields)), np.nan)
+    for col, field in enumerate(metric_fields):
+        if field in columns:
+            idx = known.index(field) + 1
+            values[:, col] = [_to_float(row[idx]) for row in rows]
 
-    model = LinearRegression()
-    model.fit(X, y)
+    return MetricMatrix(list(metric_fields), [row[0] for row in rows], values, np.isnan(values), today)
 
-    last_index = X[-1][0]
-    pred_indices = np.array([[last_index + i + 1] for i in range(predict_days)])
-    preds = model.predict(pred_indices)
 
-    pred_dates = [ (today + timedelta(days=i + 1)).strftime('%m-%d') for i in range(predict_days) ]
-    pred_values = [float(round(float(p), 2)) for p in preds]
+@timed_section('ml')
+def predict_metrics(matrix, predict_days=7):
+    """Batch variant of `predict_metric` for a MetricMatrix from `load_metric_matrix`.
+
+    Returns {field: {'dates', 'values'} or None} with every metric fitted in one pass.
+    """
+    x = [(day - matrix.today).days for day in matrix.dates]
+    forecasts = forecast_columns(matrix.values, x, matrix.today, predict_days=predict_days)
+    return dict(zip(matrix.fields, forecasts))
+
+
+def _window_matrix(matrix, fields, past_days):
+    """The columns `fields` of `matrix`, limited to its last `past_days` days."""
+    import numpy as np
+
+    start = _window_start(matrix.today, past_days)
+    rows = [i for i, day in enumerate(matrix.dates) if day >= start]
+    cols = [matrix.fields.index(f) for f in fields]
+    values = matrix.values[np.ix_(rows, cols)]
+    return MetricMatrix(list(fields), [matrix.dates[i] for i in rows], values, np.isnan(values), matrix.today)
+
+
+@timed_section('ml')
+def predict_user_metrics(user, metric_fields, past_days=None, predict_days=7, today=None):
+    """Forecast several metrics for a user: {field: {'dates', 'values'} or None}.
+
+    Each metric uses its tuned window (forecast_window) unless `past_days` is given.
+    30-day windows are answered from the incrementally maintained trend sums; other
+    windows, and fields the sums don't track, share one history query.
+    """
+    from .trend_stats import TREND_WINDOW_DAYS, TREND_METRICS, predict_from_stats
 
-    return {'dates': pred_dates, 'values': pred_values}
+    today = today or timezone.now().date()
+    windows = {f: past_days or forecast_window(f) for f in metric_fields}
+    forecasts = {}
+    tracked = [f for f in metric_fields if f in TREND_METRICS and windows[f] == TREND_WINDOW_DAYS]
+    if tracked:
+        forecasts.update(predict_from_stats(user, tracked, predict_days=predict_days, today=today))
+    untracked = [f for f in metric_fields if f not in tracked]
+    if untracked:
+        matrix = load_metric_matrix(user, untracked, past_days=max(windows[f] for f in untracked), today=today)
+        for window in set(windows[f] for f in untracked):
+            fields = [f for f in untracked if windows[f] == window]
+            forecasts.update(predict_metrics(_window_matrix(matrix, fields, window), predict_days=predict_days))
+    return {f: forecasts.get(f) for f in metric_fields}
 
 
+@timed_section('ml')
+def predict_metric(user, metric_field, past_days=None, predict_days=7):
+    """Fit a least-squares trend on the last `past_days` of `metric_field` and predict next `predict_days`.
+
+    `past_days` defaults to the metric's tuned window (see forecast_window).
+
+    Returns None if not enough data or if numpy is not available. Otherwise returns a dict:
+    { 'dates': [date1,...], 'values': [v1,...] }
+    """
+    try:
+        import numpy as np
+    except Exception:
+        # numpy not available
+        return None
+
+    return predict_user_metrics(user, [metric_field], past_days=past_days, predict_days=predict_days)[metric_field]
+
+
+@timed_section('ml')
 def predict_weight_bmi(user, past_days=30, predict_days=14):
     """Estimate future weight and BMI using calorie balance.
 
     Approach:
     - Estimate user's TDEE using Mifflin-St Jeor and activity multiplier from UserProfile.
-    - Compute recent average daily calories from NutritionEntry (fall back to HealthLog calories_intake).
+    - Compute recent average daily calories from DailySummary meal totals (fall back to HealthLog calories_intake).
     - Daily weight change (kg) ~= (calories_in - TDEE) / 7700
     - Produce a simple linear projection for the next `predict_days` days.
 
     Returns: {'dates': [...], 'weight': [...], 'height': [...], 'bmi': [...]} or None on missing profile
     """
-    try:
-        from .models import NutritionEntry, UserProfile
-    except Exception:
-        return None
-
     today = timezone.now().date()
     # need a profile with demographic data
     profile = getattr(user, 'userprofile', None)
@@ -99,21 +237,17 @@ def predict_weight_bmi(user, past_days=30, predict_days=14):
     activity = getattr(profile, 'activity_level', 'moderate')
     tdee = bmr * mult_map.get(activity, 1.55)
 
-    # compute average daily calories from NutritionEntry over past_days
+    # compute average daily calories from the daily summaries over past_days
     start = today - timedelta(days=past_days)
-    entries = NutritionEntry.objects.filter(user=user, created_at__date__gte=start)
-    # if we have per-meal entries, aggregate by date
-    calories_by_date = {}
-    for e in entries:
-        d = e.created_at.date()
-        calories_by_date[d] = calories_by_date.get(d, 0) + (float(e.calories or 0))
-
-    if calories_by_date:
-        avg_calories = sum(calories_by_date.values()) / max(1, len(calories_by_date))
+    summaries = list(DailySummary.objects.filter(user=user, date__gte=start).values_list('meal_count', 'meal_calories', 'calories_intake'))
+    # prefer days with per-meal entries
+    meal_calories = [calories for count, calories, _ in summaries if count]
+
+    if meal_calories:
+        avg_calories = sum(meal_calories) / max(1, len(meal_calories))
     else:
         # fallback to HealthLog.daily calories_intake
-        logs = HealthLog.objects.filter(user=user, date__gte=start)
-        vals = [float(l.calories_intake or 0) for l in logs]
+        vals = [float(intake or 0) for _, _, intake in summaries if intake is not None]
         if vals:
             avg_calories = sum(vals) / max(1, len(vals))
         else:
@@ -146,3 +280,68 @@ def predict_weight_bmi(user, past_days=30, predict_days=14):
         bmis.append(bmi)
 
     return {'dates': dates, 'weight': weights, 'height': heights, 'bmi': bmis}
+
+
+# ---------------------- FORECAST CACHE ----------------------
+
+FORECAST_CACHE_PREFIX = 'lifeapp:forecast'
+
+
+@timed_section('ml')
+def data_revision(user):
+    """Return a token that changes whenever the user's HealthLog, NutritionEntry or DailySummary rows change.
+
+    Built from the latest HealthLog.updated_at / DailySummary.updated_at plus row counts,
+    so deletes move the revision too. Every meal write refreshes its day's summary,
+    which stands in for NutritionEntry (that has no updated_at).
+    """
+    logs = HealthLog.objects.filter(user=user).aggregate(latest=Max('updated_at'), count=Count('id'))
+    summaries = DailySummary.objects.filter(user=user).aggregate(latest=Max('updated_at'), count=Count('id'))
+    parts = []
+    for agg in (logs, summaries):
+        latest = agg['latest'].isoformat() if agg['latest'] else '-'
+        parts.append(f"{latest}/{agg['count']}")
+    return ':'.join(parts)
+
+
+def cached_result(key, compute):
+    """Return the cached result under `key`, calling `compute()` and caching it on a miss.
+
+    None results are cached too; keys should carry the data revision they depend on.
+    """
+    hit = cache.get(key)
+    if hit is not None:
+        return hit[0]
+    result = compute()
+    # wrap so a None forecast is cached too
+    cache.set(key, (result,), getattr(dj_settings, 'FORECAST_CACHE_TIMEOUT', 60 * 60 * 24))
+    return result
+
+
+@timed_section('ml')
+def cached_predict_metrics(user, metric_fields, past_days=None, predict_days=7, revision=None):
+    """`predict_metrics` for a user, served from cache until their data revision moves.
+
+    Returns {field: {'dates', 'values'} or None}. Without `past_days` each metric
+    uses its tuned window, and retuning moves the cache key.
+    """
+    today = timezone.now().date()
+    revision = revision or data_revision(user)
+    windows = ','.join(str(past_days or forecast_window(f)) for f in metric_fields)
+    key = f"{FORECAST_CACHE_PREFIX}:metrics:{user.id}:{','.join(metric_fields)}:{windows}:{predict_days}:{today}:{revision}"
+    return cached_result(key, lambda: predict_user_metrics(
+        user, metric_fields, past_days=past_days, predict_days=predict_days, today=today
+    ))
+
+
+@timed_section('ml')
+def cached_predict_weight_bmi(user, past_days=30, predict_days=14, revision=None):
+    """`predict_weight_bmi` served from cache until the user's data revision or profile changes."""
+    profile = getattr(user, 'userprofile', None)
+    if not profile:
+        return None
+    today = timezone.now().date()
+    revision = revision or data_revision(user)
+    profile_sig = f'{profile.weight}/{profile.height}/{profile.age}/{profile.gender}/{profile.activity_level}'
+    key = f'{FORECAST_CACHE_PREFIX}:weight_bmi:{user.id}:{past_days}:{predict_days}:{today}:{revision}:{profile_sig}'
+    return cached_result(key, lambda: predict_weight_bmi(user, past_days=past_days, predict_days=predict_days))
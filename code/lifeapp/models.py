@@ -2,8 +2,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .cache_utils import invalidate_dashboard_cache
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -28,10 +29,15 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
+    @staticmethod
+    def compute_bmi(height, weight):
+        """BMI from a height in cm and a weight in kg, rounded to 2 decimals."""
+        height_m = height / 100
+        return round(weight / (height_m ** 2), 2)
+
     @property
     def bmi(self):
-        height_m = self.height / 100
-        return round(self.weight / (height_m ** 2), 2)
+        return self.compute_bmi(self.height, self.weight)
     
     @property
     def bmi_category(self):
@@ -91,6 +97,14 @@ class HealthLog(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored values so trend stats can subtract them on edit/delete
+        # and the summary of a log's old date is refreshed when the date is edited
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 class Recommendation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
     category = models.CharField(
@@ -117,6 +131,13 @@ class Recommendation(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # unread lists, newest first / by priority (dashboard, recommendations page).
+            # Partial indexes: Django compiles is_read=False to NOT is_read, which a
+            # plain (user, is_read, ...) index cannot seek on.
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False), name='rec_unread_created_idx'),
+            models.Index(fields=['user', '-priority', '-created_at'], condition=models.Q(is_read=False), name='rec_unread_priority_idx'),
+        ]
     
     def __str__(self):
         return f"{self.category} - {self.title}"
@@ -135,9 +156,21 @@ class Goal(models.Model):
     )
     target_value = models.FloatField()
     current_value = models.FloatField(default=0)
+    # 'logs': current_value follows the health logs; 'manual': the user set it on the goals page
+    progress_source = models.CharField(
+        max_length=10,
+        choices=[('logs', 'Health logs'), ('manual', 'Entered manually')],
+        default='logs'
+    )
     deadline = models.DateField()
     is_achieved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # active goals ordered by deadline (partial for the same reason as Recommendation)
+            models.Index(fields=['user', 'deadline'], condition=models.Q(is_achieved=False), name='goal_active_deadline_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.goal_type} Goal"
@@ -178,6 +211,138 @@ class NutritionEntry(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # a user's entries by time (recent meals, per-day totals)
+            models.Index(fields=['user', '-created_at'], name='nutrition_user_created_idx'),
+        ]
         
     def __str__(self):
-        return f"{self.user.username}'s {self.meal_type} on {self.created_at.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.user.username}'s {self.meal_type} on {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+class DailySummary(models.Model):
+    """One row per user and day merging the HealthLog fields with summed NutritionEntry totals.
+
+    Kept current by the signal handlers below; rebuild with `manage.py rebuild_daily_summaries`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+
+    # HealthLog fields (empty when the day has no log)
+    calories_intake = models.IntegerField(null=True, blank=True)
+    protein = models.FloatField(null=True, blank=True)
+    carbs = models.FloatField(null=True, blank=True)
+    fats = models.FloatField(null=True, blank=True)
+    water_intake = models.FloatField(null=True, blank=True)
+    steps = models.IntegerField(null=True, blank=True)
+    exercise_duration = models.IntegerField(null=True, blank=True)
+    sleep_hours = models.FloatField(null=True, blank=True)
+
+    # NutritionEntry totals for the day
+    meal_count = models.PositiveIntegerField(default=0)
+    meal_calories = models.PositiveIntegerField(default=0)
+    meal_water = models.PositiveIntegerField(default=0, help_text="ml")
+    meal_protein = models.FloatField(default=0)
+    meal_carbs = models.FloatField(default=0)
+    meal_fat = models.FloatField(default=0)
+    meal_fiber = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} summary"
+
+
+class TrendStats(models.Model):
+    """Running least-squares sums (n, Σx, Σy, Σxy, Σx²) for one user's metric.
+
+    Covers HealthLogs dated on or after `window_start`; x is the day number of the log date.
+    Maintained by the HealthLog signal handlers below (see lifeapp.trend_stats).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trend_stats')
+    metric = models.CharField(max_length=30)
+    window_start = models.DateField()
+    n = models.IntegerField(default=0)
+    sum_x = models.FloatField(default=0)
+    sum_y = models.FloatField(default=0)
+    sum_xy = models.FloatField(default=0)
+    sum_xx = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'metric']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.metric} trend"
+
+
+def _is_cascade(sender, origin):
+    # True while a user (and everything they own) is being cascade-deleted
+    if origin is None:
+        return False
+    return getattr(origin, 'model', type(origin)) is not sender
+
+
+@receiver(post_save, sender=HealthLog)
+@receiver(post_delete, sender=HealthLog)
+def refresh_summary_for_log(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _is_cascade(sender, origin):
+        return
+    from .summary_utils import refresh_daily_summary
+    refresh_daily_summary(instance.user_id, instance.date)
+    # connected before the trend stats receiver, which re-snapshots _loaded_values
+    old_date = getattr(instance, '_loaded_values', {}).get('date', instance.date)
+    if old_date != instance.date:
+        refresh_daily_summary(instance.user_id, old_date)
+
+
+@receiver(post_save, sender=NutritionEntry)
+@receiver(post_delete, sender=NutritionEntry)
+def refresh_summary_for_entry(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _is_cascade(sender, origin):
+        return
+    from .summary_utils import refresh_daily_summary
+    refresh_daily_summary(instance.user_id, timezone.localdate(instance.created_at))
+
+
+@receiver(post_save, sender=HealthLog)
+@receiver(post_delete, sender=HealthLog)
+@receiver(post_save, sender=NutritionEntry)
+@receiver(post_delete, sender=NutritionEntry)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+@receiver(post_save, sender=Recommendation)
+@receiver(post_delete, sender=Recommendation)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_dashboard_for_instance(sender, instance, **kwargs):
+    invalidate_dashboard_cache(instance.user_id)
+
+
+@receiver(post_save, sender=HealthLog)
+def update_trend_stats_for_log(sender, instance, created, raw=False, **kwargs):
+    from .trend_stats import record_log_saved, discard_trend_stats
+    if raw:
+        discard_trend_stats(instance.user_id)
+        return
+    record_log_saved(instance, created)
+
+
+@receiver(post_delete, sender=HealthLog)
+def remove_log_from_trend_stats(sender, instance, origin=None, **kwargs):
+    if _is_cascade(sender, origin):
+        return
+    from .trend_stats import record_log_deleted
+    record_log_deleted(instance)
+
+
+@receiver(post_save, sender=HealthLog)
+@receiver(post_delete, sender=HealthLog)
+def update_goal_progress_for_log(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _is_cascade(sender, origin):
+        return
+    from .goal_utils import recompute_goal_progress
+    recompute_goal_progress(user_ids=[instance.user_id])
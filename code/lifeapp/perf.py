@@ -0,0 +1,63 @@
+"""Per-request timing sections used by PerformanceTimingMiddleware.
+
+Code marks work with `timed('ml')` (context manager) or `@timed_section('ml')`
+(decorator). Outside a request, or when the middleware is disabled, they are no-ops.
+Nested sections with the same name are only counted once.
+"""
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+from django import shortcuts
+
+_timings = contextvars.ContextVar('lifeapp_request_timings', default=None)
+
+
+def start_request():
+    """Begin collecting timings for the current request; returns a token for `end_request`."""
+    return _timings.set({'sections': {}, 'active': set()})
+
+
+def end_request(token):
+    """Stop collecting and return {section: seconds} for the request."""
+    state = _timings.get()
+    _timings.reset(token)
+    return state['sections'] if state else {}
+
+
+def add_time(section, seconds):
+    state = _timings.get()
+    if state is not None:
+        state['sections'][section] = state['sections'].get(section, 0.0) + seconds
+
+
+@contextmanager
+def timed(section):
+    state = _timings.get()
+    if state is None or section in state['active']:
+        yield
+        return
+    state['active'].add(section)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        state['active'].discard(section)
+        add_time(section, time.perf_counter() - start)
+
+
+def timed_section(section):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(section):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render(request, *args, **kwargs):
+    """`django.shortcuts.render`, timed as the 'template' section."""
+    with timed('template'):
+        return shortcuts.render(request, *args, **kwargs)
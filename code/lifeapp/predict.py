@@ -16,17 +16,20 @@ except Exception:
 	raise
 
 from django.contrib.auth import get_user_model
-from lifeapp.evaluate_prediction import evaluate_user, evaluate_overall, plot_overall
+from lifeapp.evaluate_prediction import load_backtests, evaluate_user, evaluate_overall, plot_overall
 
 User = get_user_model()
 user = User.objects.first()  # pick the first user, or filter by username/email
 metrics = ['steps', 'calories_intake', 'sleep_hours']
 
-results = evaluate_user(user, metrics=metrics, plot=True)
+# fit each metric once and share the splits between both reports
+backtests = load_backtests(user, metrics, past_days=30, test_days=7)
+
+results = evaluate_user(user, metrics=metrics, plot=True, backtests=backtests)
 print('Per-metric results:')
 print(results)
 
-overall = evaluate_overall(user, metrics=metrics, past_days=30, test_days=7, predict_days=14)
+overall = evaluate_overall(user, metrics=metrics, past_days=30, test_days=7, predict_days=14, backtests=backtests)
 print('\nOverall aggregated performance:')
 print(overall)
 if overall:
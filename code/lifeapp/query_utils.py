@@ -0,0 +1,146 @@
+import base64
+import binascii
+from datetime import date
+
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Substr, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import HealthLog, DailySummary, NutritionEntry
+from .summary_utils import day_bounds
+
+# Columns the health log history lists; notes are cut to a preview in the query
+LOG_HISTORY_FIELDS = [
+    'id', 'date', 'calories_intake', 'water_intake', 'steps',
+    'exercise_type', 'exercise_duration', 'sleep_hours', 'mood',
+]
+NOTES_PREVIEW_LENGTH = 120
+
+# NutritionEntry fields totalled per period by bucket_nutrition
+NUTRITION_TOTAL_FIELDS = ['calories', 'water', 'protein', 'carbs', 'fat', 'fiber']
+
+NUTRITION_GRANULARITIES = {
+    'day': TruncDate,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def load_log_window(user, start, end=None):
+    """Fetch a user's HealthLog rows from `start` to `end` (inclusive) in one query.
+
+    Returns a dict mapping each logged date to its HealthLog so callers can look up
+    any day of the window without issuing a query per date.
+    """
+    logs = HealthLog.objects.filter(user=user, date__gte=start)
+    if end is not None:
+        logs = logs.filter(date__lte=end)
+    return {log.date: log for log in logs}
+
+
+def window_series(logs_by_date, days, field, default=0):
+    """Return the values of `field` for each date in `days`, using `default` for
+    days without a log (or with an empty value)."""
+    values = []
+    for day in days:
+        log = logs_by_date.get(day)
+        value = getattr(log, field, default) if log else default
+        values.append(value or default)
+    return values
+
+
+def load_summary_window(user, start, end=None):
+    """Fetch a user's DailySummary rows from `start` to `end` (inclusive) keyed by date."""
+    summaries = DailySummary.objects.filter(user=user, date__gte=start)
+    if end is not None:
+        summaries = summaries.filter(date__lte=end)
+    return {s.date: s for s in summaries}
+
+
+def summarize_meals(summaries):
+    """Total and per-entry average of the meal macros across DailySummary rows.
+
+    Matches the shape of `NutritionEntry.aggregate(avg_x=Avg(x), total_x=Sum(x))`,
+    including None values when there are no entries.
+    """
+    count = sum(summary.meal_count for summary in summaries)
+    stats = {}
+    for metric in ['calories', 'protein', 'carbs', 'fat', 'fiber']:
+        total = sum(getattr(summary, f'meal_{metric}') for summary in summaries) if count else None
+        stats[f'avg_{metric}'] = total / count if count else None
+        stats[f'total_{metric}'] = total
+    return stats
+
+
+def bucket_nutrition(entries, granularity='day', group_by=(), tzinfo=None):
+    """Total NutritionEntry rows per day, week or month in the database.
+
+    `entries` is a NutritionEntry queryset; periods follow `tzinfo` (default: the
+    current time zone) and weeks start on Monday. Returns a values() queryset of
+    dicts with `period` (the first date of the period), any `group_by` fields,
+    `total_<field>` for each of NUTRITION_TOTAL_FIELDS and `entry_count`, ordered
+    by period.
+    """
+    trunc = NUTRITION_GRANULARITIES[granularity]
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    period = trunc('created_at', tzinfo=tzinfo) if trunc is TruncDate else trunc(
+        'created_at', output_field=DateField(), tzinfo=tzinfo
+    )
+    totals = {f'total_{field}': Sum(field) for field in NUTRITION_TOTAL_FIELDS}
+    return (
+        entries.annotate(period=period)
+        .values(*group_by, 'period')
+        .annotate(entry_count=Count('id'), **totals)
+        .order_by('period')
+    )
+
+
+def nutrition_totals(user, start=None, end=None, granularity='day'):
+    """One row per day/week/month of the user's meals between the local dates
+    `start` and `end` (inclusive, either may be None); see bucket_nutrition."""
+    entries = NutritionEntry.objects.filter(user=user)
+    if start is not None:
+        entries = entries.filter(created_at__gte=day_bounds(start)[0])
+    if end is not None:
+        entries = entries.filter(created_at__lt=day_bounds(end)[1])
+    return list(bucket_nutrition(entries, granularity))
+
+
+def encode_log_cursor(day):
+    """Opaque cursor pointing just past the log dated `day` in newest-first order."""
+    return base64.urlsafe_b64encode(day.isoformat().encode()).decode().rstrip('=')
+
+
+def decode_log_cursor(cursor):
+    """Return the date encoded in `cursor`, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return date.fromisoformat(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def log_history_page(user, cursor=None, page_size=25):
+    """One newest-first page of a user's health logs using keyset pagination.
+
+    Seeks past the cursor's date on the (user, date) unique index instead of using
+    OFFSET, so every page costs the same however long the history is. Rows are
+    dicts of LOG_HISTORY_FIELDS plus `notes_preview`. Returns (rows, next_cursor),
+    where next_cursor is None on the last page.
+    """
+    logs = HealthLog.objects.filter(user=user)
+    after = decode_log_cursor(cursor)
+    if after is not None:
+        logs = logs.filter(date__lt=after)
+    rows = list(
+        logs.order_by('-date')
+        .annotate(notes_preview=Substr('notes', 1, NOTES_PREVIEW_LENGTH))
+        .values(*LOG_HISTORY_FIELDS, 'notes_preview')[:page_size + 1]
+    )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_log_cursor(rows[-1]['date'])
+    return rows, next_cursor
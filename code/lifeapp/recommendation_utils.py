@@ -1,230 +1,219 @@
 from django.conf import settings as dj_settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Avg, Sum
-from .models import NutritionEntry, HealthLog, Recommendation
+from .models import DailySummary, Recommendation, UserProfile
+from .cache_utils import batched_dashboard_invalidation, invalidate_dashboard_cache
+from .perf import timed_section
 import random
+from collections import namedtuple
 
 
-def generate_recommendations_for_user(user):
-    """Generate lightweight, rule-based recommendations for a user based on the
-    last 7 days of NutritionEntry and HealthLog data. This function is idempotent
-    in the sense that callers may delete previous recommendations before calling it.
-    """
-    t = getattr(dj_settings, 'RECOMMENDATIONS_THRESHOLDS', {})
-
-    def thr(k, default):
-        return t.get(k, default)
-
-    now = timezone.now()
-    seven_days_ago = now - timedelta(days=7)
-    recent_nutrition = NutritionEntry.objects.filter(user=user, created_at__gte=seven_days_ago)
-    recent_logs = HealthLog.objects.filter(user=user, date__gte=seven_days_ago)
-
-    avg_calories = recent_nutrition.aggregate(avg=Avg('calories'))['avg'] or 0
-    avg_protein = recent_nutrition.aggregate(avg=Avg('protein'))['avg'] or 0
-    avg_fiber = recent_nutrition.aggregate(avg=Avg('fiber'))['avg'] or 0
-    avg_steps = recent_logs.aggregate(avg=Avg('steps'))['avg'] or 0
-    avg_sleep = recent_logs.aggregate(avg=Avg('sleep_hours'))['avg'] or 0
-    avg_water = recent_nutrition.aggregate(avg=Avg('water'))['avg'] or 0
-    avg_carbs = recent_nutrition.aggregate(avg=Avg('carbs'))['avg'] or 0
-    avg_fat = recent_nutrition.aggregate(avg=Avg('fat'))['avg'] or 0
+# Message template pools per rule band; {val} is the user's formatted average
+RECOMMENDATION_TEMPLATES = {
+    'calories_high': [
+        'Your average daily calories over the past week is {val} kcal — consider reducing portion sizes or swapping in lower-calorie options like vegetables and lean protein.',
+        'You averaged {val} kcal/day recently. Small swaps (e.g., grilled vs fried, more veg) can trim calories without feeling deprived.',
+        '{val} kcal/day is above your threshold. Try mindful portion control and higher-volume, lower-calorie foods.'
+    ],
+    'calories_low': [
+        'Your average is {val} kcal/day — a bit low. Add nutrient-dense foods (nuts, avocado, full-fat dairy) to meet energy needs.',
+        'At {val} kcal/day, you may benefit from including more calorie-dense healthy options like legumes and nut butters.',
+        'Calories are low ({val} kcal/day). Consider adding balanced snacks between meals to keep energy up.'
+    ],
+    'protein_low': [
+        'Protein seems low ({val} g/day). Add portions of eggs, Greek yogurt, legumes or lean meat to help satiety and recovery.',
+        'At around {val} g/day protein, aim to include a protein source with each meal—chicken, tofu, fish, or beans work well.',
+        'Consider adding 20–30 g of protein to one meal (e.g., a scoop of yogurt + nuts) to lift daily totals from {val} g.'
+    ],
+    'protein_high': [
+        'Protein intake is high ({val} g/day). If you have kidney disease or other conditions, discuss very high-protein diets with your provider and stay hydrated.',
+        'At {val} g/day protein, ensure balanced nutrition and adequate fluids — very high protein can stress some conditions.',
+        'High protein ({val} g/day) detected; vary protein sources and keep an eye on overall calorie balance.'
+    ],
+    'fiber_low': [
+        'Fiber looks low ({val} g/day). Add fruits, vegetables, legumes and whole grains to support digestion and fullness.',
+        'Try adding a serving of fruit and a serving of whole grains to raise fiber from {val} g/day toward recommended levels.',
+        'Increase fiber gradually from {val} g/day — beans, oats and veggies are easy wins.'
+    ],
+    'fiber_high': [
+        'Fiber is high ({val} g/day). Spread intake across the day and ensure you drink enough water to reduce bloating.',
+        'Very high fiber ({val} g/day) may cause gas — try spacing high-fiber foods and increase fluids.',
+    ],
+    'carbs_high': [
+        'Carbohydrates are elevated ({val} g/day). Swap refined carbs for whole grains, legumes and extra vegetables.',
+        'At {val} g/day carbs, choose fiber-rich carbs (brown rice, oats) and reduce sugary snacks to steady energy.'
+    ],
+    'carbs_low': [
+        'Carbs are low ({val} g/day). Include whole grains, starchy vegetables or fruit around activity for fuel.',
+        'Low carbs ({val} g/day) — add balanced carbs like potatoes, rice or beans to support workouts and recovery.'
+    ],
+    'fat_high': [
+        'Fat intake is high ({val} g/day). Favor unsaturated fats (olive oil, avocado, nuts) and reduce fried/processed fats.',
+        'At {val} g/day fat, choose healthier fats and reduce saturated fats from processed foods.'
+    ],
+    'fat_low': [
+        'Fat is low ({val} g/day). Include sources like olive oil, fatty fish, nuts or avocado to support nutrient absorption.',
+        'Having too little fat ({val} g/day) can affect satiety — try adding a small handful of nuts or a drizzle of olive oil.'
+    ],
+    'water_low': [
+        'Average water intake is {val} ml/day. Aim for 1.5–3 L depending on activity — keep a bottle nearby and sip regularly.',
+        'Hydration around {val} ml/day — try a glass of water before meals and carry a refillable bottle to increase intake.'
+    ],
+    'steps_low': [
+        'Average daily steps are {val}. Add short walks after meals or a 10–15 minute walk break to increase movement.',
+        'Steps around {val} — try breaking activity into small goals (e.g., a 10-minute walk three times daily).' 
+    ],
+    'sleep_low': [
+        'Sleep averages {val} hours — aim for 7–8 hours. Try a consistent bedtime and screen-free wind-down routine.',
+        'With {val} hours sleep, prioritize sleep hygiene: dark bedroom, regular schedule and limiting caffeine later in the day.'
+    ],
+    'bmi_high': [
+        'Your BMI is {val}. A modest calorie deficit combined with regular activity can support a gradual weight reduction.',
+        'BMI {val} suggests overweight — small, sustainable changes to diet and movement are more effective than drastic measures.'
+    ],
+    'bmi_low': [
+        'BMI {val} is underweight — consider increasing nutrient-dense calories and consult a healthcare professional if concerned.',
+    ],
+    'bmi_note': [
+        'Your BMI is {val}. Keep up balanced nutrition and activity.',
+    ],
+}
+
+# One band of a rule. `when` is 'above', 'at_least' or 'below' the threshold
+# (RECOMMENDATIONS_THRESHOLDS[threshold], falling back to `default`), 'below_nonzero'
+# (ignores a zero average) or 'always'.
+Band = namedtuple('Band', ['when', 'threshold', 'default', 'category', 'priority', 'title', 'template'])
+
+# A metric's bands are checked in order and the first match produces its recommendation.
+# `fmt` turns the average into the {val} shown in the message.
+Rule = namedtuple('Rule', ['metric', 'fmt', 'bands'])
+
+RECOMMENDATION_RULES = [
+    Rule('calories', int, [
+        Band('above', 'calories_high', 2500, 'nutrition', 'medium', 'High calorie pattern', 'calories_high'),
+        Band('below_nonzero', 'calories_low', 1400, 'nutrition', 'medium', 'Low calorie intake', 'calories_low'),
+        # not out of range — still provide a general calorie tip (varying)
+        Band('always', None, None, 'nutrition', 'low', 'Calorie check', 'calories_high'),
+    ]),
+    Rule('protein', int, [
+        Band('below', 'protein_low', 50, 'nutrition', 'low', 'Increase protein', 'protein_low'),
+        Band('above', 'protein_high', 200, 'nutrition', 'low', 'Very high protein intake', 'protein_high'),
+        Band('always', None, None, 'nutrition', 'low', 'Protein tip', 'protein_low'),
+    ]),
+    Rule('fiber', int, [
+        Band('below', 'fiber_low', 20, 'nutrition', 'low', 'Add more fiber', 'fiber_low'),
+        Band('above', 'fiber_high', 70, 'nutrition', 'low', 'Very high fiber intake', 'fiber_high'),
+        Band('always', None, None, 'nutrition', 'low', 'Fiber tip', 'fiber_low'),
+    ]),
+    Rule('carbs', int, [
+        Band('above', 'carbs_high', 350, 'nutrition', 'low', 'High carbohydrate intake', 'carbs_high'),
+        Band('below_nonzero', 'carbs_low', 130, 'nutrition', 'low', 'Low carbohydrate intake', 'carbs_low'),
+        Band('always', None, None, 'nutrition', 'low', 'Carb tip', 'carbs_high'),
+    ]),
+    Rule('fat', int, [
+        Band('above', 'fat_high', 100, 'nutrition', 'low', 'High fat intake', 'fat_high'),
+        Band('below_nonzero', 'fat_low', 20, 'nutrition', 'low', 'Low fat intake', 'fat_low'),
+        Band('always', None, None, 'nutrition', 'low', 'Fat tip', 'fat_high'),
+    ]),
+    Rule('water', int, [
+        Band('always', None, None, 'nutrition', 'low', 'Hydration', 'water_low'),
+    ]),
+    Rule('steps', int, [
+        Band('always', None, None, 'exercise', 'low', 'Activity', 'steps_low'),
+    ]),
+    Rule('sleep', lambda value: round(value, 1), [
+        Band('always', None, None, 'sleep', 'low', 'Sleep', 'sleep_low'),
+    ]),
     # heart_rate and blood pressure are not used in recommendations for this project
+    Rule('bmi', lambda value: value, [
+        Band('at_least', None, 25, 'nutrition', 'medium', 'Consider weight management', 'bmi_high'),
+        Band('below', None, 18.5, 'nutrition', 'medium', 'Underweight — ensure adequate intake', 'bmi_low'),
+        # add a neutral BMI tip to keep variety
+        Band('always', None, None, 'lifestyle', 'low', 'BMI note', 'bmi_note'),
+    ]),
+]
 
-    generated = []
 
-    # Calories
-    if avg_calories > thr('calories_high', 2500):
-        generated.append(Recommendation(
-            user=user,
-            category='nutrition',
-            priority='medium',
-            title='High calorie pattern',
-            message=f'Your average daily calories over the past week is {int(avg_calories)} kcal. Consider reducing portion sizes or choosing lower-calorie swaps.'
-        ))
-    elif avg_calories and avg_calories < thr('calories_low', 1400):
-        generated.append(Recommendation(
-            user=user,
-            category='nutrition',
-            priority='medium',
-            title='Low calorie intake',
-            message=(f'Your average intake ({int(avg_calories)} kcal) is low. Consider adding calorie-dense nutritious foods like nuts, avocado, whole-fat dairy, legumes, and healthy oils to meet your energy needs.')
-        ))
+# one row per user and day, so a week's meal sums and activity averages take one query
+WEEKLY_AGGREGATES = {
+    'meal_count': Sum('meal_count'),
+    'calories': Sum('meal_calories'),
+    'protein': Sum('meal_protein'),
+    'fiber': Sum('meal_fiber'),
+    'water': Sum('meal_water'),
+    'carbs': Sum('meal_carbs'),
+    'fat': Sum('meal_fat'),
+    'avg_steps': Avg('steps'),
+    'avg_sleep': Avg('sleep_hours'),
+}
 
-    # Protein
-    if avg_protein < thr('protein_low', 50):
-        generated.append(Recommendation(
-            user=user,
-            category='nutrition',
-            priority='low',
-            title='Increase protein',
-            message='Protein intake looks low. Add lean protein sources like chicken, fish, eggs, tofu, beans or Greek yogurt to support muscle and fullness.'
-        ))
-    elif avg_protein and avg_protein > thr('protein_high', 200):
-        generated.append(Recommendation(
-            user=user,
-            category='nutrition',
-            priority='low',
-            title='Very high protein intake',
-            message='Your protein intake appears very high. If you have kidney issues or other conditions, discuss very high-protein diets with your healthcare provider and ensure adequate hydration.'
-        ))
 
-    # Fiber
-    generated = []
+def _week_start(now=None):
+    return timezone.localdate((now or timezone.now()) - timedelta(days=7))
+
+
+def weekly_averages(totals):
+    """Turn WEEKLY_AGGREGATES results into the averages the rules compare against."""
+    def per_entry(key):
+        # per-entry averages, as NutritionEntry Avg() used to compute them
+        return (totals[key] or 0) / totals['meal_count'] if totals['meal_count'] else 0
 
-    # To provide varied output each time the user clicks "Regenerate Insights",
-    # we use multiple message templates per parameter and pick randomly. We also
-    # generate suggestions for all key parameters (calories, protein, carbs,
-    # fat, fiber, water, steps, sleep, blood pressure, BMI) so each regenerate
-    # produces a fresh set covering the project's parameters.
-
-    # Message template pools per parameter
-    templates = {
-        'calories_high': [
-            'Your average daily calories over the past week is {val} kcal — consider reducing portion sizes or swapping in lower-calorie options like vegetables and lean protein.',
-            'You averaged {val} kcal/day recently. Small swaps (e.g., grilled vs fried, more veg) can trim calories without feeling deprived.',
-            '{val} kcal/day is above your threshold. Try mindful portion control and higher-volume, lower-calorie foods.'
-        ],
-        'calories_low': [
-            'Your average is {val} kcal/day — a bit low. Add nutrient-dense foods (nuts, avocado, full-fat dairy) to meet energy needs.',
-            'At {val} kcal/day, you may benefit from including more calorie-dense healthy options like legumes and nut butters.',
-            'Calories are low ({val} kcal/day). Consider adding balanced snacks between meals to keep energy up.'
-        ],
-        'protein_low': [
-            'Protein seems low ({val} g/day). Add portions of eggs, Greek yogurt, legumes or lean meat to help satiety and recovery.',
-            'At around {val} g/day protein, aim to include a protein source with each meal—chicken, tofu, fish, or beans work well.',
-            'Consider adding 20–30 g of protein to one meal (e.g., a scoop of yogurt + nuts) to lift daily totals from {val} g.'
-        ],
-        'protein_high': [
-            'Protein intake is high ({val} g/day). If you have kidney disease or other conditions, discuss very high-protein diets with your provider and stay hydrated.',
-            'At {val} g/day protein, ensure balanced nutrition and adequate fluids — very high protein can stress some conditions.',
-            'High protein ({val} g/day) detected; vary protein sources and keep an eye on overall calorie balance.'
-        ],
-        'fiber_low': [
-            'Fiber looks low ({val} g/day). Add fruits, vegetables, legumes and whole grains to support digestion and fullness.',
-            'Try adding a serving of fruit and a serving of whole grains to raise fiber from {val} g/day toward recommended levels.',
-            'Increase fiber gradually from {val} g/day — beans, oats and veggies are easy wins.'
-        ],
-        'fiber_high': [
-            'Fiber is high ({val} g/day). Spread intake across the day and ensure you drink enough water to reduce bloating.',
-            'Very high fiber ({val} g/day) may cause gas — try spacing high-fiber foods and increase fluids.',
-        ],
-        'carbs_high': [
-            'Carbohydrates are elevated ({val} g/day). Swap refined carbs for whole grains, legumes and extra vegetables.',
-            'At {val} g/day carbs, choose fiber-rich carbs (brown rice, oats) and reduce sugary snacks to steady energy.'
-        ],
-        'carbs_low': [
-            'Carbs are low ({val} g/day). Include whole grains, starchy vegetables or fruit around activity for fuel.',
-            'Low carbs ({val} g/day) — add balanced carbs like potatoes, rice or beans to support workouts and recovery.'
-        ],
-        'fat_high': [
-            'Fat intake is high ({val} g/day). Favor unsaturated fats (olive oil, avocado, nuts) and reduce fried/processed fats.',
-            'At {val} g/day fat, choose healthier fats and reduce saturated fats from processed foods.'
-        ],
-        'fat_low': [
-            'Fat is low ({val} g/day). Include sources like olive oil, fatty fish, nuts or avocado to support nutrient absorption.',
-            'Having too little fat ({val} g/day) can affect satiety — try adding a small handful of nuts or a drizzle of olive oil.'
-        ],
-        'water_low': [
-            'Average water intake is {val} ml/day. Aim for 1.5–3 L depending on activity — keep a bottle nearby and sip regularly.',
-            'Hydration around {val} ml/day — try a glass of water before meals and carry a refillable bottle to increase intake.'
-        ],
-        'steps_low': [
-            'Average daily steps are {val}. Add short walks after meals or a 10–15 minute walk break to increase movement.',
-            'Steps around {val} — try breaking activity into small goals (e.g., a 10-minute walk three times daily).' 
-        ],
-        'sleep_low': [
-            'Sleep averages {val} hours — aim for 7–8 hours. Try a consistent bedtime and screen-free wind-down routine.',
-            'With {val} hours sleep, prioritize sleep hygiene: dark bedroom, regular schedule and limiting caffeine later in the day.'
-        ],
-        'bmi_high': [
-            'Your BMI is {val}. A modest calorie deficit combined with regular activity can support a gradual weight reduction.',
-            'BMI {val} suggests overweight — small, sustainable changes to diet and movement are more effective than drastic measures.'
-        ],
-        'bmi_low': [
-            'BMI {val} is underweight — consider increasing nutrient-dense calories and consult a healthcare professional if concerned.',
-        ]
+    return {
+        'calories': per_entry('calories'),
+        'protein': per_entry('protein'),
+        'fiber': per_entry('fiber'),
+        'water': per_entry('water'),
+        'carbs': per_entry('carbs'),
+        'fat': per_entry('fat'),
+        'steps': totals['avg_steps'] or 0,
+        'sleep': totals['avg_sleep'] or 0,
     }
 
-    def pick(tpl_key, **kw):
-        pool = templates.get(tpl_key, [])
-        if not pool:
-            return ''
-        return random.choice(pool).format(**kw)
-
-    # Calories
-    if avg_calories > thr('calories_high', 2500):
-        generated.append(Recommendation(user=user, category='nutrition', priority='medium', title='High calorie pattern', message=pick('calories_high', val=int(avg_calories))))
-    else:
-        # also include a lower-calorie suggestion when below threshold
-        if avg_calories and avg_calories < thr('calories_low', 1400):
-            generated.append(Recommendation(user=user, category='nutrition', priority='medium', title='Low calorie intake', message=pick('calories_low', val=int(avg_calories))))
-        else:
-            # not out of range — still provide a general calorie tip (varying)
-            generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Calorie check', message=pick('calories_high', val=int(avg_calories))))
-
-    # Protein
-    if avg_protein < thr('protein_low', 50):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Increase protein', message=pick('protein_low', val=int(avg_protein))))
-    elif avg_protein and avg_protein > thr('protein_high', 200):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Very high protein intake', message=pick('protein_high', val=int(avg_protein))))
-    else:
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Protein tip', message=pick('protein_low', val=int(avg_protein))))
-
-    # Fiber
-    if avg_fiber < thr('fiber_low', 20):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Add more fiber', message=pick('fiber_low', val=int(avg_fiber))))
-    elif avg_fiber and avg_fiber > 70:
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Very high fiber intake', message=pick('fiber_high', val=int(avg_fiber))))
-    else:
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Fiber tip', message=pick('fiber_low', val=int(avg_fiber))))
-
-    # Carbs
-    if avg_carbs and avg_carbs > thr('carbs_high', 350):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='High carbohydrate intake', message=pick('carbs_high', val=int(avg_carbs))))
-    elif avg_carbs and avg_carbs < thr('carbs_low', 130):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Low carbohydrate intake', message=pick('carbs_low', val=int(avg_carbs))))
-    else:
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Carb tip', message=pick('carbs_high', val=int(avg_carbs))))
-
-    # Fat
-    if avg_fat and avg_fat > thr('fat_high', 100):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='High fat intake', message=pick('fat_high', val=int(avg_fat))))
-    elif avg_fat and avg_fat < thr('fat_low', 20):
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Low fat intake', message=pick('fat_low', val=int(avg_fat))))
-    else:
-        generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Fat tip', message=pick('fat_high', val=int(avg_fat))))
-
-    # Water
-    generated.append(Recommendation(user=user, category='nutrition', priority='low', title='Hydration', message=pick('water_low', val=int(avg_water or 0))))
-
-    # Steps
-    generated.append(Recommendation(user=user, category='exercise', priority='low', title='Activity', message=pick('steps_low', val=int(avg_steps or 0))))
-
-    # Sleep
-    generated.append(Recommendation(user=user, category='sleep', priority='low', title='Sleep', message=pick('sleep_low', val=round(avg_sleep or 0, 1))))
-
-    # Blood pressure removed from recommendations per project settings
-
-    # BMI
-    try:
-        profile = user.userprofile
-        bmi_val = profile.bmi
-        if bmi_val is not None:
-            if bmi_val >= 25:
-                generated.append(Recommendation(user=user, category='nutrition', priority='medium', title='Consider weight management', message=pick('bmi_high', val=bmi_val)))
-            elif bmi_val < 18.5:
-                generated.append(Recommendation(user=user, category='nutrition', priority='medium', title='Underweight — ensure adequate intake', message=pick('bmi_low', val=bmi_val)))
-            else:
-                # add a neutral BMI tip to keep variety
-                generated.append(Recommendation(user=user, category='lifestyle', priority='low', title='BMI note', message=f'Your BMI is {bmi_val}. Keep up balanced nutrition and activity.'))
-    except Exception:
-        pass
 
-    # If nothing triggered (shouldn't happen because we always append), add a generic nudge
+def _band_matches(band, value, thresholds):
+    if band.when == 'always':
+        return True
+    limit = thresholds.get(band.threshold, band.default)
+    if band.when == 'above':
+        return value > limit
+    if band.when == 'at_least':
+        return value >= limit
+    if band.when == 'below':
+        return value < limit
+    return bool(value) and value < limit
+
+
+def build_recommendations(user_id, averages, bmi_val=None, limit=3):
+    """Apply RECOMMENDATION_RULES to one user's weekly averages.
+
+    Every rule with a value contributes the recommendation of its first matching
+    band, with a message drawn at random from the band's template pool so each
+    regenerate reads differently. Returns up to `limit` unsaved Recommendation
+    objects picked at random.
+    """
+    thresholds = getattr(dj_settings, 'RECOMMENDATIONS_THRESHOLDS', {})
+    values = dict(averages, bmi=bmi_val)
+
+    generated = []
+    for rule in RECOMMENDATION_RULES:
+        value = values.get(rule.metric)
+        if value is None:
+            continue
+        for band in rule.bands:
+            if _band_matches(band, value, thresholds):
+                message = random.choice(RECOMMENDATION_TEMPLATES[band.template]).format(val=rule.fmt(value))
+                generated.append(Recommendation(
+                    user_id=user_id, category=band.category, priority=band.priority,
+                    title=band.title, message=message
+                ))
+                break
+
+    # If nothing triggered, add a generic nudge
     if not generated:
         generated.append(Recommendation(
-            user=user,
+            user_id=user_id,
             category='lifestyle',
             priority='low',
             title='Keep it up!',
@@ -233,9 +222,63 @@ def generate_recommendations_for_user(user):
 
     # Shuffle to provide changed order each time and limit to a small set
     random.shuffle(generated)
-    selected = generated[:3]
+    return generated[:limit]
+
+
+def _profile_bmi(user):
+    try:
+        return user.userprofile.bmi
+    except Exception:
+        return None
+
 
-    # Bulk create only the selected recommendations (up to 4)
+@timed_section('recommendations')
+def generate_recommendations_for_user(user):
+    """Generate lightweight, rule-based recommendations for a user based on the
+    last 7 days of NutritionEntry and HealthLog data (read from DailySummary). This function is idempotent
+    in the sense that callers may delete previous recommendations before calling it.
+    """
+    totals = DailySummary.objects.filter(user=user, date__gte=_week_start()).aggregate(**WEEKLY_AGGREGATES)
+    selected = build_recommendations(user.id, weekly_averages(totals), _profile_bmi(user))
+
+    # Bulk create only the selected recommendations (up to 3)
     Recommendation.objects.bulk_create(selected)
+    # bulk_create sends no post_save signals
+    invalidate_dashboard_cache(user.id)
 
     return selected
+
+
+def generate_recommendations_batch(user_ids, now=None):
+    """Replace the recommendations of a batch of users.
+
+    Reads every user's weekly averages with one grouped DailySummary query and their
+    BMI with one UserProfile query, then writes all new rows with one bulk_create.
+    Returns the number of recommendations created.
+    """
+    user_ids = list(user_ids)
+    rows = (
+        DailySummary.objects.filter(user_id__in=user_ids, date__gte=_week_start(now))
+        .values('user_id')
+        .annotate(**WEEKLY_AGGREGATES)
+        .order_by()
+    )
+    totals_by_user = {row['user_id']: row for row in rows}
+    empty = {key: None for key in WEEKLY_AGGREGATES}
+    profiles = UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'height', 'weight')
+    bmi_by_user = {user_id: UserProfile.compute_bmi(height, weight) for user_id, height, weight in profiles}
+
+    selected = []
+    for user_id in user_ids:
+        averages = weekly_averages(totals_by_user.get(user_id, empty))
+        selected.extend(build_recommendations(user_id, averages, bmi_by_user.get(user_id)))
+
+    # the post_delete signal of every old row invalidates its user's cache; do it once per user
+    with batched_dashboard_invalidation():
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=user_ids).delete()
+            Recommendation.objects.bulk_create(selected)
+        # bulk_create sends no post_save signals
+        for user_id in user_ids:
+            invalidate_dashboard_cache(user_id)
+    return len(selected)
@@ -0,0 +1,101 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import HealthLog, NutritionEntry, DailySummary
+
+# HealthLog fields copied onto the summary row as-is
+LOG_FIELDS = ['calories_intake', 'protein', 'carbs', 'fats', 'water_intake', 'steps', 'exercise_duration', 'sleep_hours']
+
+# summary field -> NutritionEntry field summed per day
+MEAL_FIELDS = {
+    'meal_calories': 'calories',
+    'meal_water': 'water',
+    'meal_protein': 'protein',
+    'meal_carbs': 'carbs',
+    'meal_fat': 'fat',
+    'meal_fiber': 'fiber',
+}
+
+
+def _meal_aggregates():
+    aggregates = {name: Sum(field) for name, field in MEAL_FIELDS.items()}
+    aggregates['meal_count'] = Count('id')
+    return aggregates
+
+
+def _summary_defaults(log_values, meal_values):
+    defaults = {field: (log_values or {}).get(field) for field in LOG_FIELDS}
+    for name in MEAL_FIELDS:
+        defaults[name] = (meal_values or {}).get(name) or 0
+    defaults['meal_count'] = (meal_values or {}).get('meal_count') or 0
+    return defaults
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes of `day` in the current time zone.
+
+    Filtering created_at on this range (rather than created_at__date) lets the
+    (user, created_at) index serve the lookup.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def refresh_daily_summary(user_id, day):
+    """Recompute the DailySummary row for one user and day from the raw rows.
+
+    Deletes the row when the day no longer has a log or any meals.
+    """
+    log_values = HealthLog.objects.filter(user_id=user_id, date=day).values(*LOG_FIELDS).first()
+    start, end = day_bounds(day)
+    meal_values = NutritionEntry.objects.filter(
+        user_id=user_id, created_at__gte=start, created_at__lt=end
+    ).aggregate(**_meal_aggregates())
+
+    if log_values is None and not meal_values['meal_count']:
+        DailySummary.objects.filter(user_id=user_id, date=day).delete()
+        return None
+
+    summary, _ = DailySummary.objects.update_or_create(
+        user_id=user_id, date=day,
+        defaults=_summary_defaults(log_values, meal_values)
+    )
+    return summary
+
+
+def rebuild_daily_summaries(user_ids=None, batch_size=1000):
+    """Rebuild DailySummary rows from scratch (for all users or the given ids).
+
+    Uses one grouped query per source table. Returns the number of rows written.
+    """
+    from .query_utils import bucket_nutrition
+
+    logs = HealthLog.objects.all()
+    entries = NutritionEntry.objects.all()
+    summaries = DailySummary.objects.all()
+    if user_ids is not None:
+        logs = logs.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+        summaries = summaries.filter(user_id__in=user_ids)
+
+    rows = {}
+    for values in logs.values('user_id', 'date', *LOG_FIELDS).order_by():
+        rows[(values['user_id'], values['date'])] = [values, None]
+
+    for values in bucket_nutrition(entries, 'day', group_by=['user_id']):
+        meal_values = {name: values[f'total_{field}'] for name, field in MEAL_FIELDS.items()}
+        meal_values['meal_count'] = values['entry_count']
+        rows.setdefault((values['user_id'], values['period']), [None, None])[1] = meal_values
+
+    objs = [
+        DailySummary(user_id=user_id, date=day, **_summary_defaults(log_values, meal_values))
+        for (user_id, day), (log_values, meal_values) in rows.items()
+    ]
+    with transaction.atomic():
+        summaries.delete()
+        DailySummary.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
+
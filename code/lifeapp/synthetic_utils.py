@@ -0,0 +1,215 @@
+"""Vectorised synthetic users, health logs and meals for load tests and benchmarks.
+
+Every series of every user is drawn at once with NumPy: a per-user baseline and
+fitness, a day-to-day activity factor that persists (AR(1), so good and bad stretches
+last a few days), a slow per-user drift and a weekend effect. Steps, exercise,
+calories, water, sleep and mood all load on the same factors, so they move together
+the way real logs do, and the meals of a day split that day's calories, macros and
+water. The rows are then written in bulk, without signals.
+"""
+from datetime import datetime, time, timedelta
+from itertools import repeat
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from .models import HealthLog, NutritionEntry, UserProfile
+
+# rows per bulk INSERT
+BULK_BATCH_SIZE = 1000
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+# usual hour of the n-th meal of a day; meals past the third are snacks
+MEAL_HOURS = [8.0, 13.0, 19.0, 16.0, 10.5, 21.5]
+MOODS = ['terrible', 'bad', 'okay', 'good', 'excellent']
+GENDERS = ['male', 'female', 'other']
+ACTIVITY_LEVELS = ['sedentary', 'light', 'moderate', 'very', 'extra']
+
+# day-to-day persistence of the activity factor
+ACTIVITY_PERSISTENCE = 0.8
+
+
+def draw_profiles(rng, count):
+    """Per-user attributes as arrays of length `count`; `fitness` (standard normal)
+    drives both the activity level and the baselines of the daily series."""
+    fitness = rng.standard_normal(count)
+    gender = rng.choice(len(GENDERS), size=count, p=[0.48, 0.48, 0.04])
+    height = np.where(gender == 0, rng.normal(178, 7, count), rng.normal(165, 7, count)).clip(145, 205)
+    bmi = (rng.normal(25.5, 3.5, count) - 1.2 * fitness).clip(17, 42)
+    weight = bmi * (height / 100) ** 2
+    # everyone above a BMI of 25 aims for it; the rest keep their weight give or take
+    target = np.where(bmi > 25, 25 * (height / 100) ** 2, weight + rng.normal(0, 1.5, count))
+    level = np.digitize(fitness + rng.normal(0, 0.5, count), [-1.0, -0.3, 0.5, 1.3])
+    return {
+        'fitness': fitness,
+        'age': rng.integers(18, 76, count),
+        'gender': gender,
+        'height': height.round(1),
+        'weight': weight.round(1),
+        'target_weight': target.round(1),
+        'activity_level': level,
+    }
+
+
+def draw_logs(rng, profiles, days, start):
+    """Daily HealthLog values as users × days arrays, column 0 being `start`."""
+    count = len(profiles['fitness'])
+    fitness = profiles['fitness'][:, None]
+
+    innovations = rng.standard_normal((count, days)) * np.sqrt(1 - ACTIVITY_PERSISTENCE ** 2)
+    activity = np.empty((count, days))
+    activity[:, 0] = rng.standard_normal(count)
+    for d in range(1, days):
+        activity[:, d] = ACTIVITY_PERSISTENCE * activity[:, d - 1] + innovations[:, d]
+    # up to about ±1 standard deviation of change over a year
+    drift = rng.normal(0, 0.5, (count, 1)) * np.arange(days) / 365
+    weekend = np.array([(start + timedelta(days=d)).weekday() >= 5 for d in range(days)])
+    level = activity + drift
+
+    exercise = (30 + 12 * fitness + 15 * level - 10 * weekend + rng.normal(0, 12, (count, days))).clip(0)
+    steps = (
+        (7500 + 2000 * fitness) * (1 + 0.2 * level) - 1200 * weekend + 60 * exercise
+        + rng.normal(0, 900, (count, days))
+    ).clip(0)
+    base_calories = 10 * profiles['weight'] + 6.25 * profiles['height'] - 5 * profiles['age'] + 600
+    calories = (base_calories[:, None] + 4 * exercise + 150 * weekend + rng.normal(0, 180, (count, days))).clip(800)
+
+    protein_share = (rng.normal(0.20, 0.03, (count, 1)) + rng.normal(0, 0.02, (count, days))).clip(0.1, 0.35)
+    fat_share = (rng.normal(0.30, 0.04, (count, 1)) + rng.normal(0, 0.03, (count, days))).clip(0.15, 0.45)
+    water = (2.0 + 0.3 * fitness + 0.01 * exercise + 0.15 * level + rng.normal(0, 0.3, (count, days))).clip(0.5)
+    sleep = (
+        rng.normal(7.2, 0.5, (count, 1)) + 0.15 * level + 0.6 * weekend + rng.normal(0, 0.6, (count, days))
+    ).clip(3, 11)
+    heart_rate = (68 - 5 * fitness + rng.normal(0, 3, (count, days))).clip(40, 120)
+    mood = np.digitize(
+        0.8 * (sleep - 7.2) + 0.5 * level + rng.normal(0, 0.7, (count, days)), [-1.5, -0.5, 0.5, 1.5]
+    )
+    return {
+        'calories_intake': calories.round().astype(int),
+        'protein': (calories * protein_share / 4).round(1),
+        'carbs': (calories * (1 - protein_share - fat_share) / 4).round(1),
+        'fats': (calories * fat_share / 9).round(1),
+        'water_intake': water.round(2),
+        'steps': steps.round().astype(int),
+        'exercise_duration': exercise.round().astype(int),
+        'sleep_hours': sleep.round(1),
+        'heart_rate': heart_rate.round().astype(int),
+        'mood': mood,
+    }
+
+
+def draw_meals(rng, logs, meals_per_day):
+    """Split each day's intake over `meals_per_day` meals: users × days × meals arrays.
+
+    `hour` is the time of day of the meal, in hours.
+    """
+    count, days = logs['calories_intake'].shape
+    weights = [3.0, 4.0, 5.0, 1.5, 1.5, 1.5]
+    alpha = [weights[m % len(weights)] for m in range(meals_per_day)]
+    share = rng.dirichlet(alpha, size=(count, days))
+    water_share = rng.dirichlet(alpha, size=(count, days))
+    calories = logs['calories_intake'][..., None] * share
+    hours = np.array([MEAL_HOURS[m % len(MEAL_HOURS)] for m in range(meals_per_day)])
+    return {
+        'calories': calories.round().astype(int),
+        'protein': (logs['protein'][..., None] * share).round(1),
+        'carbs': (logs['carbs'][..., None] * share).round(1),
+        'fat': (logs['fats'][..., None] * share).round(1),
+        'fiber': (calories / 1000 * rng.normal(14, 3, calories.shape)).clip(0).round(1),
+        # about half of the day's water comes with meals
+        'water': (logs['water_intake'][..., None] * 500 * water_share).round().astype(int),
+        'hour': (hours + rng.normal(0, 0.75, share.shape)).clip(0, 23.9),
+    }
+
+
+def _insert(model, columns, batch_size):
+    """INSERT rows given as {field name: column of database-ready values} with executemany.
+
+    At this volume bulk_create spends most of its time building model instances and
+    preparing every value field by field, so the rows go straight to the cursor
+    instead. Fields left out get their database default. Returns the number of rows.
+    """
+    quote = connection.ops.quote_name
+    fields = list(columns)
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(model._meta.get_field(field).column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    rows = list(zip(*columns.values()))
+    with connection.cursor() as cursor:
+        for lo in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[lo:lo + batch_size])
+    return len(rows)
+
+
+def create_users(usernames, password=None, batch_size=BULK_BATCH_SIZE):
+    """Bulk-create users sharing one password (unusable when None); returns their ids in order."""
+    # one hash for everyone: hashing per user would take longer than all the inserts
+    password = make_password(password)
+    User.objects.bulk_create((User(username=name, password=password) for name in usernames), batch_size=batch_size)
+    ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    return [ids[name] for name in usernames]
+
+
+def generate_population(rng, usernames, days, meals_per_day, end, password=None, batch_size=BULK_BATCH_SIZE):
+    """Create users with profiles, a HealthLog for each of the `days` days up to `end`
+    and `meals_per_day` NutritionEntries per day, all from `rng`.
+
+    No signals are sent, so callers refresh DailySummary and recommendations for
+    the returned user ids. Returns (user_ids, row counts).
+    """
+    user_ids = create_users(usernames, password=password, batch_size=batch_size)
+    profiles = draw_profiles(rng, len(user_ids))
+    UserProfile.objects.bulk_create(
+        (UserProfile(
+            user_id=user_id, age=age, height=height, weight=weight, target_weight=target,
+            gender=GENDERS[gender], activity_level=ACTIVITY_LEVELS[level],
+        ) for user_id, age, height, weight, target, gender, level in zip(
+            user_ids, *(profiles[key].tolist() for key in (
+                'age', 'height', 'weight', 'target_weight', 'gender', 'activity_level'
+            ))
+        )),
+        batch_size=batch_size
+    )
+
+    start = end - timedelta(days=days - 1)
+    count = len(user_ids)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    logs = draw_logs(rng, profiles, days, start)
+    # plain Python values: database drivers don't bind NumPy scalars
+    log_rows = _insert(HealthLog, dict(
+        {field: values.ravel().tolist() for field, values in logs.items() if field != 'mood'},
+        user=np.repeat(user_ids, days).tolist(),
+        date=[connection.ops.adapt_datefield_value(start + timedelta(days=d)) for d in range(days)] * count,
+        mood=np.array(MOODS)[logs['mood'].ravel()].tolist(),
+        exercise_type=repeat(''), notes=repeat(''), created_at=repeat(now), updated_at=repeat(now),
+    ), batch_size)
+
+    meal_rows = 0
+    if meals_per_day > 0:
+        meals = draw_meals(rng, logs, meals_per_day)
+        midnight = timezone.make_aware(datetime.combine(start, time.min))
+        # seconds since the first midnight, capped so today's later meals aren't in the future
+        limit = (timezone.now() - midnight).total_seconds()
+        seconds = (np.arange(days)[None, :, None] * 86400 + meals['hour'] * 3600).clip(max=limit).astype(int)
+        meal_types = [MEAL_TYPES[min(m, len(MEAL_TYPES) - 1)] for m in range(meals_per_day)]
+        meal_rows = _insert(NutritionEntry, dict(
+            {field: meals[field].ravel().tolist() for field in ('calories', 'water', 'protein', 'carbs', 'fat', 'fiber')},
+            user=np.repeat(user_ids, days * meals_per_day).tolist(),
+            meal_type=meal_types * (count * days),
+            created_at=[
+                connection.ops.adapt_datetimefield_value(midnight + timedelta(seconds=second))
+                for second in seconds.ravel().tolist()
+            ],
+            notes=repeat(''),
+        ), batch_size)
+
+    return user_ids, {
+        'users': count,
+        'health_logs': log_rows,
+        'nutrition_entries': meal_rows,
+    }
@@ -1,3 +1,1004 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import traceback
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Avg, Count, Max, Sum
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import numpy as np
+
+from lifeapp import views
+from lifeapp.backtest import rolling_backtest, window_grid
+from lifeapp.cache_utils import (
+    _dashboard_version, _version_key, batched_dashboard_invalidation, get_dashboard_payload, invalidate_dashboard_cache,
+)
+from lifeapp.comparison_utils import Period, calendar_periods, compare_periods, period_deltas, trailing_periods
+from lifeapp.evaluate_prediction import evaluate_user, recommend_windows
+from lifeapp.export_utils import EXPORT_DATASETS
+from lifeapp.goal_utils import recompute_goal_progress
+from lifeapp.ml import (
+    DEFAULT_PAST_DAYS, data_revision, forecast_window, load_metric_matrix, predict_metrics, predict_user_metrics,
+    save_forecast_windows,
+)
+from lifeapp.models import DailySummary, Goal, HealthLog, NutritionEntry, Recommendation, TrendStats, UserProfile
+from lifeapp.query_utils import decode_log_cursor, encode_log_cursor, log_history_page, nutrition_totals
+from lifeapp.recommendation_utils import (
+    RECOMMENDATION_RULES, RECOMMENDATION_TEMPLATES, build_recommendations, generate_recommendations_batch,
+)
+from lifeapp.summary_utils import rebuild_daily_summaries
+from lifeapp.synthetic_utils import generate_population
+from lifeapp.trend_stats import (
+    SUM_FIELDS, TREND_METRICS, TREND_WINDOW_DAYS, compute_trend_stats, load_trend_stats, predict_from_stats,
+    rebuild_trend_stats,
+)
+
+# Modules that booting the site or running a non-forecasting command must never import
+HEAVY_MODULES = ['matplotlib', 'sklearn']
+
+# Generous wall-clock budget (seconds) for django.setup() plus the probe body
+STARTUP_BUDGET_SECONDS = 5.0
+
+# values for the required HealthLog fields of hand-written fixtures
+LOG_DEFAULTS = {
+    'calories_intake': 2000, 'protein': 80, 'carbs': 250, 'fats': 70, 'water_intake': 2.0,
+    'steps': 8000, 'exercise_duration': 30, 'sleep_hours': 7.5,
+}
+
+# view name -> (HTTP method, most queries one cold-cache request may run); the budget
+# holds for any history length and any number of chart metrics
+QUERY_BUDGETS = {
+    'dashboard': ('get', 13),
+    'dashboard_data': ('get', 11),
+    'nutrition_tracking': ('get', 6),
+    'manage_goals': ('get', 7),
+    'view_logs': ('get', 3),
+    'view_logs_data': ('get', 3),
+    'view_recommendations': ('get', 5),
+    'regenerate_recommendations': ('post', 7),
+    'add_health_log': ('get', 3),
+    'export_data': ('get', 6),
+    'edit_health_log': ('get', 3),
+    'delete_health_log': ('post', 12),
+    'edit_nutrition_entry': ('get', 3),
+    'delete_nutrition_entry': ('post', 10),
+    'edit_profile': ('get', 3),
+    'create_profile': ('get', 3),
+}
+
+# view name -> function(user) that prepares one request and returns its URL args;
+# every request runs in a transaction that is rolled back, so targets are fresh each time
+VIEW_SETUP = {
+    'export_data': lambda user: ['all', 'ndjson'],
+    'edit_health_log': lambda user: [HealthLog.objects.filter(user=user).latest('date').id],
+    'delete_health_log': lambda user: [spare_log(user).id],
+    'edit_nutrition_entry': lambda user: [NutritionEntry.objects.filter(user=user).latest('created_at').id],
+    'delete_nutrition_entry': lambda user: [
+        NutritionEntry.objects.create(user=user, meal_type='snack', calories=100, water=0).id
+    ],
+    # the form is only shown to users without a profile
+    'create_profile': lambda user: UserProfile.objects.filter(user=user).delete() and [],
+}
+
+BOOT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+{body}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in sys.modules if m.split('.')[0] in {heavy!r})
+print(json.dumps({{'elapsed': elapsed, 'heavy': heavy}}))
+"""
+
+
+def make_log(user, day, **values):
+    """Create a HealthLog through the ORM, so every signal handler runs."""
+    return HealthLog.objects.create(user=user, date=day, **dict(LOG_DEFAULTS, **values))
+
+
+def spare_log(user):
+    """A new log dated the day before the user's history starts."""
+    first = HealthLog.objects.filter(user=user).earliest('date').date
+    return make_log(user, first - timedelta(days=1))
+
+
+class StartupImportTests(SimpleTestCase):
+    """Worker boot and plain management commands stay free of plotting/ML libraries."""
+
+    def probe(self, body):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='lifetrack.settings')
+        code = BOOT_PROBE.format(body=body, heavy=HEAVY_MODULES)
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def assertLightweight(self, body):
+        report = self.probe(body)
+        self.assertEqual(report['heavy'], [])
+        self.assertLess(report['elapsed'], STARTUP_BUDGET_SECONDS)
+
+    def test_web_worker_boot(self):
+        self.assertLightweight(
+            "from lifetrack.wsgi import application\n"
+            "from django.urls import resolve\n"
+            "resolve('/dashboard/')"
+        )
+
+    def test_non_forecasting_command(self):
+        self.assertLightweight(
+            "from django.core.management import call_command\n"
+            "call_command('check', verbosity=0)"
+        )
+
+    def test_evaluation_module_defers_plotting(self):
+        self.assertLightweight("import lifeapp.evaluate_prediction")
+
+
+class RecommendationRuleTests(SimpleTestCase):
+    """The rule table is data: check it is consistent and picks the expected bands."""
+
+    AVERAGES = {'calories': 3000, 'protein': 10, 'fiber': 30, 'water': 900,
+                'carbs': 0, 'fat': 50, 'steps': 3000, 'sleep': 5.5}
+
+    def test_every_band_has_templates(self):
+        for rule in RECOMMENDATION_RULES:
+            for band in rule.bands:
+                self.assertTrue(RECOMMENDATION_TEMPLATES.get(band.template), band.template)
+            self.assertEqual(rule.bands[-1].when, 'always', rule.metric)
+
+    def test_first_matching_band_wins(self):
+        titles = {rec.title for rec in build_recommendations(1, self.AVERAGES, bmi_val=25, limit=None)}
+        self.assertEqual(titles, {
+            'High calorie pattern', 'Increase protein', 'Fiber tip', 'Carb tip', 'Fat tip',
+            'Hydration', 'Activity', 'Sleep', 'Consider weight management',
+        })
+
+    def test_limit(self):
+        self.assertEqual(len(build_recommendations(1, self.AVERAGES)), 3)
+
+
+class RollingBacktestTests(SimpleTestCase):
+    """Every origin and horizon of a users × days matrix is scored in one pass."""
+
+    def test_linear_series(self):
+        Y = np.vstack([np.arange(40.0) * 2 + 10, np.full(40, np.nan)])
+        Y[0, -1] = np.nan
+        results = rolling_backtest(Y, past_days=10, horizon=3, forecasters=('trend', 'mean'))
+        trend, mean = results['trend'], results['mean']
+        self.assertEqual([row['n'] for row in trend], [29, 28, 27])
+        for row in trend:
+            self.assertAlmostEqual(row['mae'], 0)
+            self.assertEqual(row['direction_accuracy'], 1)
+        # the window mean lags a rising line by (past_days - 1) / 2 + h days of slope
+        self.assertEqual([row['mae'] for row in mean], [11, 13, 15])
+        self.assertEqual([row['mae_diff'] for row in mean], [11, 13, 15])
+
+    def test_horizon_capped_by_history(self):
+        results = rolling_backtest(np.ones((2, 12)), past_days=10, horizon=7)
+        self.assertEqual(len(results['trend']), 2)
+
+
+class ForecastWindowTests(SimpleTestCase):
+    """Tuned windows are chosen from the grid and read back by the forecasters."""
+
+    def test_window_grid_scores_every_window_on_the_same_days(self):
+        Y = np.arange(60.0)[None, :] * 3
+        grid = window_grid(Y, [5, 10, 20], horizon=2)
+        self.assertEqual({p: [row['n'] for row in rows] for p, rows in grid.items()},
+                         {5: [40, 39], 10: [40, 39], 20: [40, 39]})
+
+    def test_recommend_windows(self):
+        search = {
+            'steps': {'users': 3, 'grid': {7: {7: 900.0}, 14: {7: 850.0}, 30: {7: 870.0}}},
+            'protein': {'users': 3, 'grid': {7: {7: 0.0}, 30: {7: 0.0}, 60: {7: 0.0}}},
+            'carbs': {'users': 0, 'grid': {7: {7: None}}},
+        }
+        recommended = recommend_windows(search, horizon=7)
+        self.assertEqual(recommended['steps']['past_days'], 14)
+        self.assertEqual(recommended['protein']['past_days'], DEFAULT_PAST_DAYS)
+        self.assertNotIn('carbs', recommended)
+
+    def test_stored_windows_are_read_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'forecast_windows.json')
+            with override_settings(FORECAST_WINDOWS_FILE=path):
+                self.assertEqual(forecast_window('steps'), DEFAULT_PAST_DAYS)
+                save_forecast_windows({'steps': {'past_days': 14, 'mae': 850.0}})
+                self.assertEqual(forecast_window('steps'), 14)
+                self.assertEqual(forecast_window('sleep_hours'), DEFAULT_PAST_DAYS)
+
+
+class BenchCommandTests(TestCase):
+    """manage.py bench runs end to end on a tiny population and leaves no data behind."""
+
+    def test_small_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            call_command('bench', users=2, days=10, meals_per_day=2, repeat=2, output=output, stdout=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+        self.assertEqual(set(report['views']), {
+            'dashboard', 'dashboard_data', 'nutrition_tracking', 'manage_goals',
+            'view_logs', 'view_recommendations', 'regenerate_recommendations',
+        })
+        for modes in report['views'].values():
+            for row in modes.values():
+                self.assertTrue(all(status < 400 for status in row['status']), row)
+                self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+        self.assertFalse(User.objects.exists())
+
+
+class SyntheticDataTests(TestCase):
+    """generate_synthetic_data writes consistent logs, meals and summaries in batches."""
+
+    def test_generates_population(self):
+        from django.utils import timezone
+        from lifeapp.models import DailySummary, HealthLog, NutritionEntry
+
+        call_command(
+            'generate_synthetic_data', users=3, days=5, meals_per_day=2, batch_size=2, stdout=io.StringIO()
+        )
+        self.assertEqual(User.objects.filter(username__startswith='synthetic_').count(), 3)
+        self.assertEqual(HealthLog.objects.count(), 15)
+        self.assertEqual(NutritionEntry.objects.count(), 30)
+        self.assertFalse(NutritionEntry.objects.filter(created_at__gt=timezone.now()).exists())
+        # every day's meals were dated on that day and add up to its logged calories
+        for summary in DailySummary.objects.all():
+            self.assertEqual(summary.meal_count, 2)
+            self.assertAlmostEqual(summary.meal_calories, summary.calories_intake, delta=1)
+
+        out = io.StringIO()
+        call_command('generate_synthetic_data', users=1, stdout=out)
+        self.assertIn('already exist', out.getvalue())
+
+
+def _call_site():
+    """The innermost frame of project code (outside Django and this file) on the stack."""
+    base = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(base) and 'site-packages' not in frame.filename and frame.filename != __file__:
+            return f'{os.path.relpath(frame.filename, base)}:{frame.lineno} in {frame.name}'
+    return '(django)'
+
+
+class QueryLog:
+    """Records each query with its call site; install with connection.execute_wrapper."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((_call_site(), sql))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self):
+        """The queries grouped by call site, busiest first, with repeats counted."""
+        by_site = defaultdict(list)
+        for site, sql in self.queries:
+            by_site[site].append(sql)
+        lines = []
+        for site, statements in sorted(by_site.items(), key=lambda item: -len(item[1])):
+            lines.append(f'{len(statements):>4}  {site}')
+            lines.extend(f'        {count}x {sql[:300]}' for sql, count in Counter(statements).most_common())
+        return '\n'.join(lines)
+
+
+class QueryBudgetTests(TestCase):
+    """Each view stays within its query budget, and its query count does not grow with
+    the length of the history or the number of chart metrics selected."""
+
+    VOLUMES = (1, 365)
+    CHART_PARAMS = (TREND_METRICS[:1], TREND_METRICS)
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        rng = np.random.default_rng(0)
+        cls.users = {}
+        for days in cls.VOLUMES:
+            (user_id,), _ = generate_population(rng, [f'budget_{days}'], days, 3, today)
+            Goal.objects.bulk_create([
+                Goal(user_id=user_id, goal_type='steps', target_value=10000, deadline=today + timedelta(days=30)),
+                Goal(user_id=user_id, goal_type='sleep', target_value=8, deadline=today + timedelta(days=14)),
+            ])
+            cls.users[days] = User.objects.get(id=user_id)
+        rebuild_daily_summaries()
+        generate_recommendations_batch([user.id for user in cls.users.values()])
+        for user in cls.users.values():
+            rebuild_trend_stats(user.id)
+
+    def count_queries(self, name, days, chart_params):
+        """Queries of one request to `name` with an empty cache, after a first request
+        has warmed up the session; streamed responses are read to the end."""
+        method, _ = QUERY_BUDGETS[name]
+        setup = VIEW_SETUP.get(name, lambda user: [])
+        user = self.users[days]
+        client = Client()
+        client.force_login(user)
+        session = client.session
+        session['chart_params'] = list(chart_params)
+        session.save()
+        with transaction.atomic():
+            getattr(client, method)(reverse(name, args=setup(user)))
+            url = reverse(name, args=setup(user))
+            cache.clear()
+            log = QueryLog()
+            with connection.execute_wrapper(log):
+                response = getattr(client, method)(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400)
+        return log
+
+    # small export chunks, so the longer history spans several fetches
+    @mock.patch('lifeapp.export_utils.EXPORT_CHUNK_SIZE', 100)
+    def test_query_budgets(self):
+        for name, (_, budget) in QUERY_BUDGETS.items():
+            baseline = self.count_queries(name, self.VOLUMES[0], self.CHART_PARAMS[0])
+            for days in self.VOLUMES:
+                for chart_params in self.CHART_PARAMS:
+                    with self.subTest(view=name, days=days, metrics=len(chart_params)):
+                        log = self.count_queries(name, days, chart_params)
+                        self.assertLessEqual(
+                            len(log), budget, f'{name} ran {len(log)} queries, budget {budget}:\n{log.report()}'
+                        )
+                        self.assertLessEqual(
+                            len(log), len(baseline),
+                            f'{name} ran {len(log)} queries with {days} days and {len(chart_params)} metrics, '
+                            f'{len(baseline)} with {self.VOLUMES[0]} day and 1 metric:\n'
+                            f'{log.report()}\n  -- baseline --\n{baseline.report()}'
+                        )
+
+
+class DashboardCacheTests(TestCase):
+    """A write moves the user's dashboard cache version, so the next request rebuilds."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='cached')
+        self.other = User.objects.create(username='bystander')
+        UserProfile.objects.create(user=self.user, age=30, height=175, weight=70, gender='other', activity_level='light')
+        self.client.force_login(self.user)
+
+    def get(self, name):
+        with mock.patch('lifeapp.views.build_dashboard_payload', wraps=views.build_dashboard_payload) as payload, \
+                mock.patch('lifeapp.views.build_dashboard_context', wraps=views.build_dashboard_context) as context:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return payload.call_count + context.call_count
+
+    def test_write_invalidates_dashboard(self):
+        for name in ('dashboard', 'dashboard_data'):
+            self.assertEqual(self.get(name), 1)
+            self.assertEqual(self.get(name), 0)
+
+        version = _dashboard_version(self.user.id)
+        other_version = _dashboard_version(self.other.id)
+        make_log(self.user, timezone.localdate())
+        self.assertNotEqual(cache.get(_version_key(self.user.id)), version)
+        self.assertEqual(cache.get(_version_key(self.other.id)), other_version)
+
+        for name in ('dashboard', 'dashboard_data'):
+            self.assertEqual(self.get(name), 1)
+            self.assertEqual(self.get(name), 0)
+
+    def test_invalidate_dashboard_cache(self):
+        params = ['steps']
+        build = mock.Mock(return_value={'steps': 1})
+        get_dashboard_payload(self.user.id, 'data', params, build)
+        get_dashboard_payload(self.user.id, 'data', params, build)
+        self.assertEqual(build.call_count, 1)
+        invalidate_dashboard_cache(self.user.id)
+        get_dashboard_payload(self.user.id, 'data', params, build)
+        self.assertEqual(build.call_count, 2)
+
+
+class PerformanceTimingTests(TestCase):
+    """PerformanceTimingMiddleware's Server-Timing header and over-budget warnings."""
+
+    SERVER_TIMING = re.compile(
+        r'db;desc="(\d+) queries";dur=\d+\.\d'
+        r'(?:, [a-z]+;desc="[^"]+";dur=\d+\.\d)*'
+        r', total;dur=\d+\.\d'
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='timed')
+        make_log(self.user, timezone.localdate())
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('dashboard_data'))
+        header = response['Server-Timing']
+        self.assertRegex(header, f'^{self.SERVER_TIMING.pattern}$')
+        self.assertIn('ml;desc="Forecasting";dur=', header)
+        self.assertGreater(int(self.SERVER_TIMING.match(header).group(1)), 0)
+
+    @override_settings(PERF_QUERY_BUDGET=1, PERF_LATENCY_BUDGET_MS=None)
+    def test_query_budget_warning(self):
+        with self.assertLogs('lifeapp.perf', 'WARNING') as logs:
+            response = self.client.get(reverse('dashboard_data'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['over_budget'], ['queries'])
+        self.assertEqual((line['path'], line['status']), (reverse('dashboard_data'), 200))
+        self.assertEqual(str(line['db_queries']), self.SERVER_TIMING.match(response['Server-Timing']).group(1))
+
+    @override_settings(PERF_QUERY_BUDGET=1000, PERF_LATENCY_BUDGET_MS=None)
+    def test_within_budget_is_quiet(self):
+        with self.assertNoLogs('lifeapp.perf'):
+            self.client.get(reverse('dashboard_data'))
+
+    @override_settings(PERF_TIMING_ENABLED=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard_data')))
+
+
+class LogHistoryPaginationTests(TestCase):
+    """Keyset pagination of the log history: cursors, page boundaries and bad input."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='history')
+        self.today = timezone.localdate()
+        # five logs with a gap, plus another user's logs on the same dates
+        self.days = [self.today - timedelta(days=d) for d in (0, 1, 2, 4, 5)]
+        other = User.objects.create(username='neighbour')
+        for day in self.days:
+            make_log(self.user, day)
+            make_log(other, day)
+        self.client.force_login(self.user)
+
+    def page(self, **params):
+        data = self.client.get(reverse('view_logs_data'), params).json()
+        return [row['date'] for row in data['logs']], data['next_cursor']
+
+    def test_cursor_round_trip(self):
+        cursor = encode_log_cursor(self.today)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_log_cursor(cursor), self.today)
+
+    def test_pages_cover_history_once(self):
+        dates, cursor = self.page(page_size=2)
+        pages = [dates]
+        while cursor:
+            dates, cursor = self.page(page_size=2, cursor=cursor)
+            pages.append(dates)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), [day.isoformat() for day in self.days])
+
+    def test_exact_page_has_no_next_cursor(self):
+        dates, cursor = self.page(page_size=5)
+        self.assertEqual(len(dates), 5)
+        self.assertIsNone(cursor)
+        # the cursor points past the last row of its page, not at it
+        dates, cursor = self.page(page_size=1, cursor=encode_log_cursor(self.days[2]))
+        self.assertEqual((dates, cursor), ([self.days[3].isoformat()], encode_log_cursor(self.days[3])))
+
+    def test_page_links_keep_page_size(self):
+        response = self.client.get(reverse('view_logs'), {'page_size': 2})
+        self.assertEqual(len(response.context['logs']), 2)
+        cursor = encode_log_cursor(self.days[1])
+        self.assertContains(response, f'href="?cursor={cursor}&amp;page_size=2"')
+
+        response = self.client.get(reverse('view_logs'), {'page_size': 2, 'cursor': cursor})
+        self.assertEqual([log['date'] for log in response.context['logs']], self.days[2:4])
+        self.assertContains(response, f'href="{reverse("view_logs")}?page_size=2"')
+        # without a chosen size the links carry none
+        self.assertNotContains(self.client.get(reverse('view_logs')), 'page_size')
+
+    def test_bad_cursor_starts_over(self):
+        first, _ = self.page(page_size=2)
+        for cursor in ('!!!', 'bm90LWEtZGF0ZQ', encode_log_cursor(self.today)[:-1], '\u00e9'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_log_cursor(cursor))
+                self.assertEqual(self.page(page_size=2, cursor=cursor)[0], first)
+        response = self.client.get(reverse('view_logs'), {'cursor': '!!!'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_same_date_never_ties(self):
+        # the cursor is the date alone, which is safe because a user has one log per date
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            HealthLog.objects.create(user=self.user, date=self.today, **LOG_DEFAULTS)
+        rows, _ = log_history_page(self.user, page_size=10)
+        self.assertEqual(len(rows), len(self.days))
+
+
+class ExportTests(TestCase):
+    """export_data streams one row per record of the requesting user only."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='exporter')
+        today = timezone.localdate()
+        for days_ago in range(3):
+            make_log(self.user, today - timedelta(days=days_ago), notes='ran, then\nswam')
+        NutritionEntry.objects.create(user=self.user, meal_type='lunch', calories=600, water=250)
+        make_log(User.objects.create(username='private'), today)
+        self.client.force_login(self.user)
+
+    def export(self, dataset, fmt):
+        response = self.client.get(reverse('export_data', args=[dataset, fmt]))
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export('health_logs', 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="lifetrack-health_logs.csv"')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], EXPORT_DATASETS['health_logs'][1])
+        self.assertEqual(len(rows), 1 + 3)
+        self.assertEqual({row[rows[0].index('notes')] for row in rows[1:]}, {'ran, then\nswam'})
+
+    def test_ndjson_all(self):
+        response, body = self.export('all', 'ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(Counter(record['type'] for record in records), {'health_logs': 3, 'nutrition_entries': 1})
+
+    def test_unknown_exports(self):
+        for dataset, fmt in (('all', 'csv'), ('passwords', 'csv'), ('goals', 'xml')):
+            with self.subTest(dataset=dataset, fmt=fmt):
+                self.assertEqual(self.client.get(reverse('export_data', args=[dataset, fmt])).status_code, 404)
+
+
+class ComparePeriodsTests(TestCase):
+    """compare_periods and the daily meal buckets against hand-computed totals."""
+
+    END = date(2026, 3, 15)
+
+    def setUp(self):
+        self.user = User.objects.create(username='compare')
+        for day, steps, sleep in ((1, 1000, 6.0), (7, 3000, 8.5), (8, 5000, 7.0), (14, 7000, 6.5), (15, 99999, 12.0)):
+            make_log(self.user, date(2026, 3, day), steps=steps, sleep_hours=sleep)
+        # meals on both sides of the midnight between the two weeks, and at the end bound
+        for moment, calories in (
+            (datetime(2026, 3, 7, 23, 59, 59), 400),
+            (datetime(2026, 3, 8, 0, 0), 600),
+            (datetime(2026, 3, 8, 12, 0), 500),
+            (datetime(2026, 3, 15, 0, 0), 9999),
+        ):
+            entry = NutritionEntry.objects.create(user=self.user, meal_type='snack', calories=calories, water=0)
+            NutritionEntry.objects.filter(pk=entry.pk).update(created_at=timezone.make_aware(moment))
+
+    def test_trailing_weeks(self):
+        periods = trailing_periods(self.END, days=7, count=3)
+        self.assertEqual([(p.start.day, p.end.day) for p in periods], [(8, 15), (1, 8), (22, 1)])
+        with self.assertNumQueries(2):
+            results = compare_periods(
+                self.user, periods,
+                health_metrics={'avg_steps': (Avg, 'steps'), 'max_sleep': (Max, 'sleep_hours')},
+                nutrition_metrics={'calories': (Sum, 'calories'), 'meals': (Count, 'id')},
+            )
+        self.assertEqual(results, {
+            'current': {'avg_steps': 6000, 'max_sleep': 7.0, 'calories': 1100, 'meals': 2},
+            'previous': {'avg_steps': 2000, 'max_sleep': 8.5, 'calories': 400, 'meals': 1},
+            'period_2': {'avg_steps': None, 'max_sleep': None, 'calories': None, 'meals': 0},
+        })
+        deltas = period_deltas(results['current'], results['previous'], ['avg_steps', 'calories'])
+        self.assertEqual(deltas, {
+            'avg_steps': {'value': 200.0, 'is_positive': True},
+            'calories': {'value': 175.0, 'is_positive': True},
+        })
+
+    def test_daily_meal_buckets(self):
+        totals = nutrition_totals(self.user, date(2026, 3, 7), date(2026, 3, 8))
+        self.assertEqual(
+            [(row['period'], row['entry_count'], row['total_calories']) for row in totals],
+            [(date(2026, 3, 7), 1, 400), (date(2026, 3, 8), 2, 1100)],
+        )
+
+
+class CalendarPeriodsTests(TestCase):
+    """Month-over-month and year-over-year comparisons on calendar periods."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='calendar')
+
+    def log(self, day, steps):
+        make_log(self.user, day, steps=steps)
+
+    def meal(self, moment, calories):
+        entry = NutritionEntry.objects.create(user=self.user, meal_type='snack', calories=calories, water=0)
+        NutritionEntry.objects.filter(pk=entry.pk).update(created_at=timezone.make_aware(moment))
+
+    def compare(self, periods):
+        return compare_periods(
+            self.user, periods,
+            health_metrics={'avg_steps': (Avg, 'steps')},
+            nutrition_metrics={'calories': (Sum, 'calories')},
+        )
+
+    def test_january_month_over_month(self):
+        for day, steps in ((date(2025, 11, 30), 500), (date(2025, 12, 1), 1000), (date(2025, 12, 31), 2000),
+                           (date(2026, 1, 10), 4000), (date(2026, 1, 11), 99999)):
+            self.log(day, steps)
+        self.meal(datetime(2025, 12, 31, 23, 59, 59), 300)
+        self.meal(datetime(2026, 1, 1, 0, 0), 700)
+
+        periods = calendar_periods(date(2026, 1, 10), 'month', count=3)
+        self.assertEqual(periods, [
+            Period('current', date(2026, 1, 1), date(2026, 1, 11)),
+            Period('previous', date(2025, 12, 1), date(2026, 1, 1)),
+            Period('period_2', date(2025, 11, 1), date(2025, 12, 1)),
+        ])
+        self.assertEqual(self.compare(periods), {
+            'current': {'avg_steps': 4000, 'calories': 700},
+            'previous': {'avg_steps': 1500, 'calories': 300},
+            'period_2': {'avg_steps': 500, 'calories': None},
+        })
+
+    def test_year_over_year(self):
+        for day, steps in ((date(2024, 12, 31), 100), (date(2025, 6, 1), 3000),
+                           (date(2026, 1, 1), 7000), (date(2026, 3, 14), 9000)):
+            self.log(day, steps)
+        self.meal(datetime(2025, 12, 31, 23, 59, 59), 300)
+
+        periods = calendar_periods(date(2026, 3, 14), 'year')
+        self.assertEqual(periods, [
+            Period('current', date(2026, 1, 1), date(2026, 3, 15)),
+            Period('previous', date(2025, 1, 1), date(2026, 1, 1)),
+        ])
+        self.assertEqual(self.compare(periods), {
+            'current': {'avg_steps': 8000, 'calories': None},
+            'previous': {'avg_steps': 3000, 'calories': 300},
+        })
+
+    def test_unknown_unit(self):
+        for unit in ('week', 'months', ''):
+            with self.subTest(unit=unit), self.assertRaises(ValueError):
+                calendar_periods(date(2026, 1, 10), unit)
+
+
+class DailySummarySignalTests(TestCase):
+    """The signal-maintained DailySummary rows follow log saves, edits and deletes."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='summary')
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def summaries(self):
+        return dict(DailySummary.objects.filter(user=self.user).values_list('date', 'steps'))
+
+    def test_save_edit_and_delete(self):
+        log = make_log(self.user, self.today, steps=5000)
+        self.assertEqual(self.summaries(), {self.today: 5000})
+
+        log = HealthLog.objects.get(pk=log.pk)
+        log.steps = 6000
+        log.save()
+        self.assertEqual(self.summaries(), {self.today: 6000})
+
+        log = HealthLog.objects.get(pk=log.pk)
+        log.delete()
+        self.assertEqual(self.summaries(), {})
+
+    def test_date_edit_refreshes_both_days(self):
+        log = make_log(self.user, self.today, steps=5000)
+        NutritionEntry.objects.create(user=self.user, meal_type='lunch', calories=600, water=250)
+        log = HealthLog.objects.get(pk=log.pk)
+        log.date = self.yesterday
+        log.save()
+        # today keeps its meal but no longer has a log
+        self.assertEqual(self.summaries(), {self.today: None, self.yesterday: 5000})
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today).meal_count, 1)
+
+        # a second edit of the same instance moves it from the date it was saved with
+        log.date = self.yesterday - timedelta(days=1)
+        log.save()
+        self.assertEqual(self.summaries(), {self.today: None, log.date: 5000})
+
+
+class TrendStatsTests(TestCase):
+    """The signal-maintained trend sums always equal a recount of the window's logs."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='trend')
+        self.today = timezone.now().date()
+
+    def assertMatchesRecount(self, today=None):
+        stored = {s.metric: s for s in TrendStats.objects.filter(user=self.user)}
+        expected = compute_trend_stats(self.user.id, today)
+        for metric in TREND_METRICS:
+            for field in SUM_FIELDS:
+                self.assertAlmostEqual(getattr(stored[metric], field), getattr(expected[metric], field), msg=f'{metric}.{field}')
+
+    def test_window_holds_exactly_its_days(self):
+        make_log(self.user, self.today - timedelta(days=TREND_WINDOW_DAYS - 1))
+        make_log(self.user, self.today - timedelta(days=TREND_WINDOW_DAYS))
+        self.assertEqual(TrendStats.objects.get(user=self.user, metric='steps').n, 1)
+
+    def test_edit_subtracts_old_values(self):
+        for days_ago in (0, 3, 7):
+            make_log(self.user, self.today - timedelta(days=days_ago), steps=1000 * days_ago)
+        log = HealthLog.objects.get(user=self.user, date=self.today - timedelta(days=3))
+        log.steps = 12345
+        log.save()
+        self.assertMatchesRecount()
+
+        # moving a log to another day in the window, then out of it
+        log.date = self.today - timedelta(days=5)
+        log.save()
+        self.assertMatchesRecount()
+        log.date = self.today - timedelta(days=TREND_WINDOW_DAYS + 5)
+        log.save()
+        self.assertMatchesRecount()
+        self.assertEqual(TrendStats.objects.get(user=self.user, metric='steps').n, 2)
+
+    def test_delete_subtracts_values(self):
+        for days_ago in (0, 3, 7):
+            make_log(self.user, self.today - timedelta(days=days_ago), steps=1000 * days_ago)
+        HealthLog.objects.get(user=self.user, date=self.today).delete()
+        self.assertMatchesRecount()
+        self.assertEqual(TrendStats.objects.get(user=self.user, metric='steps').n, 2)
+
+    def test_window_slides_forward(self):
+        for days_ago in (0, 10, 29):
+            make_log(self.user, self.today - timedelta(days=days_ago))
+        later = self.today + timedelta(days=5)
+        stats, rebuilt = load_trend_stats(self.user.id, later, save=True)
+        self.assertFalse(rebuilt)
+        self.assertEqual(stats['steps'].n, 2)
+        self.assertMatchesRecount(later)
+
+    def test_write_to_a_day_that_just_left_the_window(self):
+        left = self.today - timedelta(days=TREND_WINDOW_DAYS)
+        make_log(self.user, left, steps=8000)
+        make_log(self.user, self.today - timedelta(days=5), steps=6000)
+        # stats last written yesterday, when `left` was still in the window
+        yesterday = self.today - timedelta(days=1)
+        rebuild_trend_stats(self.user.id, yesterday)
+        log = HealthLog.objects.get(user=self.user, date=left)
+        log.steps = 92000
+        log.save()
+        self.assertMatchesRecount()
+
+        rebuild_trend_stats(self.user.id, yesterday)
+        HealthLog.objects.get(user=self.user, date=left).delete()
+        self.assertMatchesRecount()
+        self.assertEqual(TrendStats.objects.get(user=self.user, metric='steps').n, 1)
+
+    def test_reads_do_not_write(self):
+        for days_ago in (0, 10, 29):
+            make_log(self.user, self.today - timedelta(days=days_ago))
+        before = list(TrendStats.objects.filter(user=self.user).values_list('metric', *SUM_FIELDS).order_by('metric'))
+        predict_from_stats(self.user, ['steps'], today=self.today + timedelta(days=5))
+        after = list(TrendStats.objects.filter(user=self.user).values_list('metric', *SUM_FIELDS).order_by('metric'))
+        self.assertEqual(after, before)
+
+        TrendStats.objects.filter(user=self.user).delete()
+        self.assertIsNotNone(predict_from_stats(self.user, ['steps'])['steps'])
+        self.assertFalse(TrendStats.objects.filter(user=self.user).exists())
+
+    def test_forecast_uses_calendar_days(self):
+        # a perfect line with gaps: x must count days, not logs
+        for days_ago in (20, 12, 0):
+            make_log(self.user, self.today - timedelta(days=days_ago), steps=5000 - 100 * days_ago)
+        forecast = predict_from_stats(self.user, ['steps'], predict_days=2)['steps']
+        self.assertEqual(forecast['values'], [5100.0, 5200.0])
+
+
+class ServedForecastTests(TestCase):
+    """Every forecast window is fitted like the backtests score it: exactly `past_days`
+    days up to today, on calendar-day x."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='forecast')
+        self.today = timezone.now().date()
+
+    def test_tuned_window_uses_calendar_days(self):
+        # a line with gaps, plus a stray value one day before the 14-day window
+        for days_ago in (13, 9, 4, 0):
+            make_log(self.user, self.today - timedelta(days=days_ago), steps=5000 - 100 * days_ago)
+        make_log(self.user, self.today - timedelta(days=14), steps=99999)
+        forecast = predict_user_metrics(self.user, ['steps'], past_days=14, predict_days=2)['steps']
+        self.assertEqual(forecast['values'], [5100.0, 5200.0])
+
+    def test_matrix_path_matches_trend_sums(self):
+        rng = np.random.default_rng(1)
+        for days_ago in rng.choice(40, size=25, replace=False).tolist():
+            make_log(self.user, self.today - timedelta(days=days_ago), steps=int(rng.integers(3000, 12000)))
+        from_sums = predict_user_metrics(self.user, ['steps'], past_days=30)['steps']
+        from_matrix = predict_metrics(load_metric_matrix(self.user, ['steps'], past_days=30))['steps']
+        np.testing.assert_allclose(from_matrix['values'], from_sums['values'], atol=0.011)
+
+
+class EvaluateUserTests(TestCase):
+    """evaluate_user as of now is cached under the user's data revision."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='evaluate')
+        self.today = timezone.now().date()
+        for days_ago in range(37):
+            make_log(self.user, self.today - timedelta(days=days_ago), steps=6000 + (days_ago % 5) * 300)
+
+    def test_cached_until_data_changes(self):
+        first = evaluate_user(self.user, metrics=['steps'])
+        self.assertEqual(set(first), {'metrics'})
+        self.assertIsNotNone(first['metrics']['steps']['regression'])
+        # a hit fits nothing
+        with mock.patch('lifeapp.evaluate_prediction.load_backtests') as load:
+            self.assertEqual(evaluate_user(self.user, metrics=['steps']), first)
+        load.assert_not_called()
+
+        HealthLog.objects.get(user=self.user, date=self.today).delete()
+        make_log(self.user, self.today, steps=20000)
+        self.assertNotEqual(evaluate_user(self.user, metrics=['steps']), first)
+
+    def test_meal_edit_moves_revision(self):
+        entry = NutritionEntry.objects.create(user=self.user, meal_type='lunch', calories=600, water=250)
+        revision = data_revision(self.user)
+        entry.calories = 900
+        entry.save()
+        self.assertNotEqual(data_revision(self.user), revision)
+
+
+class EvaluateModelOutputTests(TestCase):
+    """evaluate_model writes one JSON line per user and --resume continues a cut-off file."""
+
+    def setUp(self):
+        today = timezone.now().date()
+        self.users = [User.objects.create(username=f'eval_{i}') for i in range(3)]
+        for i, user in enumerate(self.users):
+            for days_ago in range(20):
+                make_log(user, today - timedelta(days=days_ago), steps=6000 + 50 * i * days_ago)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, 'results.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_command(self, **options):
+        call_command('evaluate_model', metric='steps', output=self.output, chunk_size=2, stdout=io.StringIO(), **options)
+        with open(self.output) as f:
+            return f.read().splitlines()
+
+    def test_writes_one_line_per_user(self):
+        lines = self.run_command()
+        results = [json.loads(line) for line in lines]
+        self.assertEqual([r['user'] for r in sorted(results, key=lambda r: r['user_id'])], ['eval_0', 'eval_1', 'eval_2'])
+        self.assertTrue(all('steps' in r['metrics'] for r in results))
+
+    def test_resume_skips_finished_users_after_partial_line(self):
+        first = self.run_command()
+        by_id = {json.loads(line)['user_id']: line for line in first}
+        # an interrupted run: one finished user, then half of the next line
+        with open(self.output, 'w') as f:
+            f.write(by_id[self.users[0].id] + '\n' + by_id[self.users[1].id][:20])
+
+        lines = self.run_command(resume=True)
+        self.assertEqual(lines[0], by_id[self.users[0].id])
+        self.assertEqual(lines[1], by_id[self.users[1].id][:20])
+        results = [json.loads(line) for line in lines[2:]]
+        self.assertEqual(sorted(r['user_id'] for r in results), [self.users[1].id, self.users[2].id])
+        self.assertEqual(results, [json.loads(by_id[r['user_id']]) for r in results])
+
+
+class GenerateRecommendationsCommandTests(TestCase):
+    """generate_recommendations replaces each user's recommendations, moving each
+    user's dashboard cache version once per batch."""
+
+    def setUp(self):
+        today = timezone.now().date()
+        self.users = [User.objects.create(username=f'rec_{i}') for i in range(3)]
+        for i, user in enumerate(self.users):
+            # short sleep and few steps trigger recommendations
+            make_log(user, today, sleep_hours=5 + i, steps=3000)
+            Recommendation.objects.create(user=user, category='lifestyle', priority='low', title='stale', message='stale')
+            Recommendation.objects.create(user=user, category='lifestyle', priority='low', title='stale', message='older')
+
+    def test_replaces_recommendations_in_batches(self):
+        out = io.StringIO()
+        with mock.patch('lifeapp.cache_utils.cache', wraps=cache) as wrapped:
+            call_command('generate_recommendations', all=True, batch_size=2, stdout=out)
+        versions = Counter(
+            call.args[0] for call in wrapped.set.call_args_list if call.args[0].startswith(_version_key(''))
+        )
+
+        self.assertIn('Batch 2/2', out.getvalue())
+        self.assertEqual(versions, {_version_key(user.id): 1 for user in self.users})
+        self.assertFalse(Recommendation.objects.filter(title='stale').exists())
+        for user in self.users:
+            self.assertTrue(1 <= Recommendation.objects.filter(user=user).count() <= 3)
+
+    def test_batched_invalidation_nests(self):
+        version = _dashboard_version(self.users[0].id)
+        with batched_dashboard_invalidation():
+            with batched_dashboard_invalidation():
+                invalidate_dashboard_cache(self.users[0].id)
+            self.assertEqual(_dashboard_version(self.users[0].id), version)
+        self.assertNotEqual(_dashboard_version(self.users[0].id), version)
+
+    def test_single_user_and_missing_selection(self):
+        call_command('generate_recommendations', user='rec_0', stdout=io.StringIO())
+        self.assertFalse(Recommendation.objects.filter(user=self.users[0], title='stale').exists())
+        self.assertTrue(Recommendation.objects.filter(user=self.users[1], title='stale').exists())
+
+        out = io.StringIO()
+        call_command('generate_recommendations', stdout=out)
+        self.assertIn('Pass --all or --user', out.getvalue())
+
+
+class GoalProgressTests(TestCase):
+    """Goal progress is the average of the matching log field over the goal's window,
+    kept current as logs are saved; progress entered by hand is left alone."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='goals')
+        self.today = timezone.now().date()
+        # days 1-3 fall in the goals' window, day 0 is past the deadline, 4-5 before creation
+        for days_ago in range(6):
+            make_log(
+                self.user, self.today - timedelta(days=days_ago),
+                steps=4000 + 1000 * days_ago, sleep_hours=6 + 0.5 * days_ago,
+            )
+        deadline = self.today - timedelta(days=1)
+        self.goals = {
+            goal_type: Goal.objects.create(
+                user=self.user, goal_type=goal_type, target_value=target, current_value=1.2, deadline=deadline,
+            )
+            for goal_type, target in (('steps', 10000), ('sleep', 7), ('water', 3), ('weight', 70))
+        }
+        created = timezone.now() - timedelta(days=3)
+        Goal.objects.exclude(goal_type='water').update(created_at=created)
+
+    def test_progress_is_the_window_average(self):
+        self.assertEqual(recompute_goal_progress(batch_size=1), 2)
+        goals = {goal.goal_type: goal for goal in Goal.objects.filter(user=self.user)}
+        # (5000 + 6000 + 7000) / 3 steps, (6.5 + 7 + 7.5) / 3 hours of sleep
+        self.assertEqual((goals['steps'].current_value, goals['steps'].is_achieved), (6000, False))
+        self.assertEqual((goals['sleep'].current_value, goals['sleep'].is_achieved), (7, True))
+        # no logs in the water goal's window, and weight is not tracked
+        self.assertEqual(goals['water'].current_value, 1.2)
+        self.assertEqual(goals['weight'].current_value, 1.2)
+
+    def test_saving_a_log_moves_progress(self):
+        log = HealthLog.objects.get(user=self.user, date=self.today - timedelta(days=2))
+        log.steps = 9000
+        log.save()
+        goal = Goal.objects.get(pk=self.goals['steps'].pk)
+        # (5000 + 9000 + 7000) / 3
+        self.assertEqual((goal.current_value, goal.progress_source), (7000, 'logs'))
+
+        HealthLog.objects.get(user=self.user, date=self.today - timedelta(days=1)).delete()
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_value, 8000)
+
+    def test_logging_keeps_manual_progress(self):
+        client = Client()
+        client.force_login(self.user)
+        goal = self.goals['steps']
+        client.post(reverse('manage_goals'), {'update_goal': '1', 'goal_id': goal.id, 'current_value': '7500'})
+        goal.refresh_from_db()
+        self.assertEqual(goal.progress_source, 'manual')
+
+        log = HealthLog.objects.get(user=self.user, date=self.today - timedelta(days=2))
+        log.steps = 9000
+        log.save()
+        HealthLog.objects.get(user=self.user, date=self.today - timedelta(days=1)).delete()
+        recompute_goal_progress()
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_value, 7500)
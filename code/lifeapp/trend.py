@@ -0,0 +1,84 @@
+"""Closed-form least-squares trend lines.
+
+A one-feature linear fit only needs the sums n, Σx, Σy, Σxy and Σx², so several
+metrics can be fitted at once as the columns of one matrix. Missing values are
+passed as NaN and only drop out of their own column.
+"""
+import numpy as np
+
+
+def fit_trend(x, Y):
+    """Fit y = intercept + slope * x for every column of `Y`.
+
+    `x` is a 1-D array of day indices and `Y` a matching 1-D array or
+    (len(x), k) matrix that may contain NaN for missing values. Returns
+    (slope, intercept, n) arrays of length k, where n counts the values used
+    per column. Columns with a single distinct x get a flat line at their mean.
+    """
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+
+    observed = ~np.isnan(Y)
+    W = observed.astype(float)
+    Yz = np.where(observed, Y, 0.0)
+
+    n = W.sum(axis=0)
+    sx = x @ W
+    sxx = (x * x) @ W
+    sy = Yz.sum(axis=0)
+    sxy = x @ Yz
+
+    slope, intercept = trend_from_sums(n, sx, sy, sxy, sxx)
+    return slope, intercept, n
+
+
+def trend_from_sums(n, sx, sy, sxy, sxx):
+    """Solve the least-squares line from its sufficient statistics.
+
+    Accepts scalars or arrays; returns (slope, intercept). Zero-variance x gives
+    a flat line at the mean, and n == 0 gives a NaN intercept.
+    """
+    n, sx, sy, sxy, sxx = (np.asarray(v, dtype=float) for v in (n, sx, sy, sxy, sxx))
+    denom = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denom != 0, (n * sxy - sx * sy) / np.where(denom != 0, denom, 1), 0.0)
+        intercept = np.where(n > 0, (sy - slope * sx) / np.where(n > 0, n, 1), np.nan)
+    return slope, intercept
+
+
+def predict_trend(slope, intercept, x):
+    """Evaluate fitted trend lines at `x`; returns a (len(x), k) matrix."""
+    x = np.asarray(x, dtype=float)
+    return np.outer(x, slope) + intercept
+
+
+def regression_scores(y_true, y_pred):
+    """R², MAE and RMSE of a forecast (R² follows sklearn for constant targets)."""
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    err = y_true - y_pred
+    ss_res = float(np.sum(err ** 2))
+    ss_tot = float(np.sum((y_true - y_true.mean()) ** 2))
+    if ss_tot == 0:
+        r2 = 1.0 if ss_res == 0 else 0.0
+    else:
+        r2 = 1 - ss_res / ss_tot
+    mae = float(np.mean(np.abs(err)))
+    rmse = float(np.sqrt(np.mean(err ** 2)))
+    return {'r2': r2, 'mae': mae, 'rmse': rmse}
+
+
+def direction_scores(y_true_bin, y_pred_bin):
+    """Accuracy, precision, recall and F1 of binary labels (0 where undefined)."""
+    t = np.asarray(y_true_bin, dtype=bool)
+    p = np.asarray(y_pred_bin, dtype=bool)
+    tp = float(np.sum(t & p))
+    fp = float(np.sum(~t & p))
+    fn = float(np.sum(t & ~p))
+    accuracy = float(np.mean(t == p)) if len(t) else 0.0
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'accuracy': accuracy, 'precision': precision, 'recall': recall, 'f1': f1}
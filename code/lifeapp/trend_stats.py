@@ -0,0 +1,189 @@
+"""Incremental least-squares trend statistics per (user, metric).
+
+Each TrendStats row keeps the running sums of the user's HealthLogs inside a sliding
+window of TREND_WINDOW_DAYS ending today. x is the calendar day, as in every other
+forecast (ml.forecast_columns, backtest). Saves and deletes subtract the old values
+and add the new ones, and reads advance the window by subtracting the days that fell
+out of it, so forecasting never needs to read the user's history. Only writes
+persist the sums; reads work on an in-memory copy, and the first write after the
+window has moved on recomputes it.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import HealthLog, TrendStats
+
+TREND_WINDOW_DAYS = 30
+TREND_EPOCH = date(2000, 1, 1)
+TREND_METRICS = ['calories_intake', 'protein', 'carbs', 'fats', 'water_intake', 'steps', 'exercise_duration', 'sleep_hours']
+
+SUM_FIELDS = ['n', 'sum_x', 'sum_y', 'sum_xy', 'sum_xx', 'window_start']
+
+
+def day_index(day):
+    """x coordinate of a date in the trend sums."""
+    return float((day - TREND_EPOCH).days)
+
+
+def _window_start(today):
+    # the window holds exactly TREND_WINDOW_DAYS days, today included
+    return today - timedelta(days=TREND_WINDOW_DAYS - 1)
+
+
+def _apply(stats, day, value, sign):
+    if value is None:
+        return
+    x = day_index(day)
+    y = float(value)
+    stats.n += sign
+    if stats.n <= 0:
+        # reset exactly so rounding errors never outlive an empty window
+        stats.n = 0
+        stats.sum_x = stats.sum_y = stats.sum_xy = stats.sum_xx = 0.0
+        return
+    stats.sum_x += sign * x
+    stats.sum_y += sign * y
+    stats.sum_xy += sign * x * y
+    stats.sum_xx += sign * x * x
+
+
+def _apply_row(stats_by_metric, day, values, sign):
+    window_start = next(iter(stats_by_metric.values())).window_start
+    if day < window_start:
+        return
+    for metric in TREND_METRICS:
+        _apply(stats_by_metric[metric], day, values.get(metric), sign)
+
+
+def compute_trend_stats(user_id, today=None):
+    """A user's trend stats computed from their HealthLogs in the current window, unsaved."""
+    today = today or timezone.now().date()
+    start = _window_start(today)
+    stats = {metric: TrendStats(user_id=user_id, metric=metric, window_start=start) for metric in TREND_METRICS}
+    rows = HealthLog.objects.filter(user_id=user_id, date__gte=start).values_list('date', *TREND_METRICS)
+    for row in rows:
+        _apply_row(stats, row[0], dict(zip(TREND_METRICS, row[1:])), 1)
+    return stats
+
+
+def rebuild_trend_stats(user_id, today=None):
+    """Recompute a user's trend stats from their HealthLogs in the current window and store them."""
+    stats = compute_trend_stats(user_id, today)
+    with transaction.atomic():
+        TrendStats.objects.filter(user_id=user_id).delete()
+        TrendStats.objects.bulk_create(stats.values())
+    return stats
+
+
+def discard_trend_stats(user_id):
+    """Drop a user's trend stats; they are rebuilt on next use."""
+    TrendStats.objects.filter(user_id=user_id).delete()
+
+
+def load_trend_stats(user_id, today=None, save=False):
+    """Return ({metric: TrendStats}, rebuilt) with the window advanced to `today`.
+
+    `rebuilt` is True when the stats were recomputed from the current HealthLog rows.
+    Missing stats and a window advance are only written back with `save`, so reads
+    never write.
+    """
+    today = today or timezone.now().date()
+    stats = {s.metric: s for s in TrendStats.objects.filter(user_id=user_id)}
+    if set(stats) != set(TREND_METRICS):
+        if save:
+            return rebuild_trend_stats(user_id, today), True
+        return compute_trend_stats(user_id, today), True
+
+    old_start = min(s.window_start for s in stats.values())
+    new_start = _window_start(today)
+    if new_start > old_start:
+        # subtract the days that slid out of the window
+        rows = HealthLog.objects.filter(
+            user_id=user_id, date__gte=old_start, date__lt=new_start
+        ).values_list('date', *TREND_METRICS)
+        for row in rows:
+            _apply_row(stats, row[0], dict(zip(TREND_METRICS, row[1:])), -1)
+        for s in stats.values():
+            s.window_start = new_start
+        if save:
+            TrendStats.objects.bulk_update(stats.values(), SUM_FIELDS)
+    return stats, False
+
+
+def _lock_for_write(user_id):
+    """Lock a user's trend stats for a log write; returns ({metric: TrendStats}, rebuilt).
+
+    Missing stats, and stats whose window has moved on, are rebuilt from the rows as
+    they are after the write: sliding would subtract the written row's new values
+    instead of its old ones.
+    """
+    today = timezone.now().date()
+    stats = {s.metric: s for s in TrendStats.objects.filter(user_id=user_id).select_for_update()}
+    if set(stats) != set(TREND_METRICS) or any(s.window_start != _window_start(today) for s in stats.values()):
+        return rebuild_trend_stats(user_id, today), True
+    return stats, False
+
+
+def _current_values(log):
+    return {metric: getattr(log, metric, None) for metric in TREND_METRICS}
+
+
+def _remember(log):
+    log._loaded_values = dict(_current_values(log), date=log.date)
+
+
+def record_log_saved(log, created):
+    """Fold a saved HealthLog into its user's trend stats (subtract-then-add on edit)."""
+    previous = getattr(log, '_loaded_values', None)
+    tracked = ['date'] + TREND_METRICS
+    with transaction.atomic():
+        stats, rebuilt = _lock_for_write(log.user_id)
+        if not rebuilt:
+            if not created and (previous is None or any(f not in previous for f in tracked)):
+                # no reliable snapshot of the old values
+                rebuild_trend_stats(log.user_id)
+            else:
+                if not created:
+                    _apply_row(stats, previous['date'], previous, -1)
+                _apply_row(stats, log.date, _current_values(log), 1)
+                TrendStats.objects.bulk_update(stats.values(), SUM_FIELDS)
+    _remember(log)
+
+
+def record_log_deleted(log):
+    """Remove a deleted HealthLog from its user's trend stats."""
+    previous = getattr(log, '_loaded_values', None)
+    if previous is None or any(f not in previous for f in ['date'] + TREND_METRICS):
+        previous = dict(_current_values(log), date=log.date)
+    with transaction.atomic():
+        stats, rebuilt = _lock_for_write(log.user_id)
+        if not rebuilt:
+            _apply_row(stats, previous['date'], previous, -1)
+            TrendStats.objects.bulk_update(stats.values(), SUM_FIELDS)
+
+
+def predict_from_stats(user, metric_fields, predict_days=7, today=None, min_points=3):
+    """Forecast `metric_fields` from the user's trend sums without reading their logs.
+
+    Returns {field: {'dates', 'values'} or None}; fields that are not tracked map to None.
+    Nothing is written: missing or stale stats are brought up to date in memory.
+    """
+    from .trend import trend_from_sums
+
+    today = today or timezone.now().date()
+    stats, _ = load_trend_stats(user.id, today)
+    future = [today + timedelta(days=i + 1) for i in range(predict_days)]
+    pred_dates = [d.strftime('%m-%d') for d in future]
+
+    forecasts = {}
+    for field in metric_fields:
+        s = stats.get(field)
+        if s is None or s.n < min_points:
+            forecasts[field] = None
+            continue
+        slope, intercept = trend_from_sums(s.n, s.sum_x, s.sum_y, s.sum_xy, s.sum_xx)
+        values = [float(round(float(intercept + slope * day_index(d)), 2)) for d in future]
+        forecasts[field] = {'dates': pred_dates, 'values': values}
+    return forecasts
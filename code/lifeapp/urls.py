@@ -14,6 +14,8 @@ urlpatterns = [
     path("logout/", views.logout_view, name="logout"),
     path("add_log/", views.add_health_log, name="add_health_log"),
     path("view_logs/", views.view_logs, name="view_logs"),
+    path("view_logs/data/", views.view_logs_data, name="view_logs_data"),
+    path("export/<slug:dataset>.<slug:fmt>", views.export_data, name="export_data"),
     path("logs/edit/<int:log_id>/", views.edit_health_log, name="edit_health_log"),
     path("logs/delete/<int:log_id>/", views.delete_health_log, name="delete_health_log"),
     path("manage_goals/", views.manage_goals, name="manage_goals"),
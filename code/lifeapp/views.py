@@ -1,6 +1,7 @@
 from .forms import NutritionEntryForm, CustomPasswordResetForm, CustomUserCreationForm
-from django.http import HttpResponse
-from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse, Http404
+from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
@@ -16,9 +17,18 @@ from .forms import UserProfileForm, HealthLogForm, GoalForm
 from .forms import ProfileForm
 from django.views.decorators.http import require_http_methods
 # ML predictions
-from .ml import predict_metric
+from .ml import data_revision, cached_predict_metrics, cached_predict_weight_bmi
+from .query_utils import load_log_window, window_series, load_summary_window, summarize_meals, log_history_page
+from .cache_utils import get_dashboard_payload, invalidate_dashboard_cache
+from .perf import render
+from .comparison_utils import trailing_periods, compare_periods, period_deltas, percent_change
+from .goal_utils import GoalSuggestionEngine, goal_stats
+from .export_utils import EXPORT_DATASETS, EXPORT_FORMATS, iter_csv, iter_ndjson
 # from .ai_recommendations import generate_recommendations  # Optional AI module
 
+# Chart parameters shown when the user has not picked any
+DEFAULT_CHART_PARAMS = ['calories_intake', 'steps', 'sleep_hours']
+
 
 @login_required
 def nutrition_tracking(request):
@@ -47,32 +57,16 @@ def nutrition_tracking(request):
     # Ensure date range variables exist even if userprofile is missing
     today = timezone.now()
     week_ago = today - timedelta(days=7)
-    two_weeks_ago = today - timedelta(days=14)
 
     if hasattr(request.user, 'userprofile'):
-
-        # Current week stats
-        current_week_logs = HealthLog.objects.filter(
-            user=request.user,
-            date__gte=week_ago,
-            date__lt=today
-        )
-        # Previous week stats
-        prev_week_logs = HealthLog.objects.filter(
-            user=request.user,
-            date__gte=two_weeks_ago,
-            date__lt=week_ago
-        )
-
-        # Calculate averages
-        curr_week_stats = current_week_logs.aggregate(
-            avg_steps=Avg('steps'),
-            avg_exercise=Avg('exercise_duration')
-        )
-        prev_week_stats = prev_week_logs.aggregate(
-            avg_steps=Avg('steps'),
-            avg_exercise=Avg('exercise_duration')
-        )
+        # Current and previous week averages in one query
+        current_week, prev_week = trailing_periods(timezone.localdate(today), days=7)
+        stats = compare_periods(request.user, [current_week, prev_week], health_metrics={
+            'avg_steps': (Avg, 'steps'),
+            'avg_exercise': (Avg, 'exercise_duration'),
+        })
+        curr_week_stats = stats[current_week.name]
+        prev_week_stats = stats[prev_week.name]
 
         weekly_stats = {
             'avg_steps': curr_week_stats['avg_steps'],
@@ -82,39 +76,19 @@ def nutrition_tracking(request):
         }
 
         # Calculate percentage changes
-        def calculate_change(current, previous):
-            if current and previous and previous > 0:
-                change = ((current - previous) / previous) * 100
-                return {
-                    'value': abs(change),
-                    'is_positive': change >= 0
-                }
-            return {
-                'value': 0,
-                'is_positive': True
-            }
-
-        weekly_stats['steps_change'] = calculate_change(
-            weekly_stats['avg_steps'],
-            weekly_stats['prev_steps']
-        )
-
-        weekly_stats['exercise_change'] = calculate_change(
-            weekly_stats['avg_exercise'],
-            weekly_stats['prev_exercise']
-        )
+        changes = period_deltas(curr_week_stats, prev_week_stats, ['avg_steps', 'avg_exercise'])
+        weekly_stats['steps_change'] = changes['avg_steps']
+        weekly_stats['exercise_change'] = changes['avg_exercise']
 
     # Get recent entries
     recent_entries = NutritionEntry.objects.filter(user=request.user).order_by('-created_at')[:10]
     
-    # Prepare chart data
-    entries = NutritionEntry.objects.filter(
-        user=request.user,
-        created_at__gte=week_ago
-    ).order_by('created_at')
+    # Prepare chart data (daily calorie totals from the daily summaries)
+    summaries_by_date = load_summary_window(request.user, timezone.localdate(week_ago))
+    days = [summary for day, summary in sorted(summaries_by_date.items()) if summary.meal_count]
     
-    dates = [entry.created_at.strftime('%Y-%m-%d') for entry in entries]
-    calories_data = [entry.calories for entry in entries]
+    dates = [summary.date.strftime('%Y-%m-%d') for summary in days]
+    calories_data = [summary.meal_calories for summary in days]
     
     # Calculate macro distribution (include fiber)
     total_protein = sum(entry.protein for entry in recent_entries)
@@ -258,32 +232,39 @@ def dashboard(request):
     """Main user dashboard with stats and recommendations"""
     if not hasattr(request.user, 'userprofile'):
         return redirect('create_profile')
-    
-    profile = request.user.userprofile
-    today = timezone.now().date()
 
-    # Today's log
-    today_log = HealthLog.objects.filter(user=request.user, date=today).first()
+    selected_params = request.session.get('chart_params', DEFAULT_CHART_PARAMS)
+    context = get_dashboard_payload(
+        request.user.id, 'page', selected_params,
+        lambda: build_dashboard_context(request.user, request.session)
+    )
+    return render(request, 'dashboard.html', context)
+
+
+def build_dashboard_context(user, session):
+    """Build the dashboard template context. Querysets are evaluated so the
+    result can be cached."""
+    profile = user.userprofile
+    today = timezone.now().date()
 
     # Last 7 days dates
     week_ago = today - timedelta(days=7)
-    chart_dates = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(6, -1, -1)]
+    chart_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+    chart_dates = [day.strftime('%Y-%m-%d') for day in chart_days]
     
     # Get all logs for the past week
-    weekly_logs = HealthLog.objects.filter(user=request.user, date__gte=week_ago)
+    weekly_logs = HealthLog.objects.filter(user=user, date__gte=week_ago)
+    # Fetch the window once and index it by date for the per-day series
+    logs_by_date = load_log_window(user, week_ago, today)
+
+    # Today's log
+    today_log = logs_by_date.get(today)
     
     # Prepare daily metrics data
-    sleep_data = []
-    water_data = []
-    exercise_data = []
-    steps_data = []
-    
-    for date in chart_dates:
-        log = weekly_logs.filter(date=datetime.strptime(date, '%Y-%m-%d').date()).first()
-        sleep_data.append(float(log.sleep_hours if log and log.sleep_hours else 0))
-        water_data.append(float(log.water_intake if log and log.water_intake else 0))
-        exercise_data.append(float(log.exercise_duration if log and log.exercise_duration else 0))
-        steps_data.append(int(log.steps if log and log.steps else 0))
+    sleep_data = [float(v) for v in window_series(logs_by_date, chart_days, 'sleep_hours')]
+    water_data = [float(v) for v in window_series(logs_by_date, chart_days, 'water_intake')]
+    exercise_data = [float(v) for v in window_series(logs_by_date, chart_days, 'exercise_duration')]
+    steps_data = [int(v) for v in window_series(logs_by_date, chart_days, 'steps')]
 
     # Prepare activity data combining steps and exercise
     activity_data = {
@@ -306,11 +287,9 @@ def dashboard(request):
         ]
     }
 
-    # Nutrition data for the past week
-    nutrition_entries = NutritionEntry.objects.filter(
-        user=request.user,
-        created_at__date__gte=week_ago
-    ).order_by('created_at')
+    # Nutrition data for the past two weeks (one DailySummary row per day)
+    summaries_by_date = load_summary_window(user, week_ago - timedelta(days=7), today)
+    week_summaries = [s for d, s in sorted(summaries_by_date.items()) if d >= week_ago and s.meal_count]
 
     # Initialize calories data
     calories_data = {date: 0 for date in chart_dates}
@@ -318,14 +297,14 @@ def dashboard(request):
     entries_count = 0
 
     # Aggregate nutrition data
-    for entry in nutrition_entries:
-        date_str = entry.created_at.strftime('%Y-%m-%d')
+    for summary in week_summaries:
+        date_str = summary.date.strftime('%Y-%m-%d')
         if date_str in calories_data:
-            calories_data[date_str] += float(entry.calories or 0)
-            macros_total['protein'] += float(entry.protein or 0)
-            macros_total['carbs'] += float(entry.carbs or 0)
-            macros_total['fat'] += float(entry.fat or 0)
-            entries_count += 1
+            calories_data[date_str] += float(summary.meal_calories)
+            macros_total['protein'] += summary.meal_protein
+            macros_total['carbs'] += summary.meal_carbs
+            macros_total['fat'] += summary.meal_fat
+            entries_count += summary.meal_count
 
     # Calculate averages for macros
     if entries_count > 0:
@@ -344,17 +323,16 @@ def dashboard(request):
     }
 
     # Recent unread recommendations
-    recommendations = Recommendation.objects.filter(user=request.user, is_read=False)[:5]
+    recommendations = Recommendation.objects.filter(user=user, is_read=False)[:5]
 
     # Top suggestions for dashboard (1-2 highest priority/unread)
-    top_recommendations = Recommendation.objects.filter(user=request.user, is_read=False).order_by('-priority', '-created_at')[:2]
+    top_recommendations = Recommendation.objects.filter(user=user, is_read=False).order_by('-priority', '-created_at')[:2]
 
     # Active goals
-    active_goals = Goal.objects.filter(user=request.user, is_achieved=False)
+    active_goals = Goal.objects.filter(user=user, is_achieved=False)
 
     # Chart parameters selected by user (stored in session)
-    default_params = ['calories_intake', 'steps', 'sleep_hours']
-    selected_params = request.session.get('chart_params', default_params)
+    selected_params = session.get('chart_params', DEFAULT_CHART_PARAMS)
 
     # Map field keys to labels and color palette
     metrics_map = {
@@ -369,22 +347,20 @@ def dashboard(request):
     }
        
     # Build chart data: dates and series
-    dates = []
+    dates = [day.strftime('%m-%d') for day in chart_days]
     series = []
-    for i in range(6, -1, -1):
-        date = today - timedelta(days=i)
-        dates.append(date.strftime('%m-%d'))
+
+    # Load every selected metric in one query and fit all forecasts together
+    # (cached until the user's logs change)
+    revision = data_revision(user)
+    try:
+        forecasts = cached_predict_metrics(user, selected_params, predict_days=7, revision=revision)
+    except Exception:
+        # if ML lib not available or prediction fails, ignore
+        forecasts = {}
 
     for key in selected_params:
-        data_points = []
-        for i in range(6, -1, -1):
-            date = today - timedelta(days=i)
-            log = weekly_logs.filter(date=date).first()
-            if log:
-                value = getattr(log, key, 0) or 0
-            else:
-                value = 0
-            data_points.append(value)
+        data_points = window_series(logs_by_date, chart_days, key)
 
         meta = metrics_map.get(key, {'label': key, 'border': '#4f46e5', 'bg': 'rgba(79,70,229,0.08)'})
         series.append({
@@ -394,21 +370,17 @@ def dashboard(request):
             'backgroundColor': meta['bg']
         })
 
-        # Try to get simple ML predictions for this metric (next 7 days)
-        try:
-            pred = predict_metric(request.user, key, past_days=30, predict_days=7)
-            if pred:
-                series.append({
-                    'label': f"{meta['label']} (pred)",
-                    'data': pred['values'],
-                    'borderColor': meta['border'],
-                    'backgroundColor': meta['bg'],
-                    'dashed': True,
-                    'dates': pred['dates']
-                })
-        except Exception:
-            # if ML lib not available or prediction fails, ignore
-            pass
+        # Simple ML predictions for this metric (next 7 days)
+        pred = forecasts.get(key)
+        if pred:
+            series.append({
+                'label': f"{meta['label']} (pred)",
+                'data': pred['values'],
+                'borderColor': meta['border'],
+                'backgroundColor': meta['bg'],
+                'dashed': True,
+                'dates': pred['dates']
+            })
 
     chart_data = {
         'dates': dates,
@@ -487,22 +459,22 @@ def dashboard(request):
 
     # Get nutrition data for the past week (same format as nutrition_tracking view)
     nutrition_week_ago = today - timedelta(days=7)
-    nutrition_entries = NutritionEntry.objects.filter(
-        user=request.user,
-        created_at__gte=nutrition_week_ago
-    ).order_by('created_at')
-    
-    # Prepare chart data in the EXACT same format as nutrition_tracking.html
-    nutrition_dates = [entry.created_at.strftime('%Y-%m-%d') for entry in nutrition_entries]
-    nutrition_calories_data = [entry.calories for entry in nutrition_entries]
+    prev_week_start = nutrition_week_ago - timedelta(days=7)
+
+    # One point per logged day, taken from the daily summaries
+    nutrition_dates = [summary.date.strftime('%Y-%m-%d') for summary in week_summaries]
+    nutrition_calories_data = [summary.meal_calories for summary in week_summaries]
     
-    recent_nutrition = NutritionEntry.objects.filter(user=request.user).order_by('-created_at')[:10]
+    recent_nutrition = NutritionEntry.objects.filter(user=user).order_by('-created_at')[:10]
     
+    # Calculate weekly statistics
+    weekly_nutrition_stats = summarize_meals(week_summaries)
+
     # Calculate macro distribution from this week's data
-    total_protein = sum(float(entry.protein or 0) for entry in nutrition_entries)
-    total_carbs = sum(float(entry.carbs or 0) for entry in nutrition_entries)
-    total_fat = sum(float(entry.fat or 0) for entry in nutrition_entries)
-    total_fiber = sum(float(entry.fiber or 0) for entry in nutrition_entries)
+    total_protein = weekly_nutrition_stats['total_protein'] or 0
+    total_carbs = weekly_nutrition_stats['total_carbs'] or 0
+    total_fat = weekly_nutrition_stats['total_fat'] or 0
+    total_fiber = weekly_nutrition_stats['total_fiber'] or 0
     
     # Format macros data as array for Chart.js (same as nutrition_tracking)
     macros_distribution = [total_protein, total_carbs, total_fat, total_fiber]
@@ -517,63 +489,17 @@ def dashboard(request):
         dates_json = '[]'
         calories_data_json = '[]'
         macros_distribution_json = '[0,0,0,0]'
-    
-    # Calculate daily averages
-    num_days = max(1, len(set(entry.created_at.date() for entry in nutrition_entries)))
-    daily_averages = {
-        'calories': sum(float(entry.calories or 0) for entry in nutrition_entries) / num_days,
-        'protein': total_protein / num_days,
-        'carbs': total_carbs / num_days,
-        'fat': total_fat / num_days,
-        'fiber': (total_fiber or 0) / num_days
-    }
-    
-    # Calculate weekly statistics
-    weekly_nutrition_stats = NutritionEntry.objects.filter(
-        user=request.user,
-        created_at__gte=nutrition_week_ago
-    ).aggregate(
-        avg_calories=Avg('calories'),
-        avg_protein=Avg('protein'),
-        avg_carbs=Avg('carbs'),
-        avg_fat=Avg('fat'),
-        avg_fiber=Avg('fiber'),
-        total_calories=Sum('calories'),
-        total_protein=Sum('protein'),
-        total_carbs=Sum('carbs'),
-        total_fat=Sum('fat'),
-        total_fiber=Sum('fiber')
-    )
 
     # Get previous week's data for comparison
-    prev_week_start = nutrition_week_ago - timedelta(days=7)
-    prev_week_stats = NutritionEntry.objects.filter(
-        user=request.user,
-        created_at__gte=prev_week_start,
-        created_at__lt=nutrition_week_ago
-    ).aggregate(
-        total_calories=Sum('calories'),
-        total_protein=Sum('protein'),
-        total_carbs=Sum('carbs'),
-        total_fat=Sum('fat')
-    )
+    prev_week_stats = summarize_meals([
+        summary for d, summary in summaries_by_date.items() if prev_week_start <= d < nutrition_week_ago
+    ])
 
     # Calculate week-over-week changes
-    wow_changes = {}
-    for metric in ['calories', 'protein', 'carbs', 'fat']:
-        current = weekly_nutrition_stats.get(f'total_{metric}') or 0
-        previous = prev_week_stats.get(f'total_{metric}') or 0
-        if previous > 0:
-            change = ((current - previous) / previous) * 100
-            wow_changes[metric] = {
-                'value': abs(round(change, 1)),
-                'is_positive': change >= 0
-            }
-        else:
-            wow_changes[metric] = {
-                'value': 0,
-                'is_positive': True
-            }
+    wow_changes = {
+        metric: percent_change(weekly_nutrition_stats.get(f'total_{metric}'), prev_week_stats.get(f'total_{metric}'))
+        for metric in ['calories', 'protein', 'carbs', 'fat']
+    }
     
     # Nutrition charts data already prepared above
     
@@ -591,12 +517,12 @@ def dashboard(request):
         'profile': profile,
         'today_log': today_log,
         'weekly_stats': weekly_stats,
-        'recommendations': recommendations,
-        'active_goals': active_goals,
+        'recommendations': list(recommendations),
+        'active_goals': list(active_goals),
         'chart_data': json.dumps(chart_data),
         'selected_params': selected_params,
         'predictions': predictions,
-        'recent_nutrition': recent_nutrition,
+        'recent_nutrition': list(recent_nutrition),
         'nutrition_dates': nutrition_dates,
         'nutrition_calories_data': nutrition_calories_data,
         'calories_data_json': calories_data_json,
@@ -613,8 +539,7 @@ def dashboard(request):
 
     # Add weight/BMI predictions if available
     try:
-        from .ml import predict_weight_bmi
-        wb = predict_weight_bmi(request.user, past_days=30, predict_days=14)
+        wb = cached_predict_weight_bmi(user, past_days=30, predict_days=14, revision=revision)
         context['wb_predictions'] = wb
     except Exception:
         context['wb_predictions'] = None
@@ -653,7 +578,7 @@ def dashboard(request):
 
     context['wb_suggestions'] = wb_suggestions
 
-    return render(request, 'dashboard.html', context)
+    return context
 
 
 def _serialize_decimal(val):
@@ -682,8 +607,12 @@ def build_dashboard_payload(user, session):
             'activity_level': profile_obj.activity_level,
         }
 
+    # Fetch the week once and index it by date
+    logs_by_date = load_log_window(user, week_ago, today)
+    chart_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+
     # Today's log (simple fields)
-    today_log_obj = HealthLog.objects.filter(user=user, date=today).first()
+    today_log_obj = logs_by_date.get(today)
     today_log = None
     if today_log_obj:
         today_log = {
@@ -716,8 +645,7 @@ def build_dashboard_payload(user, session):
         })
 
     # Chart series (respect session selected params)
-    default_params = ['calories_intake', 'steps', 'sleep_hours']
-    selected_params = session.get('chart_params', default_params)
+    selected_params = session.get('chart_params', DEFAULT_CHART_PARAMS)
 
     metrics_map = {
         'calories_intake': {'label': 'Calories', 'border': '#ef4444', 'bg': 'rgba(239,68,68,0.08)'},
@@ -730,22 +658,11 @@ def build_dashboard_payload(user, session):
         'fats': {'label': 'Fats (g)', 'border': '#0891b2', 'bg': 'rgba(8,145,178,0.06)'}
     }
 
-    dates = []
-    for i in range(6, -1, -1):
-        date = today - timedelta(days=i)
-        dates.append(date.strftime('%m-%d'))
+    dates = [day.strftime('%m-%d') for day in chart_days]
 
     series = []
     for key in selected_params:
-        data_points = []
-        for i in range(6, -1, -1):
-            date = today - timedelta(days=i)
-            log = weekly_logs.filter(date=date).first()
-            if log:
-                value = getattr(log, key, 0) or 0
-            else:
-                value = 0
-            data_points.append(_serialize_decimal(value))
+        data_points = [_serialize_decimal(v) for v in window_series(logs_by_date, chart_days, key)]
 
         meta = metrics_map.get(key, {'label': key, 'border': '#4f46e5', 'bg': 'rgba(79,70,229,0.08)'})
         series.append({
@@ -757,38 +674,23 @@ def build_dashboard_payload(user, session):
 
     chart_data = {'dates': dates, 'series': series}
 
-    # Predictions (reuse predict_metric if available)
-    predictions = {}
+    # Predictions (cached until the user's logs change; empty if numpy isn't available)
     try:
-        for s in series:
-            try:
-                key_label = s['label']
-                # attempt a best-effort prediction call (using original key if available)
-                # predictions may fail silently if ml isn't available
-                pass
-            except Exception:
-                continue
+        forecasts = cached_predict_metrics(user, selected_params, predict_days=7)
+        predictions = {key: pred for key, pred in forecasts.items() if pred}
     except Exception:
         predictions = {}
 
-    # Nutrition week data
+    # Nutrition week data (one DailySummary row per day covers both weeks)
     nutrition_week_ago = today - timedelta(days=7)
-    nutrition_entries = NutritionEntry.objects.filter(user=user, created_at__gte=nutrition_week_ago).order_by('created_at')
-    nutrition_dates = [e.created_at.isoformat() for e in nutrition_entries]
-    calories_data = [int(e.calories) for e in nutrition_entries]
+    prev_week_start = nutrition_week_ago - timedelta(days=7)
+    summaries_by_date = load_summary_window(user, prev_week_start, today)
+    week_summaries = [s for d, s in sorted(summaries_by_date.items()) if d >= nutrition_week_ago and s.meal_count]
+    nutrition_dates = [s.date.isoformat() for s in week_summaries]
+    calories_data = [int(s.meal_calories) for s in week_summaries]
 
     # Weekly nutrition aggregates
-    weekly_nutrition_stats = NutritionEntry.objects.filter(user=user, created_at__gte=nutrition_week_ago).aggregate(
-        avg_calories=Avg('calories'),
-        avg_protein=Avg('protein'),
-        avg_carbs=Avg('carbs'),
-        avg_fat=Avg('fat'),
-        total_calories=Sum('calories'),
-        total_protein=Sum('protein'),
-        total_carbs=Sum('carbs'),
-        total_fat=Sum('fat')
-    )
-    weekly_nutrition_stats = {k: _serialize_decimal(v) for k, v in weekly_nutrition_stats.items()}
+    weekly_nutrition_stats = {k: _serialize_decimal(v) for k, v in summarize_meals(week_summaries).items()}
 
     # Recent nutrition entries
     recent_nutrition_qs = NutritionEntry.objects.filter(user=user).order_by('-created_at')[:10]
@@ -804,30 +706,14 @@ def build_dashboard_payload(user, session):
         })
 
     # week-over-week changes
-    prev_week_start = nutrition_week_ago - timedelta(days=7)
-    prev_week_stats = NutritionEntry.objects.filter(user=user, created_at__gte=prev_week_start, created_at__lt=nutrition_week_ago).aggregate(
-        total_calories=Sum('calories'),
-        total_protein=Sum('protein'),
-        total_carbs=Sum('carbs'),
-        total_fat=Sum('fat')
-    )
+    prev_week_stats = summarize_meals([
+        s for d, s in summaries_by_date.items() if prev_week_start <= d < nutrition_week_ago
+    ])
 
-    wow_changes = {}
-    for metric in ['calories', 'protein', 'carbs', 'fat']:
-        current = weekly_nutrition_stats.get(f'total_{metric}') or 0
-        previous = prev_week_stats.get(f'total_{metric}') or 0
-        try:
-            current_f = float(current)
-            previous_f = float(previous)
-        except Exception:
-            current_f = current or 0
-            previous_f = previous or 0
-
-        if previous_f > 0:
-            change = ((current_f - previous_f) / previous_f) * 100
-            wow_changes[metric] = {'value': round(abs(change), 1), 'is_positive': change >= 0}
-        else:
-            wow_changes[metric] = {'value': 0, 'is_positive': True}
+    wow_changes = {
+        metric: percent_change(weekly_nutrition_stats.get(f'total_{metric}'), prev_week_stats.get(f'total_{metric}'))
+        for metric in ['calories', 'protein', 'carbs', 'fat']
+    }
 
     payload = {
         'profile': profile,
@@ -860,7 +746,11 @@ def build_dashboard_payload(user, session):
 @login_required
 def dashboard_data(request):
     """Return a JSON friendly payload of dashboard data for the logged-in user."""
-    payload = build_dashboard_payload(request.user, request.session)
+    selected_params = request.session.get('chart_params', DEFAULT_CHART_PARAMS)
+    payload = get_dashboard_payload(
+        request.user.id, 'data', selected_params,
+        lambda: build_dashboard_payload(request.user, request.session)
+    )
     return JsonResponse(payload, safe=True)
 
 
@@ -906,16 +796,61 @@ def add_health_log(request):
         form = HealthLogForm(instance=existing_log)
 
     # preserve chart parameter selections so the form can show current choices
-    default_params = ['calories_intake', 'steps', 'sleep_hours']
-    selected_params = request.session.get('chart_params', default_params)
+    selected_params = request.session.get('chart_params', DEFAULT_CHART_PARAMS)
 
     return render(request, 'add_log.html', {'form': form, 'selected_params': selected_params})
 
+def _log_page_size(request):
+    """The `page_size` query parameter, clamped to LOG_HISTORY_MAX_PAGE_SIZE."""
+    default_size = getattr(settings, 'LOG_HISTORY_PAGE_SIZE', 25)
+    max_size = getattr(settings, 'LOG_HISTORY_MAX_PAGE_SIZE', 100)
+    try:
+        page_size = int(request.GET.get('page_size', default_size))
+    except (TypeError, ValueError):
+        page_size = default_size
+    return max(1, min(page_size, max_size))
+
+
+def _log_history_page(request):
+    """Read `cursor` and `page_size` from the query string and fetch that page of logs."""
+    return log_history_page(request.user, cursor=request.GET.get('cursor'), page_size=_log_page_size(request))
+
+
 @login_required
 def view_logs(request):
-    """Display all health logs of the logged-in user"""
-    logs = HealthLog.objects.filter(user=request.user).order_by('-date')
-    return render(request, 'view_logs.html', {'logs': logs})
+    """Display the logged-in user's health logs, newest first, one page at a time"""
+    logs, next_cursor = _log_history_page(request)
+    return render(request, 'view_logs.html', {
+        'logs': logs,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+        # carried over to the page links when the reader chose a page size
+        'page_size': _log_page_size(request) if 'page_size' in request.GET else None,
+    })
+
+
+@login_required
+def export_data(request, dataset, fmt):
+    """Stream the user's data as a download: one dataset as CSV, or one/all datasets as NDJSON"""
+    if fmt not in EXPORT_FORMATS or (dataset != 'all' and dataset not in EXPORT_DATASETS):
+        raise Http404('Unknown export')
+    if fmt == 'csv':
+        if dataset == 'all':
+            raise Http404('CSV exports one dataset at a time')
+        rows = iter_csv(request.user.id, dataset)
+    else:
+        rows = iter_ndjson(request.user.id, None if dataset == 'all' else [dataset])
+
+    response = StreamingHttpResponse(rows, content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="lifetrack-{dataset}.{fmt}"'
+    return response
+
+
+@login_required
+def view_logs_data(request):
+    """JSON page of health logs for infinite scroll: {'logs': [...], 'next_cursor': ...}"""
+    logs, next_cursor = _log_history_page(request)
+    return JsonResponse({'logs': logs, 'next_cursor': next_cursor})
 
 
 @login_required
@@ -1012,6 +947,8 @@ def manage_goals(request):
             goal = get_object_or_404(Goal, id=goal_id, user=request.user)
             try:
                 goal.current_value = float(new_value)
+                # logged data no longer overwrites a value set by hand
+                goal.progress_source = 'manual'
                 if goal.current_value >= goal.target_value:
                     goal.is_achieved = True
                     messages.success(request, f'Congratulations! You\'ve achieved your {goal.get_goal_type_display()} goal!')
@@ -1036,245 +973,11 @@ def manage_goals(request):
     active_goals = Goal.objects.filter(user=request.user, is_achieved=False).order_by('deadline')
     achieved_goals = Goal.objects.filter(user=request.user, is_achieved=True).order_by('-created_at')
     
-    # Calculate time-based stats
-    today = timezone.now().date()
-    stats = {
-        'total_goals': active_goals.count() + achieved_goals.count(),
-        'active_goals': active_goals.count(),
-        'achieved_goals': achieved_goals.count(),
-        'upcoming_deadlines': active_goals.filter(deadline__lte=today + timedelta(days=7)).count()
-    }
-    
-    # Get current active goal types to filter suggestions
-    active_goal_types = set(active_goals.values_list('goal_type', flat=True))
-    
-    # Get user's health logs for suggestions
-    health_logs = HealthLog.objects.filter(user=request.user).order_by('-date')
-    recent_logs = health_logs[:7]  # Last 7 days
-    monthly_logs = health_logs[:30]  # Last 30 days
+    # Goal counts from one conditional-count query
+    stats = goal_stats(request.user)
     
-    # Get applied suggestions from session
-    applied_suggestions = request.session.get('applied_suggestions', [])
-    
-    # Get current active goals to avoid suggesting duplicates
-    active_goal_types = set(Goal.objects.filter(
-        user=request.user,
-        is_achieved=False
-    ).values_list('goal_type', flat=True))
-    
-    # Calculate suggested goals based on recent activity
-    suggested_goals = []
-    if recent_logs:
-        # 1. Steps Goals
-        avg_steps = recent_logs.aggregate(Avg('steps'))['steps__avg']
-        max_steps = recent_logs.aggregate(Max('steps'))['steps__max']
-        
-        if avg_steps and avg_steps < 10000:
-            suggested_goals.append({
-                'type': 'steps',
-                'target': 10000,
-                'message': 'Aim for 10,000 daily steps for better health'
-            })
-        elif max_steps and max_steps > avg_steps * 1.2:  # If max is 20% higher than average
-            suggested_goals.append({
-                'type': 'steps',
-                'target': int(max_steps),
-                'message': f'Challenge yourself to reach {int(max_steps)} steps again'
-            })
-        elif avg_steps:
-            new_target = int(avg_steps * 1.1)
-            suggested_goals.append({
-                'type': 'steps',
-                'target': new_target,
-                'message': f'Push yourself to {new_target} steps daily'
-            })
-            
-        # 2. Sleep Goals
-        avg_sleep = recent_logs.aggregate(Avg('sleep_hours'))['sleep_hours__avg']
-        if avg_sleep:
-            if avg_sleep < 6:
-                suggested_goals.append({
-                    'type': 'sleep',
-                    'target': 7,
-                    'message': 'Increase sleep to at least 7 hours for basic health'
-                })
-            elif avg_sleep < 7:
-                suggested_goals.append({
-                    'type': 'sleep',
-                    'target': 8,
-                    'message': 'Aim for 8 hours sleep for optimal rest'
-                })
-            elif avg_sleep < 8:
-                suggested_goals.append({
-                    'type': 'sleep',
-                    'target': 8,
-                    'message': 'Optimize your sleep schedule to 8 hours'
-                })
-            
-        # 3. Water Intake Goals - Based on healthy guidelines
-        avg_water = recent_logs.aggregate(Avg('water_intake'))['water_intake__avg']
-        try:
-            profile = request.user.userprofile
-            # Calculate recommended water intake based on weight and activity
-            weight_based = round(profile.weight * 0.033, 1)  # 33ml per kg body weight
-            
-            if profile.activity_level in ['very', 'extra']:
-                recommended = min(3.7, weight_based + 1.0)  # Extra for very active
-            elif profile.activity_level == 'moderate':
-                recommended = min(3.5, weight_based + 0.5)  # Some extra for moderate
-            else:
-                recommended = min(3.0, weight_based)  # Base recommendation
-                
-            # Round to nearest 0.1L
-            recommended = round(recommended, 1)
-            
-            if avg_water:
-                if avg_water < 1.5:
-                    target = min(2.0, recommended)
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': target,
-                        'message': f'Increase water intake to {target}L daily for basic hydration'
-                    })
-                elif avg_water < recommended:
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': recommended,
-                        'message': f'Work towards {recommended}L daily for optimal hydration'
-                    })
-                elif avg_water > 4.0:  # If drinking too much
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': recommended,
-                        'message': f'Consider reducing to {recommended}L daily for safe hydration'
-                    })
-                else:
-                    # If within healthy range, maintain current level
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': avg_water,
-                        'message': f'Maintain healthy hydration of {avg_water}L daily'
-                    })
-        except (AttributeError, ObjectDoesNotExist):
-            # If no profile, use general recommendations
-            if avg_water:
-                if avg_water < 1.5:
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': 2.0,
-                        'message': 'Increase water intake to 2L daily'
-                    })
-                elif avg_water > 4.0:
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': 3.0,
-                        'message': 'Consider reducing to 3L daily for safe hydration'
-                    })
-                else:
-                    suggested_goals.append({
-                        'type': 'water',
-                        'target': avg_water,
-                        'message': f'Maintain current hydration of {avg_water}L daily'
-                    })
-            
-        # 4. Exercise Duration Goals
-        avg_exercise = recent_logs.aggregate(Avg('exercise_duration'))['exercise_duration__avg']
-        if avg_exercise:
-            if avg_exercise < 15:
-                suggested_goals.append({
-                    'type': 'exercise',
-                    'target': 30,
-                    'message': 'Build up to 30 minutes exercise daily'
-                })
-            elif avg_exercise < 30:
-                suggested_goals.append({
-                    'type': 'exercise',
-                    'target': 45,
-                    'message': 'Increase exercise to 45 minutes daily'
-                })
-            elif avg_exercise < 60:
-                suggested_goals.append({
-                    'type': 'exercise',
-                    'target': 60,
-                    'message': 'Work towards 60 minutes daily exercise'
-                })
-            else:
-                new_target = int(avg_exercise * 1.15)
-                suggested_goals.append({
-                    'type': 'exercise',
-                    'target': new_target,
-                    'message': f'Push your workouts to {new_target} minutes'
-                })
-            
-        # 5. Weight Management Goals
-        try:
-            profile = request.user.userprofile
-            current_weight = profile.weight if hasattr(profile, 'weight') else None
-            target_weight = profile.target_weight if hasattr(profile, 'target_weight') else None
-            
-            if current_weight:
-                if target_weight:
-                    # If target weight is set, suggest goal based on that
-                    weight_diff = current_weight - target_weight
-                    if abs(weight_diff) > 0.5:  # If more than 0.5 kg from target
-                        suggested_goals.append({
-                            'type': 'weight',
-                            'target': target_weight,
-                            'message': f'{"Lose" if weight_diff > 0 else "Gain"} weight to reach {target_weight}kg'
-                        })
-                else:
-                    # If no target weight, suggest based on BMI
-                    height_m = profile.height / 100
-                    bmi = current_weight / (height_m ** 2)
-                    if bmi > 25:  # Overweight
-                        ideal_weight = round(23 * (height_m ** 2), 1)  # Using BMI 23 as target
-                        suggested_goals.append({
-                            'type': 'weight',
-                            'target': ideal_weight,
-                            'message': f'Work towards a healthy weight of {ideal_weight}kg'
-                        })
-        except (AttributeError, ObjectDoesNotExist):
-            # Skip weight suggestions if profile doesn't exist or is incomplete
-            pass
-                    
-        # 6. Trend-based Goals (using monthly data)
-        if monthly_logs.count() >= 14:  # If we have at least 2 weeks of data
-            recent_stats = recent_logs.aggregate(
-                avg_steps=Avg('steps'),
-                avg_exercise=Avg('exercise_duration'),
-                avg_water=Avg('water_intake')
-            )
-            
-            past_stats = monthly_logs[7:].aggregate(
-                avg_steps=Avg('steps'),
-                avg_exercise=Avg('exercise_duration'),
-                avg_water=Avg('water_intake')
-            )
-            
-            # If recent performance dropped, suggest recovery goals
-            if recent_stats['avg_steps'] and past_stats['avg_steps'] and \
-               recent_stats['avg_steps'] < past_stats['avg_steps'] * 0.9:
-                suggested_goals.append({
-                    'type': 'steps',
-                    'target': int(past_stats['avg_steps']),
-                    'message': 'Get back to your usual step count'
-                })
-                
-            if recent_stats['avg_exercise'] and past_stats['avg_exercise'] and \
-               recent_stats['avg_exercise'] < past_stats['avg_exercise'] * 0.9:
-                suggested_goals.append({
-                    'type': 'exercise',
-                    'target': int(past_stats['avg_exercise']),
-                    'message': 'Return to your regular exercise duration'
-                })
-                
-            if recent_stats['avg_water'] and past_stats['avg_water'] and \
-               recent_stats['avg_water'] < past_stats['avg_water'] * 0.9:
-                suggested_goals.append({
-                    'type': 'water',
-                    'target': round(past_stats['avg_water'], 1),
-                    'message': 'Maintain your usual water intake'
-                })
+    # Suggested goals from the user's recent logs (one query for the whole window)
+    suggested_goals = GoalSuggestionEngine(request.user).suggestions()
     
     context = {
         'form': form,
@@ -1309,8 +1012,9 @@ def view_recommendations(request):
         generate_recommendations_for_user(request.user)
         recommendations = Recommendation.objects.filter(user=request.user)
 
-    # Mark unread as read
-    Recommendation.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    # Mark unread as read (queryset updates send no signals, so drop the cached dashboard here)
+    if Recommendation.objects.filter(user=request.user, is_read=False).update(is_read=True):
+        invalidate_dashboard_cache(request.user.id)
 
     return render(request, 'recommendations.html', {'recommendations': recommendations})
 
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Query count/time and Server-Timing header; keep first so it sees the whole request
+    'lifeapp.middleware.PerformanceTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +94,53 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per-process; use a shared backend in production, e.g.
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds an assembled dashboard payload stays cached (writes invalidate it sooner)
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Seconds a forecast stays cached; entries are keyed by the user's data revision and the day
+FORECAST_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Per-metric training windows written by `manage.py tune_forecast_windows`;
+# metrics missing from the file forecast from the last 30 days
+FORECAST_WINDOWS_FILE = BASE_DIR / 'forecast_windows.json'
+
+
+# Health log history page size (?page_size= may ask for up to the maximum)
+LOG_HISTORY_PAGE_SIZE = 25
+LOG_HISTORY_MAX_PAGE_SIZE = 100
+
+
+# Request performance instrumentation (lifeapp.middleware.PerformanceTimingMiddleware)
+PERF_TIMING_ENABLED = True
+# Log one JSON line per request to the 'lifeapp.perf' logger (over-budget requests are always logged)
+PERF_LOG_REQUESTS = False
+# Requests over either budget are logged as warnings; None disables the check
+PERF_QUERY_BUDGET = 30
+PERF_LATENCY_BUDGET_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'lifeapp.perf': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 